@@ -0,0 +1,12 @@
+"""
+Helpers shared by the agents of this repository.
+
+- cassette: record/replay of the ERC3 traffic of a session
+- usage_reporter: background delivery of ``log_llm`` usage records
+- llm_cache: opt-in disk cache of LLM responses
+- tokens: prompt size estimates, per-task token ledger and budget
+- log_manager: compacted conversation log of the SGR NextStep loop
+- tracing: nested timing spans exported to JSONL
+- session: session loop of the SGR agents (spans, usage drain, scores)
+- benchmark: dispatch counting, report and baseline comparison of the benchmarks
+"""
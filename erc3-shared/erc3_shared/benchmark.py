@@ -0,0 +1,150 @@
+"""
+Shared parts of the offline benchmarks of the agents (benchmark.py of every project).
+
+The project scripts run their agent per task; this module counts the API dispatches,
+builds the per-task rows, summarizes them and compares the summary to a baseline report.
+"""
+import argparse
+import json
+import sys
+import textwrap
+from collections import Counter
+
+from .cassette import Cassette, RecordedClient, create_core
+from .llm_cache import get_llm_cache
+
+# compared against the baseline, lower is better for all of them
+METRICS = ("wall_s", "steps", "llm_calls", "prompt_tokens", "completion_tokens", "dispatches")
+
+
+class CountingClient:
+    """API client proxy counting the dispatched requests by type."""
+
+    def __init__(self, inner):
+        self._inner = inner
+        self.dispatches = Counter()
+
+    def dispatch(self, request):
+        self.dispatches[type(request).__name__] += 1
+        return self._inner.dispatch(request)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+class CountingCore:
+    """
+    ERC3 core proxy handing out CountingClient clients, one per task.
+    client_getter is the core method creating the API client of a task
+    (get_store_client for the store benchmark, get_erc_client for erc3-dev).
+    """
+
+    def __init__(self, inner, client_getter: str = "get_store_client"):
+        self._inner = inner
+        self._client_getter = client_getter
+        self.clients: dict[str, CountingClient] = {}
+
+    def _counting_client(self, task):
+        if task.task_id not in self.clients:
+            self.clients[task.task_id] = CountingClient(getattr(self._inner, self._client_getter)(task))
+        return self.clients[task.task_id]
+
+    def __getattr__(self, name):
+        if name == self._client_getter:
+            return self._counting_client
+        return getattr(self._inner, name)
+
+
+def create_backend(backend: str, cassette: str | None, simulator=None):
+    """ERC3 core of the backend; simulator creates the simulated one, if the project has it."""
+    if backend == "simulator":
+        return simulator()
+    if backend == "replay":
+        if not cassette:
+            raise SystemExit("--backend replay needs --cassette")
+        return RecordedClient(None, Cassette(cassette, "replay"), "core")
+    return create_core()
+
+
+def add_arguments(parser: argparse.ArgumentParser, backends: list[str]):
+    """Options shared by the benchmarks, the first backend is the default."""
+    parser.add_argument("--backend", choices=backends, default=backends[0])
+    parser.add_argument("--cassette", help="cassette of a recorded session, for --backend replay")
+    parser.add_argument("--tasks", type=int, help="only run the first N tasks")
+    parser.add_argument("--out", default="benchmark.json", help="report file")
+    parser.add_argument("--baseline", help="earlier report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative regression")
+
+
+def cache_hits() -> int:
+    """LLM_CACHE_DIR hits so far, 0 without the cache."""
+    cache = get_llm_cache()
+    return cache.hits if cache else 0
+
+
+def task_row(core: CountingCore, task, result, wall: float, steps: int, hits: int,
+             tokens: dict, error: str | None) -> dict:
+    """
+    Report row of one task. steps are the LLM completions including cache hits,
+    hits the LLM_CACHE_DIR hits of the task, tokens the token stats of the task.
+    """
+    client = core.clients.get(task.task_id)
+    return {
+        "task_id": task.task_id,
+        "spec_id": task.spec_id,
+        "wall_s": round(wall, 3),
+        "steps": steps,
+        "llm_calls": steps - hits,
+        "prompt_tokens": tokens.get("reported_prompt_tokens", 0),
+        "completion_tokens": tokens.get("completion_tokens", 0),
+        "dispatches": sum(client.dispatches.values()) if client else 0,
+        "dispatches_by_type": dict(client.dispatches) if client else {},
+        "score": result.eval.score if result.eval else None,
+        "error": error,
+    }
+
+
+def summarize(tasks: list[dict]) -> dict:
+    totals = {metric: round(sum(t[metric] for t in tasks), 3) for metric in METRICS}
+    count = len(tasks) or 1
+    return {
+        "tasks": len(tasks),
+        "errors": sum(t["error"] is not None for t in tasks),
+        "score": round(sum(t["score"] or 0 for t in tasks), 3),
+        "totals": totals,
+        "per_task": {metric: round(value / count, 3) for metric, value in totals.items()},
+    }
+
+
+def compare(summary: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Metrics whose per-task mean is above the baseline by more than the tolerance."""
+    regressions = []
+    for metric in METRICS:
+        now, before = summary["per_task"][metric], baseline["summary"]["per_task"].get(metric)
+        if not before:
+            continue
+        change = (now - before) / before
+        print(f"  {metric:18} {before:>12} -> {now:>12} ({change:+.1%})")
+        if change > tolerance:
+            regressions.append(f"{metric} {before} -> {now} ({change:+.1%})")
+    return regressions
+
+
+def write_report(report: dict, results: list[dict], args: argparse.Namespace):
+    """
+    Add the summary and the task rows to the report and write it to args.out.
+    With args.baseline the process exits with 1 on a regression above args.tolerance.
+    """
+    report.update(summary=summarize(results), tasks=results)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark report written to {args.out}:\n{textwrap.indent(json.dumps(report['summary'], indent=2), '  ')}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"Compared to {args.baseline}:")
+        regressions = compare(report["summary"], baseline, args.tolerance)
+        if regressions:
+            print(f"REGRESSION (tolerance {args.tolerance:.0%}): " + "; ".join(regressions))
+            sys.exit(1)
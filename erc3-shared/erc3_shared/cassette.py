@@ -0,0 +1,216 @@
+"""
+Record/replay of the ERC3 traffic of a session.
+
+    ERC3_CASSETTE=runs/session.jsonl.gz ERC3_CASSETTE_MODE=record python main.py
+    ERC3_CASSETTE=runs/session.jsonl.gz ERC3_CASSETTE_MODE=replay python main.py
+
+In record mode every call of the ERC3 core (start_session, session_status, start_task,
+complete_task, log_llm, ...) and of the task clients it creates (StoreClient / ErcClient
+dispatch and helpers) goes to the real API and is appended to a gzipped JSONL cassette.
+In replay mode no network is used: each call is answered with the response recorded
+for the same channel, method and arguments (repeated calls in recorded order), errors
+are raised again as ApiException. With ERC3_CASSETTE_REALTIME=1 replay also waits for
+the recorded latency, so runs can be timed offline.
+"""
+import atexit
+import gzip
+import hashlib
+import importlib
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from erc3 import ERC3, ApiException
+
+ERC3_CASSETTE = os.getenv("ERC3_CASSETTE")
+ERC3_CASSETTE_MODE = os.getenv("ERC3_CASSETTE_MODE", "record")
+ERC3_CASSETTE_REALTIME = os.getenv("ERC3_CASSETTE_REALTIME", "0") == "1"
+
+# calls whose arguments vary between runs (durations, token counts, session names): matched by name only
+IGNORE_ARGS = {"log_llm", "start_session"}
+
+
+class CassetteMiss(LookupError):
+    """Replay reached a call that was never recorded."""
+
+
+# ------------------------------------------------------------------
+# (de)serialization of requests and responses
+# ------------------------------------------------------------------
+def _encode(value):
+    if hasattr(value, "model_dump"):
+        cls = type(value)
+        return {"__type__": f"{cls.__module__}:{cls.__qualname__}", "data": value.model_dump(mode="json")}
+    if isinstance(value, dict):
+        return {str(key): _encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+
+def _decode(value):
+    if isinstance(value, dict) and "__type__" in value:
+        module, qualname = value["__type__"].split(":")
+        cls = importlib.import_module(module)
+        for name in qualname.split("."):
+            cls = getattr(cls, name)
+        return cls.model_validate(value["data"])
+    if isinstance(value, dict):
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def _encode_error(e: ApiException) -> dict:
+    return {"args": _encode(list(e.args)), "attrs": _encode(vars(e))}
+
+
+def _decode_error(data: dict) -> ApiException:
+    # rebuilt without calling the constructor, its signature is not ours to rely on
+    e = ApiException.__new__(ApiException)
+    Exception.__init__(e, *_decode(data["args"]))
+    for name, value in _decode(data["attrs"]).items():
+        setattr(e, name, value)
+    return e
+
+
+# ------------------------------------------------------------------
+# Cassette
+# ------------------------------------------------------------------
+class Cassette:
+    def __init__(self, path: str, mode: str = "record", realtime: bool = False):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode {mode!r}, expected record or replay")
+        self.path = path
+        self.mode = mode
+        self.realtime = realtime
+        self.entries: list[dict] = []
+        self.calls = Counter()  # "channel.method" -> calls
+        self.seconds = Counter()  # "channel.method" -> recorded latency of the calls made
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._replay: dict[str, deque] = defaultdict(deque)
+        self._last: dict[str, dict] = {}
+        if mode == "replay":
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._replay[entry["key"]].append(entry)
+
+    @staticmethod
+    def key(channel: str, method: str, args, kwargs) -> str:
+        # a task is matched by its id, the rest of it (status, ...) may change while it runs
+        args = [getattr(arg, "task_id", arg) for arg in args]
+        kwargs = {name: getattr(value, "task_id", value) for name, value in kwargs.items()}
+        request = [] if method in IGNORE_ARGS else [_encode(args), _encode(kwargs)]
+        payload = json.dumps([channel, method, request], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def call(self, channel: str, method: str, func, args, kwargs):
+        """Run (record) or answer (replay) one call."""
+        key = self.key(channel, method, args, kwargs)
+        name = f"{channel.split(':')[0]}.{method}"
+        if self.mode == "replay":
+            return self._answer(key, name, channel, method)
+
+        started = time.perf_counter()
+        entry = {"key": key, "channel": channel, "method": method, "request": _encode([args, kwargs])}
+        try:
+            result = func(*args, **kwargs)
+            entry["response"] = _encode(result)
+            return result
+        except ApiException as e:
+            entry["error"] = _encode_error(e)
+            raise
+        finally:
+            entry["seconds"] = round(time.perf_counter() - started, 4)
+            with self._lock:
+                self.entries.append(entry)
+                self.calls[name] += 1
+                self.seconds[name] += entry["seconds"]
+
+    def _answer(self, key: str, name: str, channel: str, method: str):
+        with self._lock:
+            queue = self._replay.get(key)
+            if queue:
+                entry = self._last[key] = queue.popleft()
+            elif key in self._last:
+                # called more often than recorded: repeat the last answer
+                entry = self._last[key]
+            else:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded {channel}.{method} call with these arguments")
+            self.calls[name] += 1
+            self.seconds[name] += entry["seconds"]
+        if self.realtime:
+            time.sleep(entry["seconds"])
+        if "error" in entry:
+            raise _decode_error(entry["error"])
+        return _decode(entry["response"])
+
+    def save(self):
+        if self.mode != "record":
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock, gzip.open(self.path, "wt", encoding="utf-8") as f:
+            for entry in self.entries:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "calls": sum(self.calls.values()),
+            "misses": self.misses,
+            "api_seconds": round(sum(self.seconds.values()), 3),
+            "by_method": dict(self.calls),
+        }
+
+
+class RecordedClient:
+    """Proxy of an ERC3 core or task client routing its public methods through the cassette."""
+
+    def __init__(self, inner, cassette: Cassette, channel: str):
+        self._inner = inner
+        self._cassette = cassette
+        self._channel = channel
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            return getattr(self._inner, name)
+        if name.startswith("get_") and name.endswith("_client"):
+            # task clients (get_store_client, get_erc_client) get a channel of their own
+            def get_client(task, *args, **kwargs):
+                inner = getattr(self._inner, name)(task, *args, **kwargs) if self._inner is not None else None
+                return RecordedClient(inner, self._cassette, f"{name[4:-7]}:{task.task_id}")
+            return get_client
+        func = getattr(self._inner, name) if self._inner is not None else None
+        if func is not None and not callable(func):
+            return func
+
+        def recorded(*args, **kwargs):
+            return self._cassette.call(self._channel, name, func, args, kwargs)
+        return recorded
+
+
+_cassette: Cassette | None = None
+
+
+def get_cassette() -> Cassette | None:
+    return _cassette
+
+
+def create_core():
+    """ERC3 core client, recorded or replayed if ERC3_CASSETTE is set."""
+    global _cassette
+    if not ERC3_CASSETTE:
+        return ERC3()
+    _cassette = Cassette(ERC3_CASSETTE, ERC3_CASSETTE_MODE, ERC3_CASSETTE_REALTIME)
+    atexit.register(_cassette.save)
+    inner = ERC3() if ERC3_CASSETTE_MODE == "record" else None
+    print(f"ERC3 cassette: {ERC3_CASSETTE_MODE} {ERC3_CASSETTE}")
+    return RecordedClient(inner, _cassette, "core")
@@ -0,0 +1,148 @@
+"""
+Opt-in disk cache of LLM responses, for fast deterministic reruns of a session.
+
+Enabled by setting LLM_CACHE_DIR. A response is stored under the hash of everything
+that determines it (model, messages, tools or response format, sampling parameters), so
+a rerun only calls the LLM from the first call whose prompt differs. Least recently used
+entries are evicted once the cache is above LLM_CACHE_MAX_MB, down to 90% of it. Used by
+ERC3Agent._run_for_messages (kibernikto) and cached_parse (SGR NextStep loop).
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from openai.types import CompletionUsage
+from openai.types.chat import ParsedChatCompletion
+
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR")
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "500"))
+
+# Eviction stops at this share of max_bytes, so the next directory scan is many puts away
+EVICT_TO = 0.9
+
+# Usage recorded and reported for a cache hit: no tokens were spent on it
+CACHE_HIT_USAGE = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+
+def cache_key(**parts) -> str:
+    """Hash of the request parts; pydantic classes are represented by their JSON schema."""
+    def default(value):
+        if hasattr(value, "model_json_schema"):
+            return value.model_json_schema()
+        if hasattr(value, "model_dump"):
+            return value.model_dump(mode="json")
+        return repr(value)
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=default)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMCache:
+    """
+    Responses stored as one file per key; file mtime is the last use.
+    The total size is kept in memory, the directory is only scanned when it crosses max_bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total: int | None = None  # bytes on disk, read on the first put
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = f.read()
+            os.utime(path)  # mark as recently used
+        except OSError:
+            # missing, or evicted by a concurrent task between the read and the touch
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: str):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first, concurrent readers never see half an entry
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(value)
+        written = os.path.getsize(tmp)
+        with self._lock:
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp, path)
+            if self._total is None:
+                self._total = sum(size for _, size, _ in self._entries())
+            else:
+                self._total += written - replaced
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """(mtime, size, path) of every stored entry."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json"):
+                    try:
+                        stat = os.stat(os.path.join(root, name))
+                    except FileNotFoundError:
+                        continue  # evicted by another process
+                    entries.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+        return entries
+
+    def _evict(self):
+        """Remove least recently used entries down to EVICT_TO of max_bytes. Called with the lock held."""
+        # rescanned: other processes sharing the directory are not in the in-memory total
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._total = total
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_cache = LLMCache(LLM_CACHE_DIR, int(LLM_CACHE_MAX_MB * 1024 * 1024)) if LLM_CACHE_DIR else None
+
+
+def get_llm_cache() -> LLMCache | None:
+    """The process-wide cache, None unless LLM_CACHE_DIR is set."""
+    return _cache
+
+
+def cached_parse(client, **kwargs):
+    """
+    `client.beta.chat.completions.parse(**kwargs)`, answered from the cache when possible.
+    Cached answers carry a usage of 0 tokens, like in the kibernikto agents.
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return client.beta.chat.completions.parse(**kwargs)
+    key = cache_key(**kwargs)
+    stored = cache.get(key)
+    if stored is not None:
+        completion = ParsedChatCompletion[kwargs["response_format"]].model_validate_json(stored)
+        return completion.model_copy(update={"usage": CompletionUsage(**CACHE_HIT_USAGE)})
+    completion = client.beta.chat.completions.parse(**kwargs)
+    cache.put(key, completion.model_dump_json())
+    return completion
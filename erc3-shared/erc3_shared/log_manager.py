@@ -0,0 +1,123 @@
+"""
+Conversation log of the SGR NextStep loop, compacted before every LLM call.
+
+The full log is kept, but the prompt built from it:
+- replaces an older tool result that is identical to a newer one with a reference to it,
+- summarizes tool results older than the last `keep_recent` steps (long lists are cut,
+  long texts truncated),
+- drops the oldest steps (assistant tool call together with its result) when the prompt
+  is above the token ceiling, leaving a one-line note per dropped step.
+The system prompt and the task stay, so tool-call ids always pair up as the OpenAI schema requires.
+"""
+import json
+import os
+
+from .tokens import message_tokens
+
+# Prompt size above which the oldest steps are dropped
+LOG_TOKEN_CEILING = int(os.getenv("LOG_TOKEN_CEILING", "12000"))
+# Number of latest tool results sent verbatim
+LOG_KEEP_RECENT = int(os.getenv("LOG_KEEP_RECENT", "4"))
+# Length of a summarized tool result
+DIGEST_CHARS = 400
+# List items kept when a JSON tool result is summarized
+DIGEST_LIST_ITEMS = 3
+# Shorter results are not worth replacing by a reference to an identical one
+DEDUP_MIN_CHARS = 80
+
+
+def summarize(txt: str) -> str:
+    """Short version of a tool result: long JSON lists keep their first items, anything else is truncated."""
+    if len(txt) <= DIGEST_CHARS:
+        return txt
+    try:
+        data = json.loads(txt)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        short = {}
+        for key, value in data.items():
+            if isinstance(value, list) and len(value) > DIGEST_LIST_ITEMS:
+                short[key] = value[:DIGEST_LIST_ITEMS]
+                short[f"{key}_omitted"] = len(value) - DIGEST_LIST_ITEMS
+            else:
+                short[key] = value
+        txt = json.dumps(short, ensure_ascii=False)
+        if len(txt) <= DIGEST_CHARS:
+            return f"[older result, summarized] {txt}"
+    return f"[older result, truncated] {txt[:DIGEST_CHARS]}..."
+
+
+class LogManager:
+    """Drop-in replacement for the `log` list of a NextStep loop."""
+
+    def __init__(self, messages: list[dict], token_ceiling: int = LOG_TOKEN_CEILING,
+                 keep_recent: int = LOG_KEEP_RECENT):
+        self.messages = list(messages)
+        self.head = len(messages)  # system prompt and task, always sent
+        self.token_ceiling = token_ceiling
+        self.keep_recent = keep_recent
+        self.tokens_sent = 0
+        self.tokens_saved = 0
+
+    def append(self, message: dict):
+        self.messages.append(message)
+
+    def prompt(self, token_ceiling: int | None = None) -> list[dict]:
+        """Compacted messages for the next completion. Count them with sent() once they are sent."""
+        head, steps = self.messages[:self.head], self._steps()
+
+        # identical results: only the newest one is sent in full
+        newest = {}
+        for n, (call, result) in enumerate(steps):
+            if result is not None:
+                newest[result["content"]] = n
+        compacted = []
+        for n, (call, result) in enumerate(steps):
+            if result is not None:
+                content = result["content"]
+                if newest[content] != n and len(content) >= DEDUP_MIN_CHARS:
+                    content = f"[same result as {steps[newest[content]][1]['tool_call_id']}]"
+                elif n < len(steps) - self.keep_recent:
+                    content = summarize(content)
+                result = {**result, "content": content}
+            compacted.append((call, result))
+
+        # token ceiling: drop the oldest steps, keep a note of what they did
+        def size(items):
+            return sum(message_tokens(m) for pair in items for m in pair if m is not None)
+
+        budget = (token_ceiling or self.token_ceiling) - sum(map(message_tokens, head))
+        dropped = []
+        while len(compacted) > 1 and size(compacted) > budget:
+            dropped.append(compacted.pop(0)[0])
+        messages = list(head)
+        if dropped:
+            notes = "\n".join(f"- {call.get('content')} "
+                              f"({', '.join(c['function']['name'] for c in call.get('tool_calls') or [])})"
+                              for call in dropped)
+            messages.append({"role": "assistant", "content": f"Earlier steps (results omitted):\n{notes}"})
+        for call, result in compacted:
+            messages.append(call)
+            if result is not None:
+                messages.append(result)
+        return messages
+
+    def sent(self, messages: list[dict]):
+        """Record the compaction savings of a prompt that was sent."""
+        sent = sum(map(message_tokens, messages))
+        self.tokens_sent += sent
+        self.tokens_saved += max(sum(map(message_tokens, self.messages)) - sent, 0)
+
+    def _steps(self) -> list[tuple[dict, dict | None]]:
+        """(assistant tool call, its tool result) pairs after the head."""
+        steps = []
+        for message in self.messages[self.head:]:
+            if message["role"] == "tool" and steps and steps[-1][1] is None:
+                steps[-1] = (steps[-1][0], message)
+            else:
+                steps.append((message, None))
+        return steps
+
+    def stats(self) -> dict:
+        return {"tokens_sent": self.tokens_sent, "tokens_saved": self.tokens_saved}
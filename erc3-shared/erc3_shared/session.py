@@ -0,0 +1,37 @@
+"""Session loop of the SGR agents: every task run in turn, traced and scored."""
+import textwrap
+
+from .tracing import span
+from .usage_reporter import get_usage_reporter
+
+
+def run_session(core, run_task, benchmark: str, workspace: str, name: str, architecture: str):
+    """
+    Start a session, run every task with run_task(task) and submit the session.
+    Errors of a task are printed, the task is completed and scored anyway. The queued
+    log_llm records of a task are delivered before it gets evaluated.
+    """
+    # one trace per session when TRACE_FILE is set
+    with span("session", "session", benchmark=benchmark):
+        res = core.start_session(benchmark=benchmark, workspace=workspace, name=name, architecture=architecture)
+
+        status = core.session_status(res.session_id)
+        print(f"Session has {len(status.tasks)} tasks")
+
+        for task in status.tasks:
+            with span("task", "task", task_id=task.task_id, spec_id=task.spec_id) as task_span:
+                print("=" * 40)
+                print(f"Starting Task: {task.task_id} ({task.spec_id}): {task.task_text}")
+                core.start_task(task)
+                try:
+                    run_task(task)
+                except Exception as e:
+                    print(e)
+                get_usage_reporter(core).drain(task.task_id)
+                result = core.complete_task(task)
+                if result.eval:
+                    explain = textwrap.indent(result.eval.logs, "  ")
+                    print(f"\nSCORE: {result.eval.score}\n{explain}\n")
+                    task_span.set(score=result.eval.score)
+
+        core.submit_session(res.session_id)
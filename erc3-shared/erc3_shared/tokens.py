@@ -0,0 +1,149 @@
+"""Prompt size estimates, the per-task token ledger and the pre-flight budget check.
+
+Token counts are estimated with tiktoken when it is installed, with a characters
+per token heuristic otherwise. TokenLedger (kibernikto agents) and TokenBudget (SGR
+NextStep loop) compare every estimate with the usage the provider reported afterwards,
+so later estimates can be calibrated and the prompt growth of a task can be inspected.
+"""
+import math
+import os
+from dataclasses import dataclass, field
+
+try:
+    import tiktoken
+except ImportError:  # optional, the heuristic below is used without it
+    tiktoken = None
+
+# Average characters per token of English text and JSON for GPT-style tokenizers
+CHARS_PER_TOKEN = 4
+# Outgoing prompts expected above this size are trimmed before they are sent, one limit for every agent
+PROMPT_TOKEN_LIMIT = int(os.getenv("PROMPT_TOKEN_LIMIT", "60000"))
+# Share of the limit above which a warning is printed
+PROMPT_WARN_RATIO = 0.8
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and tiktoken is not None and not _encoding_failed:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # the encoding files could not be loaded (offline), fall back to the heuristic
+            _encoding_failed = True
+    return _encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count of a prompt fragment."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def message_tokens(message: dict) -> int:
+    tokens = estimate_tokens(message.get('content') or "")
+    for tool_call in message.get('tool_calls') or []:
+        tokens += estimate_tokens(tool_call['function']['name'] + tool_call['function']['arguments'])
+    return tokens + 4  # role and separators
+
+
+def estimate_prompt_tokens(messages: list[dict]) -> int:
+    return sum(map(message_tokens, messages)) + 3
+
+
+@dataclass
+class TokenRecord:
+    agent: str
+    estimated: int
+    prompt_tokens: int | None = None  # as reported by the provider
+    completion_tokens: int | None = None
+
+
+@dataclass
+class TokenLedger:
+    """Estimated and reported tokens of every LLM call of a task, in call order."""
+    records: list[TokenRecord] = field(default_factory=list)
+
+    def record(self, agent: str, estimated: int, usage: dict | None):
+        usage = usage or {}
+        self.records.append(TokenRecord(agent, estimated, usage.get('prompt_tokens'), usage.get('completion_tokens')))
+
+    @property
+    def ratio(self) -> float:
+        """Reported / estimated prompt tokens over the calls with a usage report."""
+        reported = [r for r in self.records if r.prompt_tokens]
+        estimated = sum(r.estimated for r in reported)
+        return sum(r.prompt_tokens for r in reported) / estimated if estimated else 1.0
+
+    def calibrated(self, estimated: int) -> int:
+        """Expected reported size of a prompt estimated at ``estimated`` tokens."""
+        return round(estimated * self.ratio)
+
+    def curve(self, agent: str | None = None) -> list[tuple[int, int | None]]:
+        """(estimated, reported) prompt tokens per call, of one agent or all."""
+        return [(r.estimated, r.prompt_tokens) for r in self.records if agent is None or r.agent == agent]
+
+    def stats(self) -> dict:
+        return {
+            "calls": len(self.records),
+            "estimated_prompt_tokens": sum(r.estimated for r in self.records),
+            "reported_prompt_tokens": sum(r.prompt_tokens or 0 for r in self.records),
+            "completion_tokens": sum(r.completion_tokens or 0 for r in self.records),
+            "max_prompt_tokens": max((r.prompt_tokens or r.estimated for r in self.records), default=0),
+            "reported_to_estimated": round(self.ratio, 3),
+        }
+
+
+class TokenBudget:
+    """Pre-flight size check of every step of one task, with estimated vs reported usage."""
+
+    def __init__(self, limit: int = PROMPT_TOKEN_LIMIT):
+        self.limit = limit
+        self.records = []  # (estimated, reported prompt tokens, completion tokens) per step
+
+    @property
+    def ratio(self) -> float:
+        """Reported / estimated prompt tokens so far."""
+        reported = [(est, rep) for est, rep, _ in self.records if rep]
+        estimated = sum(est for est, _ in reported)
+        return sum(rep for _, rep in reported) / estimated if estimated else 1.0
+
+    def preflight(self, messages: list[dict], log) -> tuple[list[dict], int]:
+        """
+        Estimate the prompt of the next step. Only if it would exceed the limit, it is
+        rebuilt from the LogManager with a lower token ceiling.
+        """
+        estimated = estimate_prompt_tokens(messages)
+        expected = round(estimated * self.ratio)
+        if expected > self.limit:
+            print(f"ATTENTION: prompt is ~{expected} tokens (limit {self.limit}), trimming")
+            messages = log.prompt(token_ceiling=int(self.limit / self.ratio))
+            estimated = estimate_prompt_tokens(messages)
+        elif expected > self.limit * PROMPT_WARN_RATIO:
+            print(f"ATTENTION: prompt is ~{expected} tokens, close to the limit {self.limit}")
+        return messages, estimated
+
+    def record(self, estimated: int, usage):
+        """Store the estimate with the `completion.usage` reported for it."""
+        self.records.append((estimated,
+                             getattr(usage, "prompt_tokens", None),
+                             getattr(usage, "completion_tokens", None)))
+
+    def curve(self) -> list[tuple[int, int | None]]:
+        """(estimated, reported) prompt tokens per step."""
+        return [(est, rep) for est, rep, _ in self.records]
+
+    def stats(self) -> dict:
+        return {
+            "steps": len(self.records),
+            "estimated_prompt_tokens": sum(est for est, _, _ in self.records),
+            "reported_prompt_tokens": sum(rep or 0 for _, rep, _ in self.records),
+            "completion_tokens": sum(comp or 0 for _, _, comp in self.records),
+            "reported_to_estimated": round(self.ratio, 3),
+        }
@@ -0,0 +1,138 @@
+"""Nested timing spans of a session, exported as JSON lines.
+
+Tracing is enabled by setting TRACE_FILE. Spans nest through a ContextVar, so every
+asyncio task and every dispatch thread (they run in a copy of the caller's context)
+extends its own branch of the tree: session → task → turn → llm / tool → dispatch in
+the kibernikto agents, session → task → llm / dispatch per NextStep in the SGR agents.
+A span is written when it ends, with its duration and attributes such as token
+counts and payload sizes. Without TRACE_FILE every span is a shared no-op object.
+"""
+import asyncio
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .tokens import estimate_tokens
+
+TRACE_FILE = os.getenv("TRACE_FILE")
+
+
+class Span:
+    def __init__(self, name: str, kind: str, parent: "Span | None", attrs: dict):
+        self.name = name
+        self.kind = kind
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.attrs = attrs
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def end(self):
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": round(self.start, 6),
+            "duration_ms": self.duration_ms,
+            **self.attrs,
+        }
+
+
+class _NoSpan:
+    """Stands in for a span while tracing is off."""
+
+    def set(self, **attrs):
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+class SpanExporter:
+    """Appends finished spans to a JSONL file, one line per span."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+        atexit.register(self._file.close)
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+
+_exporter = SpanExporter(TRACE_FILE) if TRACE_FILE else None
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attrs):
+    """Time the enclosed block as a child of the current span."""
+    if _exporter is None:
+        yield NO_SPAN
+        return
+    current = Span(name, kind, _current_span.get(), attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+        _exporter.export(current)
+
+
+def current_span() -> Span | _NoSpan:
+    """The innermost open span of this context, to add attributes to it."""
+    return _current_span.get() or NO_SPAN
+
+
+def payload_size(value) -> dict:
+    """Characters and estimated tokens of a payload as the LLM gets it."""
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+    return {"chars": len(text), "tokens": estimate_tokens(text)}
+
+
+def traced(kind: str, name: str | None = None):
+    """Decorator running every call of a function in its own span; results get their payload size."""
+    def decorate(func):
+        span_name = name or func.__name__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with span(span_name, kind) as current:
+                    result = await func(*args, **kwargs)
+                    if current is not NO_SPAN:
+                        current.set(result=payload_size(result))
+                    return result
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with span(span_name, kind) as current:
+                    result = func(*args, **kwargs)
+                    if current is not NO_SPAN:
+                        current.set(result=payload_size(result))
+                    return result
+        return wrapper
+    return decorate
@@ -0,0 +1,125 @@
+"""Background reporter for ERC3 ``log_llm`` calls.
+
+``api.log_llm`` is a blocking HTTP request that takes a single record. Agents only
+queue usage records here; a daemon thread sends them one by one, retries failures
+after a backoff without holding up the other records, and lets the task runner
+drain everything of a task right before ``complete_task``.
+"""
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from erc3 import ERC3
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UsageRecord:
+    task_id: str
+    model: str
+    duration_sec: float
+    usage: object
+    attempts: int = 0
+    retry_at: float = 0.0  # time.monotonic() before which a failed record is not resent
+
+
+class LLMUsageReporter:
+    """Queues LLM usage records and sends them to the ERC3 API from a background thread."""
+
+    def __init__(self, api: ERC3, max_retries: int = 3, retry_delay: float = 0.5):
+        self.api = api
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.sent = 0
+        self.failed = 0
+        self._queue: queue.Queue[UsageRecord] = queue.Queue()
+        self._pending: Counter[str] = Counter()
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="llm-usage-reporter", daemon=True)
+        self._thread.start()
+
+    def report(self, task_id: str, model: str, duration_sec: float, usage) -> None:
+        """Queue a usage record, returns immediately."""
+        with self._condition:
+            self._pending[task_id] += 1
+        self._queue.put(UsageRecord(task_id=task_id, model=model, duration_sec=duration_sec, usage=usage))
+
+    def drain(self, task_id: str = None, timeout: float = 30.0) -> bool:
+        """
+        Block until all records (of the given task, or of every task) are delivered or given up.
+
+        :return: False if the timeout expired with records still pending.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._pending_count(task_id) > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"log_llm drain timed out, {self._pending_count(task_id)} record(s) pending")
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def _pending_count(self, task_id: str = None) -> int:
+        return self._pending[task_id] if task_id is not None else sum(self._pending.values())
+
+    def _run(self):
+        retries: list[tuple[float, int, UsageRecord]] = []  # heap of (retry_at, order, record)
+        order = itertools.count()
+        while True:
+            if retries and retries[0][0] <= time.monotonic():
+                record = heapq.heappop(retries)[2]
+            else:
+                # new records are sent while the failed ones wait for their retry time
+                timeout = max(retries[0][0] - time.monotonic(), 0) if retries else None
+                try:
+                    record = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+            if not self._send(record):
+                record.retry_at = time.monotonic() + self.retry_delay * 2 ** (record.attempts - 1)
+                heapq.heappush(retries, (record.retry_at, next(order), record))
+
+    def _send(self, record: UsageRecord) -> bool:
+        """Send one record. Returns False if it should be retried later."""
+        record.attempts += 1
+        try:
+            self.api.log_llm(
+                task_id=record.task_id,
+                model=record.model,
+                duration_sec=record.duration_sec,
+                usage=record.usage,
+            )
+            self.sent += 1
+        except Exception as e:
+            if record.attempts <= self.max_retries:
+                logger.debug(f"log_llm failed for {record.task_id} (attempt {record.attempts}): {e}")
+                return False
+            self.failed += 1
+            logger.warning(f"log_llm for {record.task_id} dropped after {record.attempts} attempts: {e}")
+        with self._condition:
+            self._pending[record.task_id] -= 1
+            if self._pending[record.task_id] <= 0:
+                del self._pending[record.task_id]
+            self._condition.notify_all()
+        return True
+
+
+_reporters: dict[int, LLMUsageReporter] = {}
+_reporters_lock = threading.Lock()
+
+
+def get_usage_reporter(api: ERC3) -> LLMUsageReporter:
+    """Return the reporter bound to this ERC3 api instance, creating it on first use."""
+    with _reporters_lock:
+        reporter = _reporters.get(id(api))
+        if reporter is None or reporter.api is not api:
+            reporter = LLMUsageReporter(api)
+            _reporters[id(api)] = reporter
+        return reporter
@@ -1,4 +1,5 @@
 """Base agent class for ERC3 agents with automatic LLM logging."""
+import json
 import os
 import time
 from typing import Literal
@@ -8,6 +9,16 @@ from kibernikto.bots.ai_settings import AI_SETTINGS
 from openai._types import NOT_GIVEN
 from openai.types.chat.chat_completion import Choice
 
+from .basket_state import BasketStateInjector
+from .compaction import PromptCompactor
+from .context import find_store_context
+from .dispatch import dispatch
+from erc3_shared.llm_cache import CACHE_HIT_USAGE, cache_key, get_llm_cache
+from erc3_shared.tokens import PROMPT_TOKEN_LIMIT, PROMPT_WARN_RATIO, estimate_prompt_tokens
+from .serialization import encode_payload
+from erc3_shared.tracing import span
+from erc3_shared.usage_reporter import get_usage_reporter
+
 
 class ERC3Agent(KiberniktoAgent):
     """Base agent that automatically logs LLM usage to ERC3 API."""
@@ -17,6 +28,8 @@ class ERC3Agent(KiberniktoAgent):
         self.erc3_api = erc3_api
         self.store_client = self.erc3_api.get_store_client(task)
         self.task = task
+        self.basket_injector = BasketStateInjector()
+        self.compactor = PromptCompactor()
 
     @property
     def default_headers(self):
@@ -60,46 +73,104 @@ class ERC3Agent(KiberniktoAgent):
                     tool_actions.append(f"- {func_name}({func_args})\n  Result: {result}")
         return tool_actions
     
-    def retrieve_basket_state(self) -> str:
+    async def query(self, *args, **kwargs):
+        """One conversation turn of the agent, traced as a span."""
+        with span("turn", "agent", agent=self.label):
+            return await super().query(*args, **kwargs)
+
+    async def fetch_basket(self):
+        """Current basket snapshot. Raises ApiException."""
+        from erc3 import store
+        context = find_store_context()
+        if context is not None and context.task.task_id == self.task.task_id:
+            # shares the snapshot cache with the tools of the task
+            return await context.dispatch(store.Req_ViewBasket())
+        return await dispatch(self.store_client, store.Req_ViewBasket())
+
+    async def retrieve_basket_state(self) -> str:
         """Retrieve the current basket state."""
-        from erc3 import store, ApiException
+        from erc3 import ApiException
         try:
-            basket_result = self.store_client.dispatch(store.Req_ViewBasket())
-            return f"Current Basket State:\n{basket_result.model_dump_json(exclude_none=True, exclude_unset=True, indent=2)}"
+            basket_result = await self.fetch_basket()
+            return f"Current Basket State:\n{encode_payload(basket_result, json_indent=2)}"
         except ApiException:
             return "Basket: Error fetching basket state"
 
     async def _run_for_messages(self, full_prompt, author=NOT_GIVEN,
                                 response_type: Literal['text', 'json_object'] = 'text', model: str = None):
-        """Override to log LLM usage to ERC3 API."""
-        started = time.time()
-
-        # Call parent implementation
-        choice, usage_dict = await super()._run_for_messages(
-            full_prompt=full_prompt,
-            author=author,
-            response_type=response_type,
-            model=model
-        )
-
-        # Log to ERC3 API
-        duration = time.time() - started
-        if usage_dict:
-            from openai.types import CompletionUsage
-            usage = CompletionUsage(
-                prompt_tokens=usage_dict.get('prompt_tokens', 0),
-                completion_tokens=usage_dict.get('completion_tokens', 0),
-                total_tokens=usage_dict.get('total_tokens', 0)
-            )
-
-            self.erc3_api.log_llm(
-                task_id=self.task.task_id,
-                model=model or self.model,
-                duration_sec=duration,
-                usage=usage,
-            )
-
-        return choice, usage_dict
+        """Override to compact the prompt and log LLM usage to ERC3 API."""
+        with span("llm", "llm", agent=self.label, model=model or self.model) as llm_span:
+            started = time.time()
+
+            # old tool results are digested and the prompt kept within the token budget
+            context = find_store_context()
+            compacted = self.compactor.compact(list(full_prompt), context.compaction if context else None)
+
+            # pre-flight check: estimate calibrated by the usage reported for the previous calls
+            estimated = estimate_prompt_tokens(compacted)
+            expected = context.tokens.calibrated(estimated) if context else estimated
+            if expected > PROMPT_TOKEN_LIMIT:
+                print(f"ATTENTION: prompt of {self.label} is ~{expected} tokens (limit {PROMPT_TOKEN_LIMIT}), trimming")
+                budget = PROMPT_TOKEN_LIMIT * estimated // expected
+                compacted = PromptCompactor(token_budget=budget, keep_recent=1).compact(compacted)
+                estimated = estimate_prompt_tokens(compacted)
+            elif expected > PROMPT_TOKEN_LIMIT * PROMPT_WARN_RATIO:
+                print(f"ATTENTION: prompt of {self.label} is ~{expected} tokens, close to the limit {PROMPT_TOKEN_LIMIT}")
+
+            llm_span.set(messages=len(compacted), estimated_tokens=estimated)
+
+            # reruns: byte-identical requests are answered from the disk cache (LLM_CACHE_DIR)
+            cache = get_llm_cache()
+            key = choice = None
+            if cache is not None:
+                key = cache_key(
+                    model=model or self.model,
+                    messages=compacted,
+                    tools=[tool.definition for tool in self.full_config.tools or []],
+                    temperature=self.full_config.temperature,
+                    response_type=response_type,
+                )
+                stored = cache.get(key)
+                if stored is not None:
+                    # no tokens spent: recorded and reported with a usage of 0, like the SGR cached_parse
+                    choice, usage_dict = Choice.model_validate(json.loads(stored)["choice"]), dict(CACHE_HIT_USAGE)
+                    llm_span.set(cache="hit")
+
+            if choice is None:
+                # Call parent implementation
+                choice, usage_dict = await super()._run_for_messages(
+                    full_prompt=compacted,
+                    author=author,
+                    response_type=response_type,
+                    model=model
+                )
+                if key is not None:
+                    cache.put(key, json.dumps({"choice": choice.model_dump(mode="json"), "usage": usage_dict}))
+
+            reported = usage_dict or {}
+            llm_span.set(prompt_tokens=reported.get('prompt_tokens'), completion_tokens=reported.get('completion_tokens'))
+            if context:
+                context.tokens.record(self.label, estimated, usage_dict)
+
+            # Log to ERC3 API
+            duration = time.time() - started
+            if usage_dict:
+                from openai.types import CompletionUsage
+                usage = CompletionUsage(
+                    prompt_tokens=usage_dict.get('prompt_tokens', 0),
+                    completion_tokens=usage_dict.get('completion_tokens', 0),
+                    total_tokens=usage_dict.get('total_tokens', 0)
+                )
+
+                # queued, the background reporter sends it off the critical path
+                get_usage_reporter(self.erc3_api).report(
+                    task_id=self.task.task_id,
+                    model=model or self.model,
+                    duration_sec=duration,
+                    usage=usage,
+                )
+
+            return choice, usage_dict
 
     async def process_tool_calls(self, choice: Choice, original_request_text: str, save_to_history=True, iteration=0,
                                  call_session_id: str = None, recursive_results: list = ()):
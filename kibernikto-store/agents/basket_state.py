@@ -0,0 +1,85 @@
+"""Basket state injected into the agent prompts, sent in full once and as deltas afterwards.
+
+The full snapshot (the "anchor") is kept as a system message in the agent history,
+replacing the previous anchor. Every following LLM call gets a short transient
+message instead: either "unchanged since step N" or the lines and totals that differ
+from the anchor. A new anchor is sent when the old one is no longer in the prompt,
+after a checkout or a failed store call, after a basket read error, and when the
+delta would not be smaller than the full state.
+"""
+import json
+
+from erc3 import ApiException
+
+from .context import find_store_context
+from .serialization import encode, encode_payload, record_payload, to_data
+
+
+def basket_delta(before: dict, after: dict) -> dict:
+    """Fields and basket lines of ``after`` that differ from ``before`` (removed lines get quantity 0)."""
+    delta = {}
+    for key in list(after) + [key for key in before if key not in after]:
+        if key != "items" and before.get(key) != after.get(key):
+            delta[key] = after.get(key)
+    lines_before = {line["sku"]: line for line in before.get("items") or []}
+    lines_after = {line["sku"]: line for line in after.get("items") or []}
+    changed = [line for sku, line in lines_after.items() if lines_before.get(sku) != line]
+    changed += [{"sku": sku, "quantity": 0} for sku in lines_before if sku not in lines_after]
+    if changed:
+        delta["items"] = changed
+    return delta
+
+
+class BasketStateInjector:
+    """Builds the basket state system message of one agent for every LLM call."""
+
+    def __init__(self):
+        self.step = 0
+        self._anchor: dict | None = None  # the full-state message kept in the agent history
+        self._anchor_data: dict | None = None
+        self._anchor_step = 0
+        self._anchor_resets = 0
+        self._failed = False
+
+    async def message(self, agent, full_prompt: list) -> dict:
+        """System message describing the basket for this call; a new anchor is also stored in agent.messages."""
+        self.step += 1
+        try:
+            snapshot = await agent.fetch_basket()
+        except ApiException:
+            self._failed = True
+            return {'role': 'system', 'content': "Basket: Error fetching basket state"}
+
+        data = to_data(snapshot)
+        context = find_store_context()
+        resets = context.basket.resets if context is not None else 0
+        if self._failed or resets != self._anchor_resets or self._anchor not in full_prompt:
+            return self._new_anchor(agent, data, resets)
+
+        full_json = json.dumps(data, ensure_ascii=False, indent=2)
+        if data == self._anchor_data:
+            content = f"Basket State at step {self.step}: unchanged since step {self._anchor_step} (full state above)."
+            record_payload(full_json, content)
+            return {'role': 'system', 'content': content}
+
+        delta = basket_delta(self._anchor_data, data)
+        if len(json.dumps(delta)) >= len(json.dumps(data)):
+            return self._new_anchor(agent, data, resets)
+        content = (f"Basket State at step {self.step}, changes since the full state of step {self._anchor_step} "
+                   f"(removed lines have quantity 0):\n{encode(delta)}")
+        record_payload(full_json, content)
+        return {'role': 'system', 'content': content}
+
+    def _new_anchor(self, agent, data: dict, resets: int) -> dict:
+        message = {
+            'role': 'system',
+            'content': f"Current Basket State (step {self.step}):\n{encode_payload(data, json_indent=2)}",
+        }
+        if self._anchor in agent.messages:
+            agent.messages.remove(self._anchor)
+        # later calls see it in their prompt through the history
+        agent.messages.append(message)
+        self._anchor, self._anchor_data, self._anchor_step = message, data, self.step
+        self._anchor_resets = resets
+        self._failed = False
+        return message
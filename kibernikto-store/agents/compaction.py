@@ -0,0 +1,173 @@
+"""Compaction of the prompt sent by the ERC3 agents.
+
+With ``tools_with_history`` every tool result stays in the history and is sent again
+on each LLM call. Before a call the outgoing prompt (never the history itself) is
+compacted in three steps:
+
+1. tool results older than the most recent ``keep_recent`` ones are replaced by a
+   digest: product listings keep only the products mentioned later in the
+   conversation plus a summary, other results are cut to their beginning;
+2. the most recent results stay verbatim;
+3. if the prompt is still above the token budget, the oldest turns are dropped
+   (an assistant tool call always together with its results). System messages -
+   the system prompt and the basket state - and the first user message are kept.
+
+Both steps work in fixed blocks so that the start of the prompt stays byte-identical
+from one call to the next and the provider's prompt prefix cache keeps hitting: results
+are digested ``block`` at a time and a digest never changes once made, and dropping goes
+below the budget (to ``COMPACTION_DROP_TO`` of it) and remembers what was dropped. The
+price is up to ``block - 1`` more verbatim results and some more context dropped at once.
+"""
+import csv
+import json
+import os
+import re
+from collections import Counter
+
+from .serialization import encode
+from erc3_shared.tokens import message_tokens
+
+# Token budget of the whole prompt, 0 disables dropping old turns
+COMPACTION_TOKEN_BUDGET = int(os.getenv("COMPACTION_TOKEN_BUDGET", "24000"))
+# Number of most recent tool results sent verbatim
+COMPACTION_KEEP_RECENT = int(os.getenv("COMPACTION_KEEP_RECENT", "6"))
+# Number of tool results digested together, the prompt prefix only changes when a block is full
+COMPACTION_BLOCK = int(os.getenv("COMPACTION_BLOCK", "4"))
+# Share of the token budget the prompt is cut down to once it is over the budget
+COMPACTION_DROP_TO = float(os.getenv("COMPACTION_DROP_TO", "0.75"))
+# Characters kept of an old tool result that is not a product listing
+DIGEST_CHARS = 300
+
+_TABLE_HEADER = re.compile(r"^(\s*)(\w+)\[(\d+)\]\{(.*)\}:$")
+
+
+def _products(content: str) -> list[dict] | None:
+    """Product records of a list_products/search_products result (JSON or table encoded), None if there are none."""
+    try:
+        data = json.loads(content)
+        if isinstance(data, dict) and isinstance(data.get("products"), list):
+            return data["products"]
+        return None
+    except ValueError:
+        pass
+    lines = content.splitlines()
+    for n, line in enumerate(lines):
+        header = _TABLE_HEADER.match(line)
+        if header and header.group(2) == "products":
+            columns = header.group(4).split(",")
+            rows = [row.strip() for row in lines[n + 1:n + 1 + int(header.group(3))]]
+            return [dict(zip(columns, map(_cell, values))) for values in csv.reader(rows)]
+    return None
+
+
+def _cell(value: str):
+    """Value of a table cell: numbers, booleans and null are restored, anything else stays text."""
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _mentioned(sku: str, text: str) -> bool:
+    return re.search(rf"(?<![\w-]){re.escape(sku)}(?![\w-])", text) is not None
+
+
+def _digest(content: str, name: str, later_text: str) -> str:
+    products = _products(content)
+    if products is None or not all("sku" in p for p in products):
+        if len(content) <= DIGEST_CHARS:
+            return content
+        return f"[{name} result from earlier, shortened] {content[:DIGEST_CHARS]}..."
+    mentioned = [p for p in products if _mentioned(str(p["sku"]), later_text)]
+    prices = [float(p["price"]) for p in products if p.get("price") not in (None, "")]
+    summary = {
+        "products_listed": len(products),
+        "price_range": [min(prices), max(prices)] if prices else None,
+        "products": mentioned,
+    }
+    return (f"[{name} result from earlier, only the products mentioned later are kept; "
+            f"call the tool again for the full list]\n{encode(summary)}")
+
+
+class PromptCompactor:
+    """
+    Compacts the outgoing prompt of one agent. Keeps the digests made and the number of
+    turns dropped, so one instance has to be used for the whole history of the agent.
+    """
+
+    def __init__(self, token_budget: int = COMPACTION_TOKEN_BUDGET, keep_recent: int = COMPACTION_KEEP_RECENT,
+                 block: int = COMPACTION_BLOCK):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.block = max(block, 1)
+        self._digests: dict[str, str] = {}  # tool_call_id -> digest, frozen once made
+        self._dropped_units = 0  # oldest droppable turns left out of every prompt
+
+    def compact(self, messages: list[dict], stats: Counter | None = None) -> list[dict]:
+        """Compacted copy of the prompt; stats (if given) are updated with tokens before/after."""
+        tokens_before = sum(map(message_tokens, messages))
+        compacted = self._digest_old_results(messages)
+        compacted, dropped = self._enforce_budget(compacted)
+        if stats is not None:
+            stats.update({
+                "calls": 1,
+                "tokens_before": tokens_before,
+                "tokens_after": sum(map(message_tokens, compacted)),
+                "messages_dropped": dropped,
+            })
+        return compacted
+
+    def _digest_old_results(self, messages: list[dict]) -> list[dict]:
+        tool_names = {tool_call['id']: tool_call['function']['name']
+                      for message in messages for tool_call in message.get('tool_calls') or []}
+        results = [n for n, message in enumerate(messages) if message.get('role') == 'tool']
+        # only whole blocks are digested, the boundary moves block results at a time
+        old_count = max(len(results) - self.keep_recent, 0) // self.block * self.block
+        compacted = list(messages)
+        for n in results[:old_count]:
+            message = messages[n]
+            call_id = message.get('tool_call_id')
+            digest = self._digests.get(call_id)
+            if digest is None:
+                # what the conversation said after this result: user requests and assistant turns
+                later_text = " ".join(
+                    (m.get('content') or "") + " ".join(tc['function']['arguments'] for tc in m.get('tool_calls') or [])
+                    for m in messages[n + 1:] if m.get('role') in ('user', 'assistant'))
+                name = tool_names.get(call_id, "tool")
+                digest = _digest(message.get('content') or "", name, later_text)
+                if call_id:
+                    self._digests[call_id] = digest
+            compacted[n] = {**message, 'content': digest}
+        return compacted
+
+    def _enforce_budget(self, messages: list[dict]) -> tuple[list[dict], int]:
+        if not self.token_budget:
+            return messages, 0
+        total = sum(map(message_tokens, messages))
+        if total <= self.token_budget and not self._dropped_units:
+            return messages, 0
+
+        first_user = next((n for n, m in enumerate(messages) if m.get('role') == 'user'), None)
+        # turns that may be dropped: an assistant message with its tool results, or a single message
+        units, n = [], 0
+        while n < len(messages):
+            end = n + 1
+            if messages[n].get('tool_calls'):
+                while end < len(messages) and messages[end].get('role') == 'tool':
+                    end += 1
+            if messages[n].get('role') != 'system' and n != first_user and messages[n].get('role') != 'tool':
+                units.append((n, end))
+            n = end
+
+        dropped = set()
+        target = self.token_budget
+        for count, (start, end) in enumerate(units[:-1]):  # the latest turn always stays
+            if count >= self._dropped_units:
+                if total <= target:
+                    break
+                # over the budget: cut well below it, so the next calls drop nothing new
+                target = self.token_budget * COMPACTION_DROP_TO
+                self._dropped_units = count + 1
+            dropped.update(range(start, end))
+            total -= sum(message_tokens(messages[i]) for i in range(start, end))
+        return [m for i, m in enumerate(messages) if i not in dropped], len(dropped)
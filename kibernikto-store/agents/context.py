@@ -0,0 +1,148 @@
+"""Task-scoped store context shared by the agent tools.
+
+Every task gets its own StoreContext stored in a ContextVar, so tasks running
+concurrently (asyncio tasks, threads started with a copied context) never see
+each other's store client, recursion counter or checkout flags.
+"""
+import asyncio
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from erc3 import TaskInfo, ERC3, StoreClient, store
+
+from .dispatch import dispatch as dispatch_async
+from erc3_shared.tokens import TokenLedger
+
+if TYPE_CHECKING:
+    from .serialization import PayloadStats
+    from .store_agent.tools.catalog import ProductCatalog
+    from .store_agent.tools.coupon_engine import CouponEngine
+    from .store_agent.tools.shadow_pricing import ShadowPricer
+
+# Store requests that change the basket and therefore outdate its snapshot
+MUTATING_REQUESTS = (
+    store.Req_AddProductToBasket,
+    store.Req_RemoveItemFromBasket,
+    store.Req_ApplyCoupon,
+    store.Req_RemoveCoupon,
+    store.Req_CheckoutBasket,
+)
+
+
+class BasketCache:
+    """Last Req_ViewBasket snapshot, valid until the next basket mutation."""
+
+    def __init__(self):
+        self.version = 0  # bumped by every mutating store call
+        self.resets = 0  # bumped by checkouts and failed mutations: derived basket views must start over
+        self.hits = 0
+        self.fetches = 0
+        self._snapshot = None
+        self._snapshot_version = -1
+        self.listeners = []  # called with every snapshot read from the store
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self.version += 1
+
+    async def get(self, fetch):
+        """Return the snapshot of the current version, calling ``fetch()`` at most once per mutation."""
+        async with self._lock:
+            if self._snapshot_version == self.version:
+                self.hits += 1
+                return self._snapshot
+            version = self.version
+            snapshot = await fetch()
+            self.fetches += 1
+            for listener in self.listeners:
+                listener(snapshot)
+            if version == self.version:
+                # not outdated by a mutation that finished while we were reading
+                self._snapshot, self._snapshot_version = snapshot, version
+            return snapshot
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "fetches": self.fetches, "mutations": self.version}
+
+
+@dataclass
+class StoreContext:
+    """Everything a tool needs to know about the task it is working on."""
+    store_client: StoreClient
+    erc3_api: ERC3
+    task: TaskInfo
+    # store agent tool-call recursion tracking
+    recursion_depth: int = 0
+    max_depth: int = 15
+    # store agent checkout double-confirmation flag
+    checkout_confirmation_needed: bool = True
+    # product listing cache, created by the list_products tool
+    catalog: "ProductCatalog | None" = None
+    # coupon probe memo, created by evaluate_coupons
+    coupon_engine: "CouponEngine | None" = None
+    # coupon rules inferred from basket snapshots, registered by set_store_context
+    shadow_pricer: "ShadowPricer | None" = None
+    # sizes of the payloads sent to the LLM, created by encode_payload
+    payloads: "PayloadStats | None" = None
+    # prompt compaction counters of the task's agents
+    compaction: Counter = field(default_factory=Counter)
+    # estimated and reported LLM tokens of the task's agents
+    tokens: TokenLedger = field(default_factory=TokenLedger)
+    # basket snapshot shared by the tools and the basket state injectors
+    basket: BasketCache = field(default_factory=BasketCache)
+
+    async def dispatch(self, request):
+        """
+        Send a request to the store without blocking the event loop.
+        Basket views are served from the snapshot cache until a mutating request invalidates it.
+        """
+        if isinstance(request, store.Req_ViewBasket):
+            return await self.basket.get(lambda: dispatch_async(self.store_client, request))
+        if not isinstance(request, MUTATING_REQUESTS):
+            return await dispatch_async(self.store_client, request)
+        try:
+            result = await dispatch_async(self.store_client, request)
+        except Exception:
+            self.basket.resets += 1
+            raise
+        else:
+            if isinstance(request, store.Req_CheckoutBasket):
+                self.basket.resets += 1
+            return result
+        finally:
+            # even a failed call may have changed the basket
+            self.basket.invalidate()
+
+
+_store_context: ContextVar[StoreContext | None] = ContextVar("store_context", default=None)
+
+
+def set_store_context(store_client, erc3_api, task) -> StoreContext:
+    """Set the store client context for tool execution in the current task"""
+    current = _store_context.get()
+    if current is not None and current.task.task_id == task.task_id and current.store_client is store_client:
+        # store and customer agents share the same context within one task
+        return current
+    context = StoreContext(store_client=store_client, erc3_api=erc3_api, task=task)
+    # imported here, the tools package imports this module
+    from .store_agent.tools.shadow_pricing import ShadowPricer
+    context.shadow_pricer = ShadowPricer()
+    # learns the coupon rules from every basket snapshot read in the task
+    context.basket.listeners.append(context.shadow_pricer.observe)
+    _store_context.set(context)
+    return context
+
+
+def find_store_context() -> StoreContext | None:
+    """Get the store context of the current task, or None if none was set."""
+    return _store_context.get()
+
+
+def get_store_context() -> StoreContext:
+    """Get the store context of the current task. Raises RuntimeError if none was set."""
+    context = _store_context.get()
+    if context is None:
+        raise RuntimeError("Store context is not set, call set_store_context() before running the tools")
+    return context
@@ -4,12 +4,13 @@ import traceback
 
 from erc3 import TaskInfo, ERC3, store, ApiException
 from kibernikto.interactors import OpenAiExecutorConfig
-from openai import AsyncOpenAI, OpenAI
+from openai import AsyncOpenAI
 from typing import Literal
 from openai._types import NOT_GIVEN
 from pydantic import BaseModel, Field
 
 from ..base import ERC3Agent
+from erc3_shared.usage_reporter import get_usage_reporter
 from .tools import checkout_basket_toolbox
 
 SYSTEM_PROMPT_TEMPLATE = """You are a customer in OnlineStore interacting with a store assistant.
@@ -81,14 +82,9 @@ class CustomerAgent(ERC3Agent):
                                 response_type: Literal['text', 'json_object'] = 'text', model: str = None):
         """Override to inject current basket state before each decision."""
         # return await super()._run_for_messages(full_prompt, author, response_type, model)
-        basket_state = super().retrieve_basket_state()
-        # Inject basket state as system message
+        # Inject basket state as system message (full once, then only the changes)
         messages_to_send = list(full_prompt)
-        system_state = {
-            'role': 'system',
-            'content': basket_state
-        }
-        messages_to_send.append(system_state)
+        messages_to_send.append(await self.basket_injector.message(self, full_prompt))
 
         # Call parent implementation (which handles LLM logging)
         return await super()._run_for_messages(
@@ -134,10 +130,11 @@ class DetailedRequest(BaseModel):
         return f"{text}"
 
 
-def create_customer_agent(erc3_api: ERC3, task: TaskInfo, client: AsyncOpenAI = None):
+async def create_customer_agent(erc3_api: ERC3, task: TaskInfo, client: AsyncOpenAI = None):
     """Create a CustomerAgent configured as supervisor with checkout capability"""
     # Format system prompt with task text
-    formalizer_client = OpenAI()
+    # async, so formalizing one task does not stall the other tasks of the event loop
+    formalizer_client = client or AsyncOpenAI()
     system_prompt = SYSTEM_PROMPT_TEMPLATE.format(task_text=task.task_text)
 
     first_step = (f"You first preparation task is to formalize the base request (base_text):\n {task.task_text}\n "
@@ -154,7 +151,7 @@ def create_customer_agent(erc3_api: ERC3, task: TaskInfo, client: AsyncOpenAI =
     formalizer_client_started = time.time()
     detailed_request_text: str = task.task_text
     try:
-        completion = formalizer_client.beta.chat.completions.parse(
+        completion = await formalizer_client.beta.chat.completions.parse(
             model=details_model,
             response_format=DetailedRequest,
             messages=log,
@@ -167,7 +164,7 @@ def create_customer_agent(erc3_api: ERC3, task: TaskInfo, client: AsyncOpenAI =
                 }
             }
         )
-        erc3_api.log_llm(
+        get_usage_reporter(erc3_api).report(
             task_id=task.task_id,
             model=details_model,  # must match slug from OpenRouter
             duration_sec=time.time() - formalizer_client_started,
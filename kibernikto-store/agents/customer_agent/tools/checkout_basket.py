@@ -1,14 +1,19 @@
 from erc3 import store, ApiException
 from kibernikto.interactors.tools import Toolbox
 
+from ...serialization import encode_payload
+from erc3_shared.tracing import traced
 
+
+@traced("tool")
 async def checkout_basket(confirmed: bool) -> str | dict:
     """Complete the purchase and checkout the basket"""
-    from . import _store_client
+    from . import get_store_context
+    context = get_store_context()
     print(f"[TOOL] checkout_basket()")
     try:
-        result = _store_client.dispatch(store.Req_CheckoutBasket())
-        output = result.model_dump_json(exclude_none=True, exclude_unset=True)
+        result = await context.dispatch(store.Req_CheckoutBasket())
+        output = encode_payload(result)
         print(f"[TOOL] ✓ checkout_basket: {output}")
         return {"output": output, "comment": "the basket was checked out successfully. Clearing. Task complete! STOP THE CHAT AND RETURN TASK_COMPLETE!"}
     except ApiException as e:
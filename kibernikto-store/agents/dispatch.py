@@ -0,0 +1,31 @@
+"""Non-blocking access to the synchronous ERC3 clients.
+
+ERC3 and StoreClient calls are plain blocking HTTP requests. Running them on a
+dedicated thread pool lets tools and agents of different tasks overlap their
+network waits instead of stalling the event loop.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from erc3_shared.tracing import span
+
+# Size of the pool shared by all tasks of the process
+STORE_DISPATCH_WORKERS = int(os.getenv("STORE_DISPATCH_WORKERS", "32"))
+
+_executor = ThreadPoolExecutor(max_workers=STORE_DISPATCH_WORKERS, thread_name_prefix="erc3-dispatch")
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the dispatch pool, keeping the caller's context variables."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(_executor, call)
+
+
+async def dispatch(client, request):
+    """Async version of ``client.dispatch(request)`` for StoreClient / ErcClient."""
+    with span("dispatch", "store", request=type(request).__name__):
+        return await run_blocking(client.dispatch, request)
@@ -0,0 +1,160 @@
+"""Compact encodings of the store payloads sent to the LLM.
+
+Tool results and basket snapshots are mostly lists of uniform records (products,
+basket lines). Plain JSON repeats every key on every row; the ``table`` format writes
+the keys once as a header and one comma-separated row per record::
+
+    products[2]{sku,name,available,price}:
+      gpu-1,GPU X,3,499.0
+      cpu-2,"CPU, boxed",0,199.0
+    next_offset: 10
+
+The format is chosen with the PAYLOAD_FORMAT environment variable (json, compact_json,
+table) and new ones can be added with register_format(). Every encoded payload is
+measured against the plain JSON it replaces, the savings are kept per task.
+"""
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from .context import find_store_context
+from erc3_shared.tokens import estimate_tokens
+
+PAYLOAD_FORMAT = os.getenv("PAYLOAD_FORMAT", "table")
+
+_formats: dict[str, Callable[[Any], str]] = {}
+
+
+def register_format(name: str, encoder: Callable[[Any], str]):
+    """Make an encoder of JSON-compatible data selectable by name."""
+    _formats[name] = encoder
+
+
+@dataclass
+class PayloadStats:
+    """Size of the payloads of one task, as encoded and as plain JSON."""
+    payloads: int = 0
+    json_tokens: int = 0
+    encoded_tokens: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.json_tokens - self.encoded_tokens
+
+    def stats(self) -> dict:
+        return {
+            "payloads": self.payloads,
+            "json_tokens": self.json_tokens,
+            "encoded_tokens": self.encoded_tokens,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+def to_data(value: Any) -> Any:
+    """JSON-compatible data of pydantic responses (unset and None fields dropped) and plain values."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True, exclude_unset=True)
+    if isinstance(value, dict):
+        return {key: to_data(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_data(item) for item in value]
+    return value
+
+
+def encode_payload(value: Any, json_indent: int | None = None, format: str | None = None) -> str:
+    """
+    Encode a payload for the LLM in the configured format.
+    :param json_indent: indentation of the plain JSON this payload used to be sent as (for the savings)
+    """
+    data = to_data(value)
+    encoded = encode(data, format)
+    record_payload(json.dumps(data, ensure_ascii=False, indent=json_indent), encoded)
+    return encoded
+
+
+def encode(data: Any, format: str | None = None) -> str:
+    """Encode JSON-compatible data in the configured format, without counting it."""
+    return _formats[format or PAYLOAD_FORMAT](data)
+
+
+def record_payload(baseline: str, sent: str):
+    """Count a payload of the current task: the text actually sent and the plain JSON it replaces."""
+    context = find_store_context()
+    if context is None:
+        return
+    if context.payloads is None:
+        context.payloads = PayloadStats()
+    context.payloads.payloads += 1
+    context.payloads.json_tokens += estimate_tokens(baseline)
+    context.payloads.encoded_tokens += estimate_tokens(sent)
+
+
+# ------------------------------------------------------------------
+# Formats
+# ------------------------------------------------------------------
+def _json(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _compact_json(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+# strings that would read as another type, or break the row/key syntax
+_NEEDS_QUOTES = re.compile(r'^$|^\s|\s$|[,:"\n\[\]{}]|^(true|false|null|-?\d[\d.eE+-]*)$')
+
+
+def _scalar(value: Any) -> str:
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False) if _NEEDS_QUOTES.search(value) else value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _is_scalar(value: Any) -> bool:
+    return not isinstance(value, (dict, list))
+
+
+def _table_columns(items: list) -> list[str] | None:
+    """Header of a list of flat records, None if the list is not tabular."""
+    if not items or not all(isinstance(item, dict) and all(map(_is_scalar, item.values())) for item in items):
+        return None
+    columns = []
+    for item in items:
+        columns.extend(key for key in item if key not in columns)
+    return columns
+
+
+def _table_lines(data: Any, key: str, pad: str) -> list[str]:
+    label = f"{pad}{key}" if key else pad
+    if isinstance(data, dict):
+        lines = [f"{label}:"] if key else []
+        inner = pad + "  " if key else pad
+        for name, item in data.items():
+            lines.extend(_table_lines(item, _scalar(str(name)), inner))
+        return lines
+    if isinstance(data, list):
+        columns = _table_columns(data)
+        if columns:
+            rows = [",".join("" if column not in item else _scalar(item[column]) for column in columns)
+                    for item in data]
+            return [f"{label}[{len(data)}]{{{','.join(columns)}}}:"] + [f"{pad}  {row}" for row in rows]
+        if not data:
+            return [f"{label}[0]:"]
+        if all(map(_is_scalar, data)):
+            return [f"{label}[{len(data)}]: {','.join(map(_scalar, data))}"]
+        lines = [f"{label}[{len(data)}]:"]
+        for item in data:
+            lines.extend(_table_lines(item, "-", pad + "  "))
+        return lines
+    return [f"{label}: {_scalar(data)}" if key else f"{pad}{_scalar(data)}"]
+
+
+def _table(data: Any) -> str:
+    return "\n".join(_table_lines(data, "", ""))
+
+
+register_format("json", _json)
+register_format("compact_json", _compact_json)
+register_format("table", _table)
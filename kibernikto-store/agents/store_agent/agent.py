@@ -8,7 +8,9 @@ from pydantic import BaseModel
 from ..base import ERC3Agent
 from .tools import (
     list_products_toolbox,
+    search_products_toolbox,
     set_basket_state_toolbox,
+    optimize_basket_toolbox,
     view_basket_toolbox,
     add_product_to_basket_toolbox,
     remove_item_from_basket_toolbox,
@@ -29,15 +31,19 @@ c. Continue: "TASK_CONTINUE: [explanation]" -- need more time to complete reques
 
 **Guidelines**
 - Use list_products to browse available products. If next_offset is returned, more products are available.
+- Use search_products to find products by name words, SKU prefix, price or availability instead of listing the whole catalog.
 - Current basket state is automatically provided to you before each decision. You can see items, quantities, prices, applied coupons, and totals.
 - Products are identified by SKU (not name). Always use the SKU from list_products when adding items.
 - Use check_should_continue every 5 steps to avoid getting stuck in loops. If warned about recursion depth, wrap up immediately.
 - use set_basket_state to make the basket look as u want.
+- optimize_basket does not change the basket: apply its best_basket with set_basket_state.
+- Tool results and the basket state may come as compact tables: `name[N]{col1,col2,...}:` followed by one comma-separated row per entry.
 
 **Coupons**
 - Only one coupon can be active at a time!! 
 - Applying a new coupon replaces the current one!! 
 - If you have additional coupon info, check different combinations of coupons and products/quantities to see which ones work best.
+- Use optimize_basket to compare the coupons over product quantity combinations in one call instead of applying them one by one.
 - Always try to use the best available coupon.
 - One coupon gives a discount on all products in the basket 
 - There is no any coupons except provided! If no coupons provided nothing should be applied! Never invent coupons!
@@ -84,16 +90,9 @@ class StoreAgent(ERC3Agent):
         # Increment depth counter before making call
         increment_depth()
 
-        # Get current basket state
-        basket_state = self.retrieve_basket_state()
-
-        # Inject basket state as system message
+        # Inject basket state as system message (full once, then only the changes)
         messages_to_send = list(full_prompt)
-        system_state = {
-            'role': 'system',
-            'content': basket_state
-        }
-        messages_to_send.append(system_state)
+        messages_to_send.append(await self.basket_injector.message(self, full_prompt))
 
         iter = get_depth()
         if iter > self.full_config.tool_call_hole_deepness - 4:
@@ -130,8 +129,10 @@ def create_store_agent(erc3_api: ERC3, task: TaskInfo, client: AsyncOpenAI = Non
         # model="anthropic/claude-haiku-4.5",
         tools=[
             list_products_toolbox,
+            search_products_toolbox,
             # view_basket_toolbox,  # Commented out - basket state is automatically injected as system message
             set_basket_state_toolbox,
+            optimize_basket_toolbox,
             # add_product_to_basket_toolbox,
             # remove_item_from_basket_toolbox,
             # evaluate_coupons_toolbox,
@@ -1,24 +1,29 @@
 from erc3 import store, ApiException
 from kibernikto.interactors.tools import Toolbox
 
+from ...serialization import encode_payload
+from erc3_shared.tracing import traced
 
+
+@traced("tool")
 async def add_product_to_basket(sku: str, quantity: int) -> str | dict:
     """Add a product to the basket"""
-    from . import _store_client
+    from . import get_store_context
+    context = get_store_context()
     print(f"[TOOL] add_product_to_basket(sku='{sku}', quantity={quantity})")
     try:
-        result = _store_client.dispatch(
+        result = await context.dispatch(
             store.Req_AddProductToBasket(sku=sku, quantity=quantity)
         )
         output = result.model_dump_json(exclude_none=True, exclude_unset=True)
 
-        basket_result = _store_client.dispatch(store.Req_ViewBasket())
+        basket_result = await context.dispatch(store.Req_ViewBasket())
         result_dict = {
-            'updated_basket': basket_result.model_dump_json(exclude_none=True, exclude_unset=True),
-            'output': output
+            'updated_basket': basket_result,
+            'output': result
         }
         print(f"[TOOL] ✓ add_product_to_basket: {output}")
-        return result_dict
+        return encode_payload(result_dict)
     except ApiException as e:
         error_msg = f"Error: {e.api_error.error} - {e.detail}"
         print(f"[TOOL] ✗ add_product_to_basket: {error_msg}")
@@ -1,25 +1,30 @@
 from erc3 import store, ApiException
 from kibernikto.interactors.tools import Toolbox
 
+from ...serialization import encode_payload
+from erc3_shared.tracing import traced
 
+
+@traced("tool")
 async def apply_coupon(coupon: str):
     """Apply a coupon code to get a discount. Only one coupon can be active at a time."""
-    from . import _store_client
+    from . import get_store_context
+    context = get_store_context()
     print(f"[TOOL] apply_coupon(coupon='{coupon}')")
     try:
-        result = _store_client.dispatch(
+        result = await context.dispatch(
             store.Req_ApplyCoupon(coupon=coupon)
         )
         output = result.model_dump_json(exclude_none=True, exclude_unset=True)
 
-        basket_result = _store_client.dispatch(store.Req_ViewBasket())
+        basket_result = await context.dispatch(store.Req_ViewBasket())
         result_dict = {
-            'updated_basket': basket_result.model_dump_json(exclude_none=True, exclude_unset=True),
-            'output': output,
+            'updated_basket': basket_result,
+            'output': result,
             'coupon': coupon
         }
         print(f"[TOOL] ✓ apply_coupon: {result_dict}")
-        return result_dict
+        return encode_payload(result_dict)
     except ApiException as e:
         error_msg = f"Error: {e.api_error.error} - {e.detail}"
         print(f"[TOOL] ✗ apply_coupon: {error_msg}")
@@ -0,0 +1,97 @@
+"""Minimal set of store operations turning one basket into another."""
+from dataclasses import dataclass
+from typing import Literal
+
+from erc3 import store
+
+
+@dataclass(frozen=True)
+class BasketOp:
+    """One mutating store call."""
+    kind: Literal["add", "remove", "apply_coupon", "remove_coupon"]
+    sku: str | None = None
+    quantity: int = 0
+    coupon: str | None = None
+
+    def request(self):
+        if self.kind == "add":
+            return store.Req_AddProductToBasket(sku=self.sku, quantity=self.quantity)
+        if self.kind == "remove":
+            return store.Req_RemoveItemFromBasket(sku=self.sku, quantity=self.quantity)
+        if self.kind == "apply_coupon":
+            return store.Req_ApplyCoupon(coupon=self.coupon)
+        return store.Req_RemoveCoupon()
+
+    def inverse(self, coupon_before: str | None) -> "BasketOp":
+        """Operation undoing this one, given the coupon that was applied before it."""
+        if self.kind == "add":
+            return BasketOp("remove", sku=self.sku, quantity=self.quantity)
+        if self.kind == "remove":
+            return BasketOp("add", sku=self.sku, quantity=self.quantity)
+        if coupon_before:
+            return BasketOp("apply_coupon", coupon=coupon_before)
+        return BasketOp("remove_coupon")
+
+    def describe(self) -> str:
+        if self.kind in ("add", "remove"):
+            return f"{self.kind} {self.quantity} x {self.sku}"
+        if self.kind == "apply_coupon":
+            return f"apply coupon {self.coupon}"
+        return "remove coupon"
+
+
+def basket_quantities(snapshot) -> dict[str, int]:
+    """SKU -> quantity of a Req_ViewBasket response."""
+    quantities: dict[str, int] = {}
+    for line in snapshot.items or []:
+        quantities[line.sku] = quantities.get(line.sku, 0) + line.quantity
+    return quantities
+
+
+def basket_key(quantities: dict[str, int]) -> frozenset:
+    """Hashable basket contents, zero quantities ignored."""
+    return frozenset((sku, qty) for sku, qty in quantities.items() if qty > 0)
+
+
+def item_quantities(items) -> dict[str, int]:
+    """SKU -> quantity of blueprint items (anything with sku/quantity), duplicate SKUs are summed."""
+    quantities: dict[str, int] = {}
+    for item in items:
+        quantities[item.sku] = quantities.get(item.sku, 0) + item.quantity
+    return quantities
+
+
+def plan_basket_ops(current: dict[str, int], current_coupon: str | None,
+                    target: dict[str, int], target_coupon: str | None) -> list[BasketOp]:
+    """
+    Operations needed to go from the current basket to the target one.
+    Removals go first (they free stock), then additions, then the coupon change.
+    A coupon that is already applied and wanted stays in place.
+    """
+    removals, additions = [], []
+    for sku in sorted(current.keys() | target.keys()):
+        delta = target.get(sku, 0) - current.get(sku, 0)
+        if delta < 0:
+            removals.append(BasketOp("remove", sku=sku, quantity=-delta))
+        elif delta > 0:
+            additions.append(BasketOp("add", sku=sku, quantity=delta))
+
+    ops = removals + additions
+    if target_coupon != current_coupon:
+        if target_coupon:
+            # applying a new coupon replaces the current one
+            ops.append(BasketOp("apply_coupon", coupon=target_coupon))
+        else:
+            ops.append(BasketOp("remove_coupon"))
+    return ops
+
+
+def rebuild_op_count(current: dict[str, int], current_coupon: str | None,
+                     target: dict[str, int], target_coupon: str | None) -> int:
+    """Store calls of the clear-everything-and-rebuild approach: view, removals, coupon removal, adds, apply."""
+    calls = 1 + len(current) + len(target)
+    if current and current_coupon:
+        calls += 1
+    if target_coupon:
+        calls += 1
+    return calls
@@ -0,0 +1,167 @@
+"""Per-task cache of the store product catalog."""
+import bisect
+import math
+import re
+import weakref
+
+from . import get_store_context
+
+
+class ProductCatalog:
+    """Products listed so far in the task's store, keyed by their listing offset."""
+
+    def __init__(self):
+        self.products: dict[int, object] = {}  # offset -> store product
+        self.end: int | None = None  # first offset past the last product, once the last page was seen
+        self.page_limit: int | None = None  # maximum page size, known once the store API rejected a bigger one
+        self.page_size: int | None = None  # biggest page size the store API accepted so far
+        self.hits = 0
+        self.misses = 0
+        self.api_calls = 0
+        self.api_calls_saved = 0
+        self._index: CatalogIndex | None = None
+
+    def covers(self, offset: int, count: int) -> bool:
+        """True if every product of the window is known (or the window runs past the end of the catalog)."""
+        stop = offset + count if self.end is None else min(offset + count, self.end)
+        return all(i in self.products for i in range(offset, stop))
+
+    def slice(self, offset: int, count: int) -> list:
+        stop = offset + count if self.end is None else min(offset + count, self.end)
+        return [self.products[i] for i in range(offset, stop) if i in self.products]
+
+    def next_offset(self, offset: int, count: int) -> int | None:
+        """Offset to continue listing from after the window, None if the catalog ends inside it."""
+        stop = offset + count
+        for i in range(offset, stop if self.end is None else min(stop, self.end)):
+            if i not in self.products:
+                return i
+        if self.end is not None and stop >= self.end:
+            return None
+        return stop
+
+    def store_page(self, offset: int, products: list, next_offset: int | None):
+        if products:
+            self._index = None
+        for i, product in enumerate(products):
+            self.products[offset + i] = product
+        if next_offset is None:
+            end = offset + len(products)
+            self.end = end if self.end is None else min(self.end, end)
+
+    def record_hit(self, count: int):
+        self.hits += 1
+        if self.page_size:
+            self.api_calls_saved += math.ceil(count / self.page_size)
+
+    def refresh(self):
+        """Forget the listed products (availability may have changed), keep the learned page sizes."""
+        self.products.clear()
+        self.end = None
+        self._index = None
+
+    @property
+    def complete(self) -> bool:
+        """True once every product up to the end of the catalog is known."""
+        return self.end is not None and self.covers(0, self.end)
+
+    def index(self) -> "CatalogIndex":
+        """Search index over the known products, rebuilt after new pages arrive."""
+        if self._index is None:
+            self._index = CatalogIndex(self.products)
+        return self._index
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "api_calls": self.api_calls,
+            "api_calls_saved": self.api_calls_saved,
+            "products_cached": len(self.products),
+        }
+
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class CatalogIndex:
+    """Name token and SKU prefix lookup over the cached products."""
+
+    def __init__(self, products: dict[int, object]):
+        self.products = [products[offset] for offset in sorted(products)]
+        self.tokens = sorted({(token, n) for n, p in enumerate(self.products) for token in tokenize(p.name)})
+        self.skus = sorted((p.sku.lower(), n) for n, p in enumerate(self.products))
+
+    @staticmethod
+    def _prefixed(pairs: list[tuple[str, int]], prefix: str) -> set[int]:
+        """Positions of the entries whose key starts with prefix (pairs are sorted by key)."""
+        found = set()
+        for key, n in pairs[bisect.bisect_left(pairs, (prefix, -1)):]:
+            if not key.startswith(prefix):
+                break
+            found.add(n)
+        return found
+
+    def search(self, query: str | None = None, sku_prefix: str | None = None,
+               min_price: float | None = None, max_price: float | None = None,
+               min_available: int | None = None) -> list:
+        """
+        Products matching every given criterion, in catalog order.
+        Every query word has to match the start of a word of the product name.
+        """
+        matches = set(range(len(self.products)))
+        for word in tokenize(query or ""):
+            matches &= self._prefixed(self.tokens, word)
+        if sku_prefix:
+            matches &= self._prefixed(self.skus, sku_prefix.lower())
+        found = []
+        for n in sorted(matches):
+            product = self.products[n]
+            if min_price is not None and product.price < min_price:
+                continue
+            if max_price is not None and product.price > max_price:
+                continue
+            if min_available is not None and product.available < min_available:
+                continue
+            found.append(product)
+        return found
+
+    @staticmethod
+    def relevance(product, query: str | None = None, sku_prefix: str | None = None) -> tuple:
+        """
+        Sort key putting the best matches first: the exact SKU, then the most query words
+        matching whole name words, then the shortest name (fewest words besides the query).
+        """
+        names = tokenize(product.name)
+        whole_words = sum(word in names for word in tokenize(query or ""))
+        exact_sku = bool(sku_prefix) and product.sku.lower() == sku_prefix.lower()
+        return -exact_sku, -whole_words, len(names)
+
+
+# Page limit reported by a "page limit exceeded" error, per ERC3 core (one per session).
+# Tasks of the same session share it, so only the first listing of a session pays for
+# the failing probe; concurrent sessions never see each other's limit.
+_session_page_limits: "weakref.WeakKeyDictionary[object, int]" = weakref.WeakKeyDictionary()
+
+
+def get_session_page_limit() -> int | None:
+    api = get_store_context().erc3_api
+    return _session_page_limits.get(api) if api is not None else None
+
+
+def learn_session_page_limit(limit: int):
+    api = get_store_context().erc3_api
+    if api is not None:
+        _session_page_limits[api] = limit
+
+
+def get_catalog() -> ProductCatalog:
+    """Return the catalog cache of the current task, creating it on first use."""
+    context = get_store_context()
+    if context.catalog is None:
+        context.catalog = ProductCatalog()
+    return context.catalog
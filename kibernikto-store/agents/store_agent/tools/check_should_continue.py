@@ -1,45 +1,45 @@
 from kibernikto.interactors.tools import Toolbox
 
-# Global recursion depth tracking
-_recursion_depth = 0
-_max_depth = 15
+from . import get_store_context
+from erc3_shared.tracing import traced
+
+# Recursion depth is tracked per task in the store context
 
 
 def set_max_recursion_depth(depth: int):
     """Set maximum recursion depth before warning"""
-    global _max_depth
-    _max_depth = depth
+    get_store_context().max_depth = depth
 
 
 def increment_depth():
     """Increment recursion depth counter"""
-    global _recursion_depth
-    _recursion_depth += 1
+    get_store_context().recursion_depth += 1
 
 
 def reset_depth():
     """Reset recursion depth counter"""
-    global _recursion_depth
-    _recursion_depth = 0
+    get_store_context().recursion_depth = 0
 
 
 def get_depth():
     """Get current recursion depth"""
-    return _recursion_depth
+    return get_store_context().recursion_depth
 
 
+@traced("tool")
 async def check_should_continue() -> str:
     """Check if the agent should continue making tool calls or wrap up"""
-    global _recursion_depth, _max_depth
-    
-    print(f"[TOOL] check_should_continue() - depth: {_recursion_depth}/{_max_depth}")
-    
-    if _recursion_depth >= _max_depth:
-        msg = f"WARNING: You have made {_recursion_depth} tool calls. You are approaching recursion limit. Please wrap up your current task and provide a final response or use checkout_basket if the task is complete."
+    context = get_store_context()
+    recursion_depth, max_depth = context.recursion_depth, context.max_depth
+
+    print(f"[TOOL] check_should_continue() - depth: {recursion_depth}/{max_depth}")
+
+    if recursion_depth >= max_depth:
+        msg = f"WARNING: You have made {recursion_depth} tool calls. You are approaching recursion limit. Please wrap up your current task and provide a final response or use checkout_basket if the task is complete."
         print(f"[TOOL] ⚠ check_should_continue: {msg}")
         return msg
     else:
-        remaining = _max_depth - _recursion_depth
+        remaining = max_depth - recursion_depth
         msg = f"OK: You have {remaining} tool calls remaining before you should wrap up."
         print(f"[TOOL] ✓ check_should_continue: {msg}")
         return msg
@@ -1,24 +1,26 @@
 from erc3 import store, ApiException
 from kibernikto.interactors.tools import Toolbox
 
-confirmation_needed = True
+from ...serialization import encode_payload
+from erc3_shared.tracing import traced
 
 
+@traced("tool")
 async def checkout_basket() -> str:
-    global confirmation_needed
     """Complete the purchase and checkout the basket"""
-    from . import _store_client
+    from . import get_store_context
+    context = get_store_context()
     print(f"[TOOL] checkout_basket()")
-    if confirmation_needed is True:
-        confirmation_needed = False
+    if context.checkout_confirmation_needed is True:
+        context.checkout_confirmation_needed = False
         #raise Exception(
         #    "Please carefully review the basket contents before proceeding and probably recheck! Did you do everything according to the request? Don't u violate one of the request terms? If yes, run this tool again!")
     else:
         # resetting
-        confirmation_needed = True
+        context.checkout_confirmation_needed = True
     try:
-        result = _store_client.dispatch(store.Req_CheckoutBasket())
-        output = result.model_dump_json(exclude_none=True, exclude_unset=True)
+        result = await context.dispatch(store.Req_CheckoutBasket())
+        output = encode_payload(result)
         print(f"[TOOL] ✓ checkout_basket: {output}")
         return output
     except ApiException as e:
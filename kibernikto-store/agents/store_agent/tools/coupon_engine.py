@@ -0,0 +1,190 @@
+"""Memoized coupon probing against the live basket."""
+import time
+
+from erc3 import store, ApiException
+
+from . import get_store_context
+from .basket_diff import basket_key, basket_quantities, plan_basket_ops
+from .shadow_pricing import get_shadow_pricer
+
+
+def basket_totals(snapshot) -> dict:
+    sub = snapshot.subtotal
+    return {
+        "subtotal": sub,
+        "discount": sub - snapshot.total,  # total is after discount
+        "grand_total": snapshot.total,
+    }
+
+
+class CouponEngine:
+    """
+    Per-task memo of ``(basket contents, coupon) -> totals``.
+
+    Probes that are not cached yet are grouped by basket, so every basket is built
+    once (as a minimal diff from the previous one) and all its coupons are applied
+    on top of it. The live basket is restored afterwards. Probes the shadow pricer
+    can predict confidently are answered locally and not memoized.
+    """
+
+    def __init__(self):
+        self.results: dict[tuple[frozenset, str], dict] = {}
+        self.probes = 0
+        self.cache_hits = 0
+        self.predictions = 0
+        self.api_calls = 0
+        self.seconds = 0.0
+        self._original = None  # basket snapshot to restore after probing
+        self._state: _LiveBasket | None = None
+        self.restore_error: str | None = None  # why the last restore() left the basket changed
+
+    def cached(self, quantities: dict[str, int], coupon: str) -> dict | None:
+        return self.results.get((basket_key(quantities), coupon))
+
+    async def evaluate(self, requests: list[tuple[dict[str, int], str]], restore: bool = True) -> list[dict]:
+        """
+        Totals (or an error) for every (basket quantities, coupon) pair, in request order.
+        With restore=False the live basket is left as probed until restore() is called,
+        so a series of single probes does not rebuild the original basket in between.
+        """
+        context = get_store_context()
+        started = time.perf_counter()
+        calls_before = context.basket.version + context.basket.fetches
+        pricer = get_shadow_pricer()
+
+        pending: dict[frozenset, tuple[dict[str, int], list[str]]] = {}
+        predicted: dict[tuple[frozenset, str], dict] = {}
+        for quantities, coupon in requests:
+            key = basket_key(quantities)
+            if (key, coupon) in self.results:
+                self.cache_hits += 1
+            elif (key, coupon) in predicted:
+                continue
+            elif prediction := pricer.confident(quantities, coupon):
+                self.predictions += 1
+                predicted[(key, coupon)] = prediction
+            elif coupon not in pending.setdefault(key, (dict(key), []))[1]:
+                pending[key][1].append(coupon)
+
+        try:
+            if pending and self._state is None:
+                self._original = await context.dispatch(store.Req_ViewBasket())
+                self._state = _LiveBasket(basket_quantities(self._original), self._original.coupon)
+            state = self._state
+            while pending:
+                # next basket: the one closest to what is in the live basket now
+                key = min(pending, key=lambda k: len(plan_basket_ops(state.items, None, dict(k), None)))
+                quantities, coupons = pending.pop(key)
+                error = await state.move_to(context, quantities, state.coupon)
+                if error:
+                    # the basket itself could not be built, not a verdict on the coupons
+                    for coupon in coupons:
+                        self.results[(key, coupon)] = {"error": error, "basket_error": True}
+                    continue
+                # the already applied coupon needs no apply call
+                coupons.sort(key=lambda c: c != state.coupon)
+                for n, coupon in enumerate(coupons):
+                    self.probes += 1
+                    result = self.results[(key, coupon)] = await state.probe(context, coupon)
+                    if result.get("basket_error") and coupons[n + 1:]:
+                        # the live basket is unknown now, the rest needs it rebuilt first
+                        pending[key] = (quantities, coupons[n + 1:])
+                        break
+        finally:
+            # also after a failed call, so the basket and the stats never stay half-done
+            if restore:
+                await self.restore()
+            self.api_calls += context.basket.version + context.basket.fetches - calls_before
+            self.seconds += time.perf_counter() - started
+        return [self.results.get((basket_key(quantities), coupon)) or predicted[(basket_key(quantities), coupon)]
+                for quantities, coupon in requests]
+
+    async def restore(self) -> str | None:
+        """
+        Bring the live basket back to what it was before the first unrestored probe.
+        Returns an error message (also kept in restore_error) if that did not succeed.
+        """
+        self.restore_error = None
+        if self._state is None:
+            return None
+        context = get_store_context()
+        try:
+            self.restore_error = await self._state.move_to(
+                context, basket_quantities(self._original), self._original.coupon, best_effort=True)
+        finally:
+            self._state = self._original = None
+        return self.restore_error
+
+    def stats(self) -> dict:
+        return {
+            "probes": self.probes,
+            "cache_hits": self.cache_hits,
+            "predictions": self.predictions,
+            "api_calls": self.api_calls,
+            "latency_sec": round(self.seconds, 3),
+        }
+
+
+class _LiveBasket:
+    """What the engine believes is in the live basket right now."""
+
+    def __init__(self, items: dict[str, int], coupon: str | None):
+        self.items = items
+        self.coupon = coupon
+        self.stale = False  # a failed call left the basket unknown
+
+    async def resync(self, context) -> str | None:
+        """Re-read the live basket after a failed call. Returns an error message on failure."""
+        try:
+            snapshot = await context.dispatch(store.Req_ViewBasket())
+        except ApiException as e:
+            self.stale = True
+            return f"Unable to view the basket: {e.detail}"
+        self.items, self.coupon = basket_quantities(snapshot), snapshot.coupon
+        self.stale = False
+        return None
+
+    async def move_to(self, context, items: dict[str, int], coupon: str | None,
+                      best_effort: bool = False) -> str | None:
+        """Change items and coupon with minimal calls. Returns an error message on failure."""
+        if self.stale and (error := await self.resync(context)):
+            return error
+        error = None
+        for op in plan_basket_ops(self.items, self.coupon, items, coupon):
+            try:
+                await context.dispatch(op.request())
+            except ApiException as e:
+                error = f"Unable to {op.describe()}: {e.detail}"
+                if not best_effort:
+                    break
+        if error:
+            if resync_error := await self.resync(context):
+                error = f"{error}; {resync_error}"
+        else:
+            self.items, self.coupon = dict(items), coupon
+        return error
+
+    async def probe(self, context, coupon: str) -> dict:
+        try:
+            if self.coupon == coupon:
+                snapshot = await context.dispatch(store.Req_ViewBasket())
+                if snapshot.coupon == coupon:
+                    return basket_totals(snapshot)
+                # the store dropped the coupon when the items changed
+            await context.dispatch(store.Req_ApplyCoupon(coupon=coupon))
+            self.coupon = coupon
+            return basket_totals(await context.dispatch(store.Req_ViewBasket()))
+        except ApiException as e:
+            error = f"Coupon {coupon}: {e.detail}"
+            if resync_error := await self.resync(context):
+                # the basket is unknown now, not a verdict on the coupon
+                return {"error": f"{error}; {resync_error}", "basket_error": True}
+            return {"error": error}
+
+
+def get_coupon_engine() -> CouponEngine:
+    """Return the coupon engine of the current task, creating it on first use."""
+    context = get_store_context()
+    if context.coupon_engine is None:
+        context.coupon_engine = CouponEngine()
+    return context.coupon_engine
@@ -1,32 +1,19 @@
 from __future__ import annotations
 import json
-import copy
 from typing import List, Optional, Dict, Any
 from erc3 import store, ApiException
 from kibernikto.interactors.tools import Toolbox
-from . import _store_client   # same shared client the other tools use
-
-
-# ------------------------------------------------------------------
-# Helper: tiny dataclass-like dict to keep totals tidy
-# ------------------------------------------------------------------
-class _Totals:
-    def __init__(self, sub: float, disc: float, grand: float):
-        self.subtotal = sub
-        self.discount = disc
-        self.grand_total = grand
-
-    def to_dict(self) -> Dict[str, float]:
-        return {
-            "subtotal": self.subtotal,
-            "discount": self.discount,
-            "grand_total": self.grand_total,
-        }
+from ...serialization import encode_payload
+from erc3_shared.tracing import traced
+from . import get_store_context   # same task-scoped client the other tools use
+from .coupon_engine import get_coupon_engine
+from .shadow_pricing import get_shadow_pricer
 
 
 # ------------------------------------------------------------------
 # Core logic
 # ------------------------------------------------------------------
+@traced("tool")
 async def evaluate_coupons(
         skus: List[str],
         coupons: List[str],
@@ -34,8 +21,9 @@ async def evaluate_coupons(
 ) -> str:
     """
     Evaluate how *each* coupon affects *every* requested product/quantity mix.
+    Results are memoized per task, so repeated combinations cost no store calls.
     The live basket is restored to its original state before returning.
-    Returns a JSON string:
+    Returns the report encoded with encode_payload:
     {
       "basket_before": { ...original snapshot... },
       "results": {
@@ -43,9 +31,13 @@ async def evaluate_coupons(
           "<sku>x<qty>": { "subtotal":..., "discount":..., "grand_total":... }
         }
       },
-      "basket_after": { ...should match basket_before... }
+      "basket_after": { ...should match basket_before... },
+      "stats": { "probes":..., "cache_hits":..., "predictions":..., "api_calls":..., "latency_sec":... },
+      "coupon_rules": { "<coupon>": [ ...rules consistent with the observed baskets... ] }
     }
+    Results marked "predicted" were computed from the inferred rules without a store probe.
     """
+    context = get_store_context()
     print(f"[TOOL] evaluate_coupons(skus={skus}, coupons={coupons}, qty={quantities})")
 
     if not skus or not coupons:
@@ -58,104 +50,42 @@ async def evaluate_coupons(
 
     # 1. Snapshot original basket ---------------------------------
     try:
-        original_basket = _store_client.dispatch(store.Req_ViewBasket())
+        original_basket = await context.dispatch(store.Req_ViewBasket())
     except ApiException as e:
         return json.dumps({"error": f"Unable to read basket: {e.detail}"})
 
-    # 2. Prepare clean working basket -----------------------------
-    #    We reset by removing everything that is currently inside.
-    for line in original_basket.items:
-        try:
-            _store_client.dispatch(
-                store.Req_RemoveItemFromBasket(sku=line.sku, quantity=line.quantity)
-            )
-        except ApiException:
-            pass   # ignore race conditions / already gone
+    # 2. Probe every product combination with every coupon --------
+    engine = get_coupon_engine()
+    before = engine.stats()
+    combos = [(f"{sku}x{qty}", {sku: qty}) for sku, qty in zip(skus, quantities)]
+    requests = [(combo, coupon) for _, combo in combos for coupon in coupons]
+    try:
+        totals = await engine.evaluate(requests)
+    except ApiException as e:
+        return json.dumps({"error": f"Unable to evaluate coupons: {e.detail}"})
 
     report: Dict[str, Any] = {"results": {}}
-
-    # 3. Iterate every product combination ------------------------
-    for sku, qty in zip(skus, quantities):
-        combo_key = f"{sku}x{qty}"
-
-        # 3a. Add products for this combination
-        try:
-            _store_client.dispatch(store.Req_AddProductToBasket(sku=sku, quantity=qty))
-        except ApiException as e:
-            # If a SKU is invalid we skip the whole combo
-            for c in coupons:
-                report["results"].setdefault(c, {})[combo_key] = {
-                    "error": f"Unable to add {sku}: {e.detail}"
-                }
-            continue
-
-        # 3b. Test every coupon
+    results = iter(totals)
+    for combo_key, _ in combos:
         for coupon in coupons:
-            # Start fresh for this coupon (remove any previous)
-            try:
-                _store_client.dispatch(store.Req_RemoveCoupon())
-            except ApiException:
-                pass
-
-            totals: _Totals
-            try:
-                _store_client.dispatch(store.Req_ApplyCoupon(coupon=coupon))
-                basket = _store_client.dispatch(store.Req_ViewBasket())
-
-                sub = basket.subtotal
-                disc = sub - basket.total  # total is after discount
-                totals = _Totals(sub, disc, basket.total)
-
-            except ApiException as e:
-                totals = _Totals(0.0, 0.0, 0.0)
-                # Still record the error inside the dict
-                report["results"].setdefault(coupon, {})[combo_key] = {
-                    "error": f"Coupon {coupon}: {e.detail}"
-                }
-                continue
-
-            report["results"].setdefault(coupon, {})[combo_key] = totals.to_dict()
-
-        # 3c. Clean combo: remove items & coupon
-        try:
-            _store_client.dispatch(store.Req_RemoveItemFromBasket(sku=sku, quantity=qty))
-            _store_client.dispatch(store.Req_RemoveCoupon())
-        except ApiException:
-            pass
-
-    # 4. Restore original basket exactly --------------------------
-    #    Re-add original items
-    for line in original_basket.items:
-        try:
-            _store_client.dispatch(
-                store.Req_AddProductToBasket(sku=line.sku, quantity=line.quantity)
-            )
-        except ApiException:
-            pass   # best effort
-    #    Re-apply original coupon (if any)
-    if original_basket.applied_coupon:
-        try:
-            _store_client.dispatch(
-                store.Req_ApplyCoupon(coupon=original_basket.applied_coupon)
-            )
-        except ApiException:
-            pass
+            report["results"].setdefault(coupon, {})[combo_key] = next(results)
 
-    # 5. Final snapshot & return ----------------------------------
-    final_basket = _store_client.dispatch(store.Req_ViewBasket())
-    report["basket_before"] = json.loads(
-        original_basket.model_dump_json(exclude_none=True, exclude_unset=True)
-    )
-    report["basket_after"] = json.loads(
-        final_basket.model_dump_json(exclude_none=True, exclude_unset=True)
-    )
+    # 3. Final snapshot & return ----------------------------------
+    final_basket = await context.dispatch(store.Req_ViewBasket())
+    report["basket_before"] = original_basket
+    report["basket_after"] = final_basket
+    after = engine.stats()
+    report["stats"] = {name: round(after[name] - before[name], 3) for name in after}
+    report["coupon_rules"] = get_shadow_pricer().describe()
+    if engine.restore_error:
+        report["restore_error"] = f"The basket may not be restored: {engine.restore_error}"
 
-    print(f"[TOOL] ✓ evaluate_coupons complete")
-    return json.dumps(report, ensure_ascii=False, indent=2)
+    print(f"[TOOL] ✓ evaluate_coupons complete: {report['stats']}")
+    return encode_payload(report, json_indent=2)
 
 
 # ------------------------------------------------------------------
-# Toolbox wiring (unchanged from previous sketch)
+# Toolbox wiring
 # ------------------------------------------------------------------
 def evaluate_coupons_tool():
     return {
@@ -166,7 +96,7 @@ def evaluate_coupons_tool():
                 "For a given list of products and coupons, compute how each "
                 "coupon impacts every product combination (basket subtotal, "
                 "discount, grand total).  The basket is restored to its "
-                "original state after evaluation."
+                "original state after evaluation. Results are cached per task."
             ),
             "parameters": {
                 "type": "object",
@@ -1,66 +1,151 @@
+import asyncio
+import os
+import re
+import sys
+
 from erc3 import store, ApiException
 from kibernikto.interactors.tools import Toolbox
 
+from ...serialization import encode_payload
+from erc3_shared.tracing import traced
+from . import get_store_context
+from .catalog import ProductCatalog, get_catalog, get_session_page_limit, learn_session_page_limit
 
-async def list_products(offset: int = 0, limit: int = 50, max_pages: int = 5) -> str:
-    """Browse available products in the store, automatically fetching multiple pages"""
-    from . import _store_client
-    import re
-    import json
-    
-    print(f"[TOOL] list_products(offset={offset}, limit={limit}, max_pages={max_pages})")
-    
-    all_products = []
-    current_offset = offset
-    actual_limit = limit
-    pages_fetched = 0
-    
-    for page_num in range(max_pages):
+# How many listing pages of one call are requested at the same time
+PAGE_FETCH_CONCURRENCY = int(os.getenv("PAGE_FETCH_CONCURRENCY", "4"))
+# Upper bound of pages read when the whole catalog is needed
+MAX_CATALOG_PAGES = int(os.getenv("MAX_CATALOG_PAGES", "100"))
+
+
+async def _fetch_page(catalog: ProductCatalog, offset: int, limit: int):
+    """Fetch one page into the catalog. Returns the API result, raises ApiException."""
+    context = get_store_context()
+    catalog.api_calls += 1
+    result = await context.dispatch(store.Req_ListProducts(offset=offset, limit=limit))
+    catalog.store_page(offset, result.products, result.next_offset)
+    return result
+
+
+async def _fetch_pages(catalog: ProductCatalog, offset: int, limit: int, max_pages: int) -> tuple[int, int, str | None]:
+    """
+    Fetch up to max_pages pages from the store API into the catalog.
+    The first page is read alone, the remaining ones concurrently with bounded fan-out.
+    :return: (pages fetched, page size used, error message if nothing could be fetched)
+    """
+    known_limit = catalog.page_limit or get_session_page_limit()
+    actual_limit = min(limit, known_limit) if known_limit else limit
+
+    # 1. first page - tells whether there is more and validates the page size
+    result = None
+    limit_from_error = False
+    while result is None:
         try:
-            result = _store_client.dispatch(store.Req_ListProducts(offset=current_offset, limit=actual_limit))
-            
-            # Add products from this page
-            all_products.extend(result.products)
-            pages_fetched += 1
-            
-            print(f"[TOOL] ✓ Page {page_num + 1}: Got {len(result.products)} products (total: {len(all_products)})")
-            
-            # Check if there are more pages
-            if result.next_offset is None:
-                print(f"[TOOL] ✓ No more pages, fetched {pages_fetched} page(s)")
-                break
-            
-            # Continue to next page
-            current_offset = result.next_offset
-            
+            result = await _fetch_page(catalog, offset, actual_limit)
         except ApiException as e:
             error_msg = f"Error: {e.api_error.error} - {e.detail}"
-            
-            # Check if error is about page limit exceeded (only on first attempt)
-            if page_num == 0 and "page limit exceeded" in error_msg.lower():
+
+            # Check if error is about page limit exceeded
+            if "page limit exceeded" in error_msg.lower():
                 # Try to extract the actual limit from error message like "50 > 3"
                 match = re.search(r'(\d+)\s*>\s*(\d+)', error_msg)
-                if match:
+                if match and int(match.group(2)) < actual_limit:
+                    print(f"[TOOL] ⚠ Limit {actual_limit} exceeded, adjusting to limit={match.group(2)}")
                     actual_limit = int(match.group(2))
-                    print(f"[TOOL] ⚠ Limit {limit} exceeded, adjusting to limit={actual_limit}")
+                    limit_from_error = True
                     # Retry this page with correct limit
                     continue
-            
+
             # Check if error is about invalid pagination (offset beyond available products)
             if "invalid pagination" in error_msg.lower():
-                print(f"[TOOL] ⚠ Page {page_num + 1}: Reached end of products")
-                # This means we've exhausted all products, stop pagination
-                break
-            
-            # Other errors
-            print(f"[TOOL] ✗ list_products error on page {page_num + 1}: {error_msg}")
-            if pages_fetched == 0:
-                # No pages fetched yet, return error
-                return error_msg
-            else:
-                # Return what we have so far
-                break
-    
+                print(f"[TOOL] ⚠ Offset {offset}: Reached end of products")
+                catalog.store_page(offset, [], None)
+                return 0, actual_limit, None
+
+            print(f"[TOOL] ✗ list_products error on page 1: {error_msg}")
+            return 0, actual_limit, error_msg
+
+    if limit_from_error:
+        # the real limit, remember it for the rest of the session
+        catalog.page_limit = actual_limit
+        learn_session_page_limit(actual_limit)
+    else:
+        # only a lower bound of the limit, never used to cap later requests
+        catalog.page_limit = catalog.page_limit or known_limit
+    catalog.page_size = max(catalog.page_size or 0, actual_limit)
+    print(f"[TOOL] ✓ Page 1: Got {len(result.products)} products")
+    if result.next_offset is None or max_pages <= 1:
+        return 1, actual_limit, None
+
+    # 2. remaining pages - their offsets are known, fetch them in parallel
+    semaphore = asyncio.Semaphore(PAGE_FETCH_CONCURRENCY)
+
+    async def fetch(page_offset: int) -> bool:
+        async with semaphore:
+            if catalog.end is not None and page_offset >= catalog.end:
+                return False  # an earlier page already ended the catalog
+            try:
+                page = await _fetch_page(catalog, page_offset, actual_limit)
+                return bool(page.products)
+            except ApiException as e:
+                if "invalid pagination" in f"{e.api_error.error} - {e.detail}".lower():
+                    catalog.store_page(page_offset, [], None)
+                else:
+                    print(f"[TOOL] ✗ list_products error at offset {page_offset}: {e.api_error.error} - {e.detail}")
+                return False
+
+    offsets = [result.next_offset + k * actual_limit for k in range(max_pages - 1)]
+    fetched = await asyncio.gather(*(fetch(page_offset) for page_offset in offsets))
+    pages_fetched = 1 + sum(fetched)
+    print(f"[TOOL] ✓ Fetched {pages_fetched} page(s), {len(catalog.products)} products known")
+    return pages_fetched, actual_limit, None
+
+
+async def load_catalog(catalog: ProductCatalog, max_pages: int = MAX_CATALOG_PAGES) -> str | None:
+    """
+    Fill the gaps of the catalog cache until its end is known (or max_pages were read).
+    :return: error message if a page could not be fetched
+    """
+    pages_read = 0
+    while pages_read < max_pages:
+        offset = catalog.next_offset(0, sys.maxsize)
+        if offset is None:
+            return None
+        catalog.misses += 1
+        pages_fetched, _, error_msg = await _fetch_pages(
+            catalog, offset, 100, min(PAGE_FETCH_CONCURRENCY, max_pages - pages_read))
+        if error_msg or not pages_fetched:
+            return error_msg
+        pages_read += pages_fetched
+    return None
+
+
+@traced("tool")
+async def list_products(offset: int = 0, limit: int = 50, max_pages: int = 5, refresh: bool = False) -> str:
+    """Browse available products in the store, automatically fetching multiple pages"""
+    print(f"[TOOL] list_products(offset={offset}, limit={limit}, max_pages={max_pages}, refresh={refresh})")
+
+    catalog = get_catalog()
+    if refresh:
+        catalog.refresh()
+
+    known_limit = catalog.page_limit or get_session_page_limit()
+    page_size = min(limit, known_limit) if known_limit else limit
+    # the window of the request is only certain if the store accepts (or caps) this page size
+    page_size_known = known_limit is not None or limit <= (catalog.page_size or 0)
+    if page_size_known and catalog.covers(offset, page_size * max_pages):
+        # Repeated listing, serve it from the task's catalog cache
+        catalog.record_hit(page_size * max_pages)
+        pages_fetched = 0
+        print(f"[TOOL] ✓ list_products served from catalog cache ({catalog.stats()})")
+    else:
+        catalog.misses += 1
+        pages_fetched, page_size, error_msg = await _fetch_pages(catalog, offset, limit, max_pages)
+        if error_msg:
+            return error_msg
+
+    window = page_size * max_pages
+    all_products = catalog.slice(offset, window)
+
     # Format response similar to API response
     response = {
         "products": [{
@@ -72,8 +157,11 @@ async def list_products(offset: int = 0, limit: int = 50, max_pages: int = 5) ->
         "total_fetched": len(all_products),
         "pages_fetched": pages_fetched
     }
-    
-    output = json.dumps(response)
+    next_offset = catalog.next_offset(offset, window)
+    if next_offset is not None:
+        response["next_offset"] = next_offset
+
+    output = encode_payload(response)
     print(f"[TOOL] ✓ list_products complete: {len(all_products)} products from {pages_fetched} page(s)")
     return output
 
@@ -83,7 +171,7 @@ def list_products_tool():
         "type": "function",
         "function": {
             "name": "list_products",
-            "description": "Browse available products in the store. Automatically fetches up to 5 pages to get more products in one call. Returns all products with SKUs, names, prices, and availability.",
+            "description": "Browse available products in the store. Automatically fetches up to 5 pages to get more products in one call. Repeated listings are served from cache. Returns all products with SKUs, names, prices, and availability.",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -101,6 +189,11 @@ def list_products_tool():
                         "type": "integer",
                         "description": "Maximum number of pages to fetch automatically (default: 5).",
                         "default": 5
+                    },
+                    "refresh": {
+                        "type": "boolean",
+                        "description": "Re-read products from the store instead of the cached listing. Use when current availability matters.",
+                        "default": False
                     }
                 },
                 "required": []
@@ -0,0 +1,291 @@
+from __future__ import annotations
+import heapq
+import itertools
+import json
+import math
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from erc3 import ApiException
+from kibernikto.interactors.tools import Toolbox
+
+from ...serialization import encode_payload
+from erc3_shared.tracing import traced
+from .catalog import get_catalog
+from .coupon_engine import get_coupon_engine
+from .list_products import load_catalog
+from .shadow_pricing import get_shadow_pricer
+
+# Upper bound of enumerated quantity configurations per call, larger spaces are thinned out
+MAX_CONFIGURATIONS = 500
+
+
+# ------------------------------------------------------------------
+# Input schema
+# ------------------------------------------------------------------
+class CandidateItem(BaseModel):
+    sku: str
+    # 0 only for products that may be left out of the basket altogether
+    min_quantity: int = Field(default=1, ge=0)
+    max_quantity: int = Field(ge=0)
+
+
+class OptimizationRequest(BaseModel):
+    items: List[CandidateItem]
+    coupons: List[str] = []
+    max_probes: int = Field(default=20, ge=1)
+
+
+# ------------------------------------------------------------------
+# Discount model: bounds learned from probes
+# ------------------------------------------------------------------
+class _CouponModel:
+    """
+    What is known about one coupon. Discounts are assumed monotone in the basket:
+    adding items never lowers the discount (true for percentage, fixed amount,
+    minimum-quantity and SKU-scoped coupons). Every probe therefore caps the discount
+    of all smaller baskets.
+    """
+
+    def __init__(self):
+        self.observed: list[tuple[tuple[int, ...], float]] = []  # (quantities, discount)
+
+    def observe(self, config: tuple[int, ...], discount: float):
+        self.observed.append((config, discount))
+
+    def max_discount(self, config: tuple[int, ...]) -> float | None:
+        """Upper bound of the discount for config, None if nothing bigger was probed yet."""
+        bounds = [d for c, d in self.observed if all(a <= b for a, b in zip(config, c))]
+        return min(bounds) if bounds else None
+
+
+def _subtotal(config: tuple[int, ...], prices: list[float]) -> float:
+    return sum(q * p for q, p in zip(config, prices))
+
+
+def _thin_out(ranges: list[range], limit: int) -> list[list[int]] | None:
+    """
+    Quantities to enumerate per item so that their product stays within limit. The widest
+    range is sampled with a doubled step until it fits, its min and max are always kept.
+    None if the space does not fit even with min and max only.
+    """
+    values = [list(r) for r in ranges]
+    steps = [1] * len(ranges)
+    while math.prod(len(v) for v in values) > limit:
+        n = max(range(len(values)), key=lambda k: len(values[k]))
+        if len(values[n]) <= 2:
+            return None
+        steps[n] *= 2
+        values[n] = list(ranges[n][::steps[n]])
+        if values[n][-1] != ranges[n][-1]:
+            values[n].append(ranges[n][-1])
+    return values
+
+
+async def _restore_basket(engine) -> str | None:
+    """Restore the live basket after probing. Returns an error message on failure."""
+    try:
+        error = await engine.restore()
+    except ApiException as e:
+        error = e.detail
+    return f"The basket may not be restored: {error}" if error else None
+
+
+# ------------------------------------------------------------------
+# Tool entry point
+# ------------------------------------------------------------------
+@traced("tool")
+async def optimize_basket(items: list, coupons: Optional[List[str]] = None, max_probes: int = 20) -> str:
+    """
+    Branch-and-bound search for the cheapest basket within the given quantity ranges.
+    "Best" is the lowest grand total of a basket holding every item between its
+    min_quantity (default 1) and max_quantity, capped by the stock; the requested items
+    are never dropped unless their min_quantity is 0. Totals without coupon come from
+    catalog prices, coupon totals are confirmed on the live store (memoized). The live
+    basket is left untouched.
+    """
+    print(f"[TOOL] optimize_basket(items={items}, coupons={coupons}, max_probes={max_probes})")
+    try:
+        request = OptimizationRequest.model_validate({"items": items, "coupons": coupons or [], "max_probes": max_probes})
+    except Exception as e:
+        return json.dumps({"error": f"Invalid input schema: {e}"})
+
+    # 1. Prices and stock of the candidate SKUs ---------------------------
+    catalog = get_catalog()
+    products = {p.sku: p for p in catalog.products.values()}
+    if any(it.sku not in products for it in request.items):
+        # fill the catalog cache first
+        error_msg = await load_catalog(catalog)
+        if error_msg:
+            return json.dumps({"error": f"Unable to load the catalog: {error_msg}"})
+        products = {p.sku: p for p in catalog.products.values()}
+    unknown = [it.sku for it in request.items if it.sku not in products]
+    if unknown:
+        return json.dumps({"error": f"Unknown SKUs (not in the store catalog): {unknown}"})
+    skus = [it.sku for it in request.items]
+    prices = [products[sku].price for sku in skus]
+
+    # 2. Configuration space ---------------------------------------------
+    ranges = []
+    for it in request.items:
+        available = products[it.sku].available
+        if it.min_quantity > available:
+            return json.dumps({"error": f"Only {available} x {it.sku} in stock, min_quantity is {it.min_quantity}"})
+        ranges.append(range(it.min_quantity, max(it.min_quantity, min(it.max_quantity, available)) + 1))
+    space = math.prod(len(r) for r in ranges)
+    values = _thin_out(ranges, MAX_CONFIGURATIONS)
+    if values is None:
+        return json.dumps({"error": f"{space} quantity configurations are too many even with only min and max "
+                                    f"quantities, narrow the ranges or pass fewer items"})
+    searched = math.prod(len(v) for v in values)
+    configs = [c for c in itertools.product(*values) if any(c)]
+    if not configs:
+        return json.dumps({"error": "No non-empty basket within the given quantity ranges"})
+    largest = tuple(v[-1] for v in values)
+
+    def quantities(config):
+        return {sku: q for sku, q in zip(skus, config) if q > 0}
+
+    # best basket without coupon is known from catalog prices
+    best_config = min(configs, key=lambda c: _subtotal(c, prices))
+    best = {"config": best_config, "coupon": None, "total": _subtotal(best_config, prices)}
+
+    engine = get_coupon_engine()
+    pricer = get_shadow_pricer()
+    stats_before = engine.stats()
+    models = {coupon: _CouponModel() for coupon in request.coupons}
+    invalid: dict[str, str] = {}
+    probes = 0
+
+    async def probe(config, coupon) -> dict:
+        nonlocal probes
+        cached = engine.cached(quantities(config), coupon)
+        # the live basket is restored once, after the search
+        result = cached or (await engine.evaluate([(quantities(config), coupon)], restore=False))[0]
+        if cached is None and not result.get("predicted"):
+            probes += 1
+        if "error" not in result:
+            models[coupon].observe(config, result["discount"])
+        return result
+
+    def lower_bound(config, coupon) -> float:
+        cap = models[coupon].max_discount(config)
+        sub = _subtotal(config, prices)
+        return sub - (sub if cap is None else cap)
+
+    async def search() -> str | None:
+        """Probe coupons and configurations, returns an error message if the search cannot go on."""
+        nonlocal best, exhausted
+        # 3. Learn the biggest discount of every coupon on the largest basket
+        for coupon in request.coupons:
+            result = await probe(largest, coupon)
+            if result.get("basket_error"):
+                # a configuration error, every coupon would fail the same way
+                return f"Unable to build the basket {quantities(largest)}: {result['error']}"
+            if "error" in result:
+                invalid[coupon] = result["error"]
+
+        # 4. Branch and bound: most promising lower bound first --------------
+        heap = [(lower_bound(c, coupon), n, c, coupon)
+                for coupon in request.coupons if coupon not in invalid
+                for n, c in enumerate(configs)]
+        heapq.heapify(heap)
+        while heap:
+            bound, n, config, coupon = heapq.heappop(heap)
+            fresh = lower_bound(config, coupon)
+            if fresh > bound:
+                # the model got tighter since this entry was queued
+                heapq.heappush(heap, (fresh, n, config, coupon))
+                continue
+            if bound >= best["total"]:
+                break  # nothing left can beat the best basket
+            if (probes >= request.max_probes and engine.cached(quantities(config), coupon) is None
+                    and pricer.confident(quantities(config), coupon) is None):
+                exhausted = True
+                break
+            total = (await probe(config, coupon)).get("grand_total")
+            if total is not None and total < best["total"]:
+                best = {"config": config, "coupon": coupon, "total": total}
+        return None
+
+    exhausted = False
+    try:
+        error = await search()
+    except ApiException as e:
+        error = f"Store error while probing: {e.detail}"
+    # the live basket is restored once, even after a failed search
+    restore_error = await _restore_basket(engine)
+    if error:
+        payload = {"error": error}
+        if restore_error:
+            payload["restore_error"] = restore_error
+        return json.dumps(payload)
+
+    # 5. Report the blueprint --------------------------------------------
+    stats_after = engine.stats()
+    blueprint = {
+        "items": [{"sku": sku, "quantity": q, "price": p} for sku, q, p in zip(skus, best["config"], prices) if q > 0],
+        "coupon": best["coupon"],
+    }
+    report = {
+        "best_basket": blueprint,
+        "expected_total": best["total"],
+        "subtotal": _subtotal(best["config"], prices),
+        "configurations": len(configs),
+        # skipped by thinning out an oversized quantity space
+        "configurations_dropped": space - searched,
+        "store_probes": probes,
+        "search_complete": not exhausted and searched == space,
+        "invalid_coupons": invalid,
+        "stats": {name: round(stats_after[name] - stats_before[name], 3) for name in stats_after},
+    }
+    if restore_error:
+        report["restore_error"] = restore_error
+    print(f"[TOOL] ✓ optimize_basket: {report}")
+    return encode_payload(report)
+
+
+# ------------------------------------------------------------------
+# Toolbox wiring
+# ------------------------------------------------------------------
+def optimize_basket_tool():
+    return {
+        "type": "function",
+        "function": {
+            "name": "optimize_basket",
+            "description": (
+                "Finds the cheapest basket for the given products, quantity ranges and coupons "
+                "in one call, probing the store only where needed. Every item stays in the basket "
+                "with at least min_quantity (default 1) units, quantities are capped by the stock. "
+                "The live basket is not changed: pass the returned best_basket to set_basket_state to apply it."
+            ),
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "items": {
+                        "type": "array",
+                        "items": CandidateItem.model_json_schema(),
+                        "description": "Products of the basket with allowed quantity range (min_quantity..max_quantity); "
+                                       "min_quantity 0 only for products that may be left out",
+                    },
+                    "coupons": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Coupon codes to consider (only the ones provided in the request)",
+                    },
+                    "max_probes": {
+                        "type": "integer",
+                        "description": "Maximum number of store probes (default: 20)",
+                        "default": 20,
+                    },
+                },
+                "required": ["items"],
+            },
+        }
+    }
+
+
+optimize_basket_toolbox = Toolbox(
+    function_name="optimize_basket",
+    definition=optimize_basket_tool(),
+    implementation=optimize_basket,
+)
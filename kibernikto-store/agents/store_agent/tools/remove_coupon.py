@@ -1,21 +1,26 @@
 from erc3 import store, ApiException
 from kibernikto.interactors.tools import Toolbox
 
+from ...serialization import encode_payload
+from erc3_shared.tracing import traced
 
+
+@traced("tool")
 async def remove_coupon() -> str | dict:
     """Remove the currently applied coupon"""
-    from . import _store_client
+    from . import get_store_context
+    context = get_store_context()
     print(f"[TOOL] remove_coupon()")
     try:
-        result = _store_client.dispatch(store.Req_RemoveCoupon())
+        result = await context.dispatch(store.Req_RemoveCoupon())
         output = result.model_dump_json(exclude_none=True, exclude_unset=True)
         print(f"[TOOL] ✓ remove_coupon: {output}")
-        basket_result = _store_client.dispatch(store.Req_ViewBasket())
+        basket_result = await context.dispatch(store.Req_ViewBasket())
         result_dict = {
-            'updated_basket': basket_result.model_dump_json(exclude_none=True, exclude_unset=True),
-            'output': output
+            'updated_basket': basket_result,
+            'output': result
         }
-        return result_dict
+        return encode_payload(result_dict)
     except ApiException as e:
         error_msg = f"Error: {e.api_error.error} - {e.detail}"
         print(f"[TOOL] ✗ remove_coupon: {error_msg}")
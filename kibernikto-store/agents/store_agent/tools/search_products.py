@@ -0,0 +1,125 @@
+from typing import Literal, Optional
+
+from kibernikto.interactors.tools import Toolbox
+
+from ...serialization import encode_payload
+from erc3_shared.tracing import traced
+from .catalog import get_catalog
+from .list_products import load_catalog
+
+_SORT_KEYS = {
+    "price_asc": (lambda p: p.price, False),
+    "price_desc": (lambda p: p.price, True),
+    "name": (lambda p: p.name.lower(), False),
+    "available": (lambda p: p.available, True),
+}
+
+
+@traced("tool")
+async def search_products(query: Optional[str] = None,
+                          sku_prefix: Optional[str] = None,
+                          min_price: Optional[float] = None,
+                          max_price: Optional[float] = None,
+                          in_stock_only: bool = False,
+                          min_available: Optional[int] = None,
+                          sort_by: Literal["relevance", "price_asc", "price_desc", "name", "available"] = "relevance",
+                          top_k: int = 10) -> str:
+    """Find products by name words, SKU prefix, price and availability; returns only the matching rows"""
+    print(f"[TOOL] search_products(query={query!r}, sku_prefix={sku_prefix!r}, min_price={min_price}, "
+          f"max_price={max_price}, in_stock_only={in_stock_only}, min_available={min_available}, "
+          f"sort_by={sort_by}, top_k={top_k})")
+
+    catalog = get_catalog()
+    if catalog.complete:
+        catalog.record_hit(len(catalog.products))
+    else:
+        # the index needs the whole catalog, read the missing pages once per task
+        error_msg = await load_catalog(catalog)
+        if error_msg:
+            return error_msg
+
+    if in_stock_only:
+        min_available = max(min_available or 0, 1)
+    index = catalog.index()
+    matches = index.search(query=query, sku_prefix=sku_prefix, min_price=min_price,
+                           max_price=max_price, min_available=min_available)
+    if sort_by in _SORT_KEYS:
+        key, reverse = _SORT_KEYS[sort_by]
+        matches = sorted(matches, key=key, reverse=reverse)
+    else:
+        # stable sort, equally relevant products keep the catalog order
+        matches = sorted(matches, key=lambda p: index.relevance(p, query, sku_prefix))
+
+    top_k = max(top_k, 1)
+    response = {
+        "products": [{
+            "sku": p.sku,
+            "name": p.name,
+            "available": p.available,
+            "price": p.price
+        } for p in matches[:top_k]],
+        "total_matches": len(matches),
+        "catalog_size": len(catalog.products),
+        "catalog_complete": catalog.complete,
+    }
+    print(f"[TOOL] ✓ search_products: {len(matches)} match(es), returning {len(response['products'])}")
+    return encode_payload(response)
+
+
+def search_products_tool():
+    return {
+        "type": "function",
+        "function": {
+            "name": "search_products",
+            "description": "Search the store catalog and get only the matching products (sku, name, price, availability). Prefer it over list_products: all filters are combined, results are sorted and cut to top_k.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Words of the product name, e.g. 'gaming mouse'. Every word must match the start of a word in the name."
+                    },
+                    "sku_prefix": {
+                        "type": "string",
+                        "description": "Only products whose SKU starts with this prefix."
+                    },
+                    "min_price": {
+                        "type": "number",
+                        "description": "Minimum unit price."
+                    },
+                    "max_price": {
+                        "type": "number",
+                        "description": "Maximum unit price."
+                    },
+                    "in_stock_only": {
+                        "type": "boolean",
+                        "description": "Only products that are available.",
+                        "default": False
+                    },
+                    "min_available": {
+                        "type": "integer",
+                        "description": "Only products with at least this many units available."
+                    },
+                    "sort_by": {
+                        "type": "string",
+                        "enum": ["relevance", "price_asc", "price_desc", "name", "available"],
+                        "description": "Result order (relevance: exact SKU first, then whole-word name matches, then shorter names).",
+                        "default": "relevance"
+                    },
+                    "top_k": {
+                        "type": "integer",
+                        "description": "Maximum number of products to return (default: 10).",
+                        "default": 10
+                    }
+                },
+                "required": []
+            }
+        }
+    }
+
+
+search_products_toolbox = Toolbox(
+    function_name="search_products",
+    definition=search_products_tool(),
+    implementation=search_products
+)
@@ -5,6 +5,10 @@ from pydantic import BaseModel, Field
 from erc3 import store, ApiException
 from kibernikto.interactors.tools import Toolbox
 
+from ...serialization import encode_payload
+from erc3_shared.tracing import traced
+from .basket_diff import BasketOp, basket_quantities, item_quantities, plan_basket_ops, rebuild_op_count
+
 
 # ------------------------------------------------------------------
 # Concrete schema for the *input* basket description
@@ -28,99 +32,162 @@ class SetBasketResult(BaseModel):
     message: str
     basket_before: dict  # JSON-serialised snapshot
     basket_after: dict  # JSON-serialised snapshot
+    operations: List[str] = []  # store calls issued to reach the new state
+    api_calls_saved: int = 0  # compared to clearing and rebuilding the whole basket
+    failed_operation: Optional[str] = None  # the store call that failed, if any
+    rolled_back: bool = False  # the basket was restored to basket_before after a failure
 
 
 # ------------------------------------------------------------------
-# Helper: empty the basket completely
+# Helpers: rollback on failure
 # ------------------------------------------------------------------
-def _clear_basket() -> None:
-    from . import _store_client
-    """Remove every item and any coupon.  Raises ApiException on failure."""
-    current = _store_client.dispatch(store.Req_ViewBasket())
-    if not current.items:
-        return
-    for line in current.items:
-        _store_client.dispatch(
-            store.Req_RemoveItemFromBasket(sku=line.sku, quantity=line.quantity)
-        )
-    if current.coupon:
-        _store_client.dispatch(store.Req_RemoveCoupon())
+async def _rollback(context, journal: List[BasketOp]) -> List[str]:
+    """
+    Replay the inverse item operations newest first, then bring back the original coupon.
+    Item changes may make the store drop the coupon, so coupon changes go last: the oldest
+    coupon inverse restores the coupon the basket had. Returns the errors of the steps that failed.
+    """
+    items = [op for op in reversed(journal) if op.kind in ("add", "remove")]
+    coupons = [op for op in journal if op.kind in ("apply_coupon", "remove_coupon")]
+    errors = []
+    for op in items + coupons[:1]:
+        try:
+            await context.dispatch(op.request())
+        except ApiException as e:
+            errors.append(f"{op.describe()}: {e.detail}")
+    return errors
+
+
+async def _failure_result(context, original_snapshot, failed_op: BasketOp, error: ApiException,
+                          journal: Optional[List[BasketOp]]) -> str:
+    """Build the FAILURE result, rolling back the applied operations if a journal is given."""
+    basket_before = json.loads(original_snapshot.model_dump_json(exclude_none=True, exclude_unset=True))
+    message = f"Failed while building new basket at '{failed_op.describe()}': {error.detail}"
+    if journal is None:
+        # non-transactional: partially applied, caller must inspect and retry
+        return encode_payload(SetBasketResult(
+            status="FAILURE",
+            message=message,
+            basket_before=basket_before,
+            basket_after={},  # unknown – we crashed
+            failed_operation=failed_op.describe(),
+        ))
+
+    rollback_errors = await _rollback(context, journal)
+    basket_after = {}
+    rolled_back = False
+    try:
+        restored = await context.dispatch(store.Req_ViewBasket())
+        basket_after = json.loads(restored.model_dump_json(exclude_none=True, exclude_unset=True))
+        rolled_back = (basket_quantities(restored) == basket_quantities(original_snapshot)
+                       and restored.coupon == original_snapshot.coupon)
+    except ApiException as e:
+        rollback_errors.append(f"view basket: {e.detail}")
+
+    if rolled_back:
+        message += ". All changes were rolled back, the basket is unchanged (basket_before)."
+    else:
+        message += f". Rollback incomplete: {'; '.join(rollback_errors) or 'basket differs from basket_before'}"
+    return encode_payload(SetBasketResult(
+        status="FAILURE",
+        message=message,
+        basket_before=basket_before,
+        basket_after=basket_after,
+        failed_operation=failed_op.describe(),
+        rolled_back=rolled_back,
+    ))
 
 
 # ------------------------------------------------------------------
 # Tool entry point
 # ------------------------------------------------------------------
-async def set_basket_state(new_basket: dict) -> str:
+@traced("tool")
+async def set_basket_state(new_basket: dict, transactional: bool = True) -> str:
     """
     Atomically replace the live basket with the supplied state.
-    Returns a JSON-encoded SetBasketResult.
+    In transactional mode a failed operation rolls the basket back to its original state.
+    Returns the SetBasketResult encoded with encode_payload.
     """
-    from . import _store_client
+    from . import get_store_context
+    context = get_store_context()
     print(f"[TOOL] set_basket_state({new_basket})")
 
     # 1. Parse & validate -------------------------------------------------
     try:
         blueprint = BasketBlueprint.model_validate(new_basket)
     except Exception as e:
-        return SetBasketResult(
+        return encode_payload(SetBasketResult(
             status="FAILURE",
             message=f"Invalid input schema: {e}",
             basket_before={},
             basket_after={},
-        ).model_dump_json()
+        ))
 
     # 2. Snapshot original basket ----------------------------------------
     try:
-        original_snapshot = _store_client.dispatch(store.Req_ViewBasket())
+        original_snapshot = await context.dispatch(store.Req_ViewBasket())
     except ApiException as e:
-        return SetBasketResult(
+        return encode_payload(SetBasketResult(
             status="FAILURE",
             message=f"Unable to read original basket: {e.detail}",
             basket_before={},
             basket_after={},
-        ).model_dump_json()
-
-    # 3. Critical section: swap basket -----------------------------------
-    try:
-        # 3a. blank slate
-        _clear_basket()
-
-        # 3b. add requested items
-        for it in blueprint.items:
-            _store_client.dispatch(
-                store.Req_AddProductToBasket(sku=it.sku, quantity=it.quantity)
-            )
-
-        # 3c. apply coupon (if any)
-        if blueprint.coupon:
-            _store_client.dispatch(store.Req_ApplyCoupon(coupon=blueprint.coupon))
-
-    except ApiException as e:
-        # rollback not possible – we already cleared.  Caller must retry.
-        return SetBasketResult(
-            status="FAILURE",
-            message=f"Failed while building new basket: {e.detail}",
-            basket_before=json.loads(
-                original_snapshot.model_dump_json(exclude_none=True, exclude_unset=True)
-            ),
-            basket_after={},  # unknown – we crashed
-        ).model_dump_json()
+        ))
+
+    # 3. Critical section: apply only the difference --------------------
+    current = basket_quantities(original_snapshot)
+    target = item_quantities(blueprint.items)
+    ops = plan_basket_ops(current, original_snapshot.coupon, target, blueprint.coupon)
+    print(f"[TOOL] set_basket_state: {len(ops)} operation(s)")
+    journal: List[BasketOp] = []  # inverse of every applied operation
+    coupon = original_snapshot.coupon
+    if coupon and any(op.kind in ("add", "remove") for op in ops):
+        # the store may drop the coupon on item changes, a rollback has to bring it back
+        journal.append(BasketOp("apply_coupon", coupon=coupon))
+    for op in ops:
+        try:
+            await context.dispatch(op.request())
+        except ApiException as e:
+            return await _failure_result(context, original_snapshot, op, e, journal if transactional else None)
+        journal.append(op.inverse(coupon))
+        if op.kind == "apply_coupon":
+            coupon = op.coupon
+        elif op.kind == "remove_coupon":
+            coupon = None
 
     # 4. Snapshot new basket ---------------------------------------------
     try:
-        new_snapshot = _store_client.dispatch(store.Req_ViewBasket())
+        new_snapshot = await context.dispatch(store.Req_ViewBasket())
     except ApiException as e:
-        return SetBasketResult(
+        return encode_payload(SetBasketResult(
             status="FAILURE",
             message=f"New basket built but cannot read it back: {e.detail}",
             basket_before=json.loads(
                 original_snapshot.model_dump_json(exclude_none=True, exclude_unset=True)
             ),
             basket_after={},
-        ).model_dump_json()
+        ))
+
+    # 4b. Keep the wanted coupon if the store dropped it on item changes
+    reads = 0  # basket views besides the first and the last one
+    coupon = new_snapshot.coupon  # the drop itself is already in the journal
+    if blueprint.coupon and coupon != blueprint.coupon:
+        keep_coupon = BasketOp("apply_coupon", coupon=blueprint.coupon)
+        ops.append(keep_coupon)
+        try:
+            await context.dispatch(keep_coupon.request())
+            journal.append(keep_coupon.inverse(coupon))
+            reads += 1
+            new_snapshot = await context.dispatch(store.Req_ViewBasket())
+        except ApiException as e:
+            return await _failure_result(context, original_snapshot, keep_coupon, e,
+                                         journal if transactional else None)
+    # compared to the calls actually sent
+    saved = max(rebuild_op_count(current, original_snapshot.coupon, target, blueprint.coupon)
+                - len(ops) - reads, 0)
 
     # 5. Success ----------------------------------------------------------
-    return SetBasketResult(
+    return encode_payload(SetBasketResult(
         status="SUCCESS",
         message="Basket state replaced successfully",
         basket_before=json.loads(
@@ -129,7 +196,9 @@ async def set_basket_state(new_basket: dict) -> str:
         basket_after=json.loads(
             new_snapshot.model_dump_json(exclude_none=True, exclude_unset=True)
         ),
-    ).model_dump_json()
+        operations=[op.describe() for op in ops],
+        api_calls_saved=saved,
+    ))
 
 
 # ------------------------------------------------------------------
@@ -149,6 +218,11 @@ def set_basket_state_tool():
                 "type": "object",
                 "properties": {
                     "new_basket": BasketBlueprint.model_json_schema(),
+                    "transactional": {
+                        "type": "boolean",
+                        "description": "Roll the basket back to its original state if any step fails (default: true).",
+                        "default": True,
+                    },
                 },
                 "required": ["new_basket"],
             },
@@ -0,0 +1,204 @@
+"""Local inference of coupon rules from observed basket snapshots."""
+import os
+from dataclasses import dataclass
+
+from . import get_store_context
+from .basket_diff import basket_key, basket_quantities
+
+# Predictions at or above this confidence replace store probes (set above 1 to always probe)
+SHADOW_PRICING_CONFIDENCE = float(os.getenv("SHADOW_PRICING_CONFIDENCE", "0.75"))
+
+# Money is compared with cent precision
+_TOLERANCE = 0.011
+
+
+@dataclass(frozen=True)
+class _Observation:
+    quantities: dict[str, int]
+    subtotal: float
+    discount: float
+
+
+@dataclass(frozen=True)
+class _Rule:
+    """One candidate explanation of a coupon: kind, parameter and SKU scope (None = whole basket)."""
+    kind: str  # "percentage" | "fixed"
+    value: float  # rate for percentage, amount for fixed
+    scope: str | None = None
+
+    def describe(self) -> str:
+        amount = f"{self.value * 100:.4g}%" if self.kind == "percentage" else f"{self.value:.2f} off"
+        return f"{amount} on {self.scope or 'whole basket'}"
+
+
+class ShadowPricer:
+    """
+    Infers coupon rules (percentage or fixed amount, minimum quantity, SKU scope)
+    from the basket snapshots the store returned, and predicts totals of baskets
+    that were never built.
+
+    For every coupon all rules consistent with its observations are kept. A prediction
+    has a confidence only when every remaining rule (and every possible minimum quantity)
+    gives the same discount; it is then 1 / number of remaining rules, so only a coupon
+    narrowed down to a single rule reaches the default threshold. Rules that happen to
+    agree on one basket do not, however many baskets were observed.
+    """
+
+    def __init__(self):
+        self.observations: dict[str, dict[frozenset, _Observation]] = {}  # coupon -> basket -> observation
+        self.subtotals: dict[frozenset, float] = {}  # basket -> observed subtotal
+        self.prices: dict[str, float] = {}  # sku -> unit price learned from snapshots
+
+    # -- learning ---------------------------------------------------------
+    def observe(self, snapshot):
+        """Record a Req_ViewBasket response."""
+        quantities = basket_quantities(snapshot)
+        if not quantities:
+            return
+        key = basket_key(quantities)
+        self.subtotals[key] = snapshot.subtotal
+        for line in snapshot.items or []:
+            price = getattr(line, "price", None)
+            if price is not None:
+                self.prices[line.sku] = price
+        if len(quantities) == 1:
+            (sku, qty), = quantities.items()
+            self.prices.setdefault(sku, snapshot.subtotal / qty)
+        if snapshot.coupon:
+            discount = snapshot.subtotal - snapshot.total
+            self.observations.setdefault(snapshot.coupon, {})[key] = _Observation(
+                dict(quantities), snapshot.subtotal, discount)
+
+    def _price(self, sku: str) -> float | None:
+        if sku in self.prices:
+            return self.prices[sku]
+        context = get_store_context()
+        if context.catalog is not None:
+            for product in context.catalog.products.values():
+                if product.sku == sku:
+                    return product.price
+        return None
+
+    def _subtotal(self, quantities: dict[str, int]) -> float | None:
+        key = basket_key(quantities)
+        if key in self.subtotals:
+            return self.subtotals[key]
+        total = 0.0
+        for sku, qty in quantities.items():
+            price = self._price(sku)
+            if price is None:
+                return None
+            total += qty * price
+        return total
+
+    def _scoped(self, rule: _Rule, quantities: dict[str, int], subtotal: float) -> tuple[int, float] | None:
+        """Quantity and subtotal the rule applies to, None if a needed price is unknown."""
+        if rule.scope is None:
+            return sum(quantities.values()), subtotal
+        qty = quantities.get(rule.scope, 0)
+        if not qty:
+            return 0, 0.0
+        price = self._price(rule.scope)
+        return None if price is None else (qty, qty * price)
+
+    @staticmethod
+    def _discount(rule: _Rule, scoped_subtotal: float) -> float:
+        if rule.kind == "percentage":
+            return rule.value * scoped_subtotal
+        return min(rule.value, scoped_subtotal)
+
+    def rules(self, coupon: str) -> list[tuple[_Rule, int, int]]:
+        """
+        Rules consistent with every observation of the coupon, each with the range of its
+        minimum quantity: (rule, largest quantity seen without discount, smallest seen with one).
+        """
+        observed = list(self.observations.get(coupon, {}).values())
+        positive = [o for o in observed if o.discount > _TOLERANCE]
+        if not positive:
+            return []
+        first = positive[0]
+        scopes = [None] + sorted({sku for o in positive for sku in o.quantities})
+        consistent = []
+        for scope in scopes:
+            for kind in ("percentage", "fixed"):
+                probe_rule = _Rule(kind, 0.0, scope)
+                scoped = self._scoped(probe_rule, first.quantities, first.subtotal)
+                if scoped is None or scoped[1] <= 0:
+                    continue
+                # stores round discounts to cents, rates are taken in basis points
+                value = round(first.discount / scoped[1], 4) if kind == "percentage" else first.discount
+                rule = _Rule(kind, value, scope)
+                bounds = self._fit(rule, observed)
+                if bounds is not None:
+                    consistent.append((rule, *bounds))
+        return consistent
+
+    def _fit(self, rule: _Rule, observed: list[_Observation]) -> tuple[int, int] | None:
+        """Minimum quantity range if the rule explains all observations, None otherwise."""
+        below, at_least = 0, None
+        for o in observed:
+            scoped = self._scoped(rule, o.quantities, o.subtotal)
+            if scoped is None:
+                return None
+            qty, sub = scoped
+            if o.discount > _TOLERANCE:
+                if abs(self._discount(rule, sub) - o.discount) > _TOLERANCE:
+                    return None
+                at_least = qty if at_least is None else min(at_least, qty)
+            elif qty:
+                below = max(below, qty)
+        if at_least is None or below >= at_least:
+            return None
+        return below, at_least
+
+    # -- prediction -------------------------------------------------------
+    def predict(self, quantities: dict[str, int], coupon: str) -> dict | None:
+        """
+        Predicted totals of the basket with the coupon applied, same shape as the
+        coupon engine results plus ``predicted`` and ``confidence``. None if unknown.
+        """
+        subtotal = self._subtotal(quantities)
+        rules = self.rules(coupon)
+        if subtotal is None or not rules:
+            return None
+        discounts = set()
+        for rule, below, at_least in rules:
+            scoped = self._scoped(rule, quantities, subtotal)
+            if scoped is None:
+                return None
+            qty, sub = scoped
+            if qty >= at_least:
+                discounts.add(round(self._discount(rule, sub), 2))
+            elif qty <= below:
+                discounts.add(0.0)
+            else:
+                # the minimum quantity lies somewhere in between
+                discounts.update({round(self._discount(rule, sub), 2), 0.0})
+        confidence = 0.0 if len(discounts) > 1 else 1 / len(rules)
+        discount = max(discounts)
+        return {
+            "subtotal": subtotal,
+            "discount": discount,
+            "grand_total": round(subtotal - discount, 2),
+            "predicted": True,
+            "confidence": round(confidence, 3),
+        }
+
+    def confident(self, quantities: dict[str, int], coupon: str) -> dict | None:
+        """The prediction if it is confident enough to skip the store, None otherwise."""
+        prediction = self.predict(quantities, coupon)
+        if prediction is None or prediction["confidence"] < SHADOW_PRICING_CONFIDENCE:
+            return None
+        return prediction
+
+    def describe(self) -> dict[str, list[str]]:
+        """Coupon -> rules still consistent with the observations."""
+        return {coupon: [f"{rule.describe()}, min quantity {below + 1}..{at_least}"
+                         for rule, below, at_least in self.rules(coupon)]
+                for coupon in self.observations}
+
+
+def get_shadow_pricer() -> ShadowPricer:
+    """Return the shadow pricer of the current task. set_store_context registers it with
+    the task's basket cache, so it observes every basket snapshot read in the task."""
+    return get_store_context().shadow_pricer
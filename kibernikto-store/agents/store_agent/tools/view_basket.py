@@ -1,14 +1,19 @@
 from erc3 import store, ApiException
 from kibernikto.interactors.tools import Toolbox
 
+from ...serialization import encode_payload
+from erc3_shared.tracing import traced
 
+
+@traced("tool")
 async def view_basket() -> str:
     """View current basket contents, totals, and applied discounts"""
-    from . import _store_client
+    from . import get_store_context
+    context = get_store_context()
     print(f"[TOOL] view_basket()")
     try:
-        result = _store_client.dispatch(store.Req_ViewBasket())
-        output = result.model_dump_json(exclude_none=True, exclude_unset=True)
+        result = await context.dispatch(store.Req_ViewBasket())
+        output = encode_payload(result)
         print(f"[TOOL] ✓ view_basket: {output}")
         return output
     except ApiException as e:
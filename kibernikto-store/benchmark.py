@@ -0,0 +1,82 @@
+"""
+Offline benchmark of the store runners.
+
+    python benchmark.py --runner customer --backend simulator --out bench.json
+    python benchmark.py --runner customer --backend replay --cassette runs/session.jsonl.gz --baseline bench.json
+
+Tasks run one after another against the store simulator, a recorded cassette (replay) or
+the live platform. Per task the report holds the wall time, agent steps (LLM completions,
+answered by the LLM or by LLM_CACHE_DIR), LLM calls that went to the provider, tokens
+and store dispatches. With --baseline the per-task means are compared to an earlier
+report and the process exits with 1 if any of them got worse by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from kibernikto.bots.ai_settings import AI_SETTINGS
+from openai import AsyncOpenAI
+
+from agents.context import find_store_context
+from agents.dispatch import run_blocking
+from erc3_shared.benchmark import CountingCore, add_arguments, cache_hits, create_backend, task_row, write_report
+from erc3_shared.usage_reporter import get_usage_reporter
+from runners import run_single_agent, run_visitor_conversation, run_auditor_conversation, run_customer_conversation
+from simulator import SimulatedERC3
+
+RUNNERS = {
+    "single": run_single_agent,
+    "customer": run_customer_conversation,
+    "visitor": run_visitor_conversation,
+    "auditor": run_auditor_conversation,
+}
+
+
+async def run_task(core: CountingCore, task, runner, client: AsyncOpenAI) -> dict:
+    hits_before = cache_hits()
+    await run_blocking(core.start_task, task)
+    started = time.perf_counter()
+    error = None
+    try:
+        await runner(AI_SETTINGS.OPENAI_API_MODEL, core, task, client=client)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - started
+
+    context = find_store_context()
+    if context is not None and context.task.task_id != task.task_id:
+        context = None  # the runner failed before setting up the task
+    tokens = context.tokens.stats() if context else {}
+    await run_blocking(get_usage_reporter(core).drain, task.task_id)
+    result = await run_blocking(core.complete_task, task)
+    # cache hits are recorded too, with 0 tokens
+    return task_row(core, task, result, wall, steps=tokens.get("calls", 0), hits=cache_hits() - hits_before,
+                    tokens=tokens, error=error)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark the store runners on recorded or simulated backends")
+    parser.add_argument("--runner", choices=sorted(RUNNERS), default="customer")
+    add_arguments(parser, ["simulator", "replay", "live"])
+    args = parser.parse_args()
+
+    client = AsyncOpenAI()
+    core = CountingCore(create_backend(args.backend, args.cassette, SimulatedERC3.from_env))
+    session = core.start_session(benchmark="store", workspace="benchmark", name=f"benchmark {args.runner}",
+                                 architecture=f"Kibernikto agents, {args.runner} runner")
+    tasks = core.session_status(session.session_id).tasks[:args.tasks]
+
+    results = []
+    for task in tasks:
+        print("=" * 40)
+        print(f"Benchmark task: {task.task_id} ({task.spec_id}): {task.task_text}")
+        results.append(await run_task(core, task, RUNNERS[args.runner], client))
+        print(f"Benchmark [{task.task_id}]: {json.dumps(results[-1])}")
+    core.submit_session(session.session_id)
+
+    write_report({"project": "kibernikto-store", "runner": args.runner, "backend": args.backend}, results, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
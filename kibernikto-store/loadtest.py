@@ -0,0 +1,164 @@
+"""
+Load generator finding where concurrent task execution stops scaling.
+
+    python loadtest.py --levels 1,4,16,64 --tasks 200 --llm-latency-ms 300 --store-latency-ms 30
+
+Every level runs ``--tasks`` synthetic tasks through the single store agent runner with
+that many tasks at a time, against the store simulator and a stub LLM endpoint. Reported
+per level: tasks/sec, LLM step latency percentiles as seen by the agents (connection
+pool waits included), event loop lag and traced memory per running task. The level where
+throughput stops growing points at the bottleneck: LLM connection pool
+(--max-connections), store dispatch pool (STORE_DISPATCH_WORKERS) or the event loop.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import time
+import tracemalloc
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from agents.dispatch import run_blocking
+from erc3_shared.usage_reporter import get_usage_reporter
+from runners import run_single_agent
+from simulator import Latency, SimulatedERC3, StubLLMServer
+
+
+def percentiles(values: list[float]) -> dict:
+    """p50/p95/p99 in milliseconds."""
+    if len(values) < 2:
+        value = round(values[0] * 1000, 1) if values else None
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(values, n=100)
+    return {"p50": round(cuts[49] * 1000, 1), "p95": round(cuts[94] * 1000, 1), "p99": round(cuts[98] * 1000, 1)}
+
+
+class StepTimer:
+    """httpx event hooks measuring every LLM round trip."""
+
+    def __init__(self):
+        self.durations: list[float] = []
+        self._started: dict[int, float] = {}
+
+    async def on_request(self, request: httpx.Request):
+        self._started[id(request)] = time.perf_counter()
+
+    async def on_response(self, response: httpx.Response):
+        started = self._started.pop(id(response.request), None)
+        if started is not None:
+            self.durations.append(time.perf_counter() - started)
+
+
+async def monitor_loop_lag(lags: list[float], interval: float = 0.01):
+    """How late the event loop wakes up a 10 ms sleep, until cancelled."""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def run_level(concurrency: int, args, llm_url: str) -> dict:
+    core = SimulatedERC3(seed=args.seed, tasks=args.tasks, products=args.products,
+                         latency=Latency(args.store_latency_ms / 1000))
+    tasks = core.session_status(core.start_session().session_id).tasks
+    timer = StepTimer()
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections),
+        event_hooks={"request": [timer.on_request], "response": [timer.on_response]})
+    client = AsyncOpenAI(base_url=llm_url, api_key="stub", http_client=http_client, max_retries=0)
+    semaphore = asyncio.Semaphore(concurrency)
+    task_times, errors = [], 0
+
+    async def run_task(task):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            await run_blocking(core.start_task, task)
+            try:
+                await run_single_agent("stub", core, task, client=client)
+            except Exception:
+                errors += 1
+            await run_blocking(get_usage_reporter(core).drain, task.task_id)
+            await run_blocking(core.complete_task, task)
+            task_times.append(time.perf_counter() - started)
+
+    lags: list[float] = []
+    monitor = asyncio.create_task(monitor_loop_lag(lags))
+    if args.memory:
+        tracemalloc.start()
+    memory_before = tracemalloc.get_traced_memory()[0] if args.memory else 0
+    started = time.perf_counter()
+    await asyncio.gather(*(run_task(task) for task in tasks))
+    elapsed = time.perf_counter() - started
+    memory_peak = tracemalloc.get_traced_memory()[1] if args.memory else 0
+    if args.memory:
+        tracemalloc.stop()
+    monitor.cancel()
+    await http_client.aclose()
+
+    return {
+        "concurrency": concurrency,
+        "tasks": len(tasks),
+        "errors": errors,
+        "seconds": round(elapsed, 2),
+        "tasks_per_sec": round(len(tasks) / elapsed, 2),
+        "llm_steps": len(timer.durations),
+        "step_ms": percentiles(timer.durations),
+        "task_ms": percentiles(task_times),
+        "loop_lag_ms": percentiles(lags),
+        "store_calls": core.stats()["store_calls"],
+        "memory_per_task_kb": round((memory_peak - memory_before) / min(concurrency, len(tasks)) / 1024, 1)
+        if args.memory else None,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Throughput of concurrent store tasks at increasing concurrency")
+    parser.add_argument("--levels", default="1,2,4,8,16,32,64", help="comma separated concurrency levels")
+    parser.add_argument("--tasks", type=int, default=200, help="synthetic tasks per level")
+    parser.add_argument("--products", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--store-latency-ms", type=float, default=30)
+    parser.add_argument("--max-connections", type=int, default=100, help="LLM client connection pool size")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="skip tracemalloc, it slows the agents down noticeably")
+    parser.add_argument("--out", default="loadtest.json", help="report file")
+    parser.add_argument("--verbose", action="store_true", help="keep the agent and tool output")
+    args = parser.parse_args()
+
+    server = StubLLMServer(latency=args.llm_latency_ms / 1000).start()
+    print(f"Stub LLM at {server.url}, {args.tasks} tasks per level, "
+          f"STORE_DISPATCH_WORKERS={os.getenv('STORE_DISPATCH_WORKERS', '32')}")
+    print(f"{'concurrency':>11} {'tasks/s':>8} {'step p50':>9} {'p95':>8} {'p99':>8} "
+          f"{'lag p99':>8} {'KB/task':>8} {'errors':>6}")
+    results = []
+    try:
+        for concurrency in (int(level) for level in args.levels.split(",")):
+            with open(os.devnull, "w") as devnull, \
+                    contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull):
+                result = await run_level(concurrency, args, server.url)
+            results.append(result)
+            step, lag = result["step_ms"], result["loop_lag_ms"]
+            print(f"{concurrency:>11} {result['tasks_per_sec']:>8} {step['p50']:>9} {step['p95']:>8} "
+                  f"{step['p99']:>8} {lag['p99']:>8} {str(result['memory_per_task_kb']):>8} {result['errors']:>6}")
+    finally:
+        server.stop()
+
+    # the first level that adds less than 10% throughput over the previous one
+    for before, after in zip(results, results[1:]):
+        if after["tasks_per_sec"] < before["tasks_per_sec"] * 1.1:
+            print(f"Throughput plateaus at concurrency {before['concurrency']} "
+                  f"(~{before['tasks_per_sec']} tasks/s)")
+            break
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"levels": results, "llm_requests": server.requests}, f, indent=2)
+    print(f"Load test report written to {args.out}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,56 +1,106 @@
 import asyncio
 import logging
+import os
 import textwrap
 import datetime
+from collections import Counter
 
 from kibernikto.bots.ai_settings import AI_SETTINGS
 from kibernikto.utils.environment import configure_logger
 from openai import AsyncOpenAI
 from runners import run_visitor_conversation, run_auditor_conversation, run_customer_conversation
-from erc3 import ERC3
+from erc3 import ERC3, TaskInfo
+from agents.context import find_store_context
+from agents.dispatch import run_blocking
+from agents.serialization import PAYLOAD_FORMAT
+from erc3_shared.tracing import span
+from erc3_shared.usage_reporter import get_usage_reporter
+from erc3_shared.cassette import create_core, get_cassette
+from simulator import STORE_SIMULATOR, SimulatedERC3
 
+# How many tasks of a session are solved at the same time
+TASK_CONCURRENCY = int(os.getenv("TASK_CONCURRENCY", "4"))
 
-async def main():
+# product catalog cache counters summed over the session
+catalog_stats = Counter()
+# LLM payload sizes (plain JSON vs sent encoding) summed over the session
+payload_stats = Counter()
+
+
+async def run_task(core: ERC3, task: TaskInfo, client: AsyncOpenAI, semaphore: asyncio.Semaphore):
+    """Run a single task inside the concurrency limit, keeping its start/complete lifecycle intact."""
+    async with semaphore:
+        with span("task", "task", task_id=task.task_id, spec_id=task.spec_id) as task_span:
+            print("=" * 40)
+            print(f"Starting Task: {task.task_id} ({task.spec_id}): {task.task_text}")
+
+            # start the task (the ERC3 core client is blocking, keep it off the event loop)
+            await run_blocking(core.start_task, task)
+
+            try:
+                # Run customer-store conversation with shared client
+                await run_customer_conversation(AI_SETTINGS.OPENAI_API_MODEL, core, task, client=client)
+            except Exception as e:
+                print(f"Error running agent for task {task.task_id}: {e}")
+                import traceback
+                traceback.print_exc()
+            context = find_store_context()
+            if context:
+                print(f"Basket cache [{task.task_id}]: {context.basket.stats()}")
+            if context and context.catalog:
+                print(f"Catalog cache [{task.task_id}]: {context.catalog.stats()}")
+                catalog_stats.update(context.catalog.stats())
+            if context and context.tokens.records:
+                print(f"Tokens [{task.task_id}]: {context.tokens.stats()}")
+                print(f"Prompt tokens per call, estimated/reported [{task.task_id}]: {context.tokens.curve()}")
+            if context and context.compaction:
+                print(f"Prompt compaction [{task.task_id}]: {dict(context.compaction)}")
+            if context and context.payloads:
+                print(f"Payload tokens [{task.task_id}]: {context.payloads.stats()}")
+                payload_stats.update(context.payloads.stats())
+            # all queued log_llm records of the task must reach ERC3 before it is evaluated
+            await run_blocking(get_usage_reporter(core).drain, task.task_id)
+            result = await run_blocking(core.complete_task, task)
+            if result.eval:
+                explain = textwrap.indent(result.eval.logs, "  ")
+                task_span.set(score=result.eval.score)
+                print(f"\nSCORE [{task.task_id}]: {result.eval.score}\n{explain}\n")
+
+
+async def main(concurrency: int = TASK_CONCURRENCY):
     # Create shared OpenAI client for all agents
     client = AsyncOpenAI()
-    core = ERC3()
-
-    # Start session with metadata
-    timestamp_suffix = int(datetime.datetime.now().timestamp()) % 1000000
-    res = core.start_session(
-        benchmark="store",
-        workspace="kibernikto",
-        name=f"kibernikto agents",
-        architecture="Kibernikto agents chat, request preprocess"
-    )
-
-    status = core.session_status(res.session_id)
-    print(f"Session has {len(status.tasks)} tasks")
-
-    for task in status.tasks:
-        print("=" * 40)
-        print(f"Starting Task: {task.task_id} ({task.spec_id}): {task.task_text}")
-
-        # start the task
-        core.start_task(task)
-        if task.spec_id != 'soda_pack_optimizer' and 1==2:
-            print(f"Skipping task {task.spec_id}")
-            skipped = core.complete_task(task)
-            continue
-
-        try:
-            # Run visitor-store conversation with shared client
-            await run_customer_conversation(AI_SETTINGS.OPENAI_API_MODEL, core, task, client=client)
-        except Exception as e:
-            print(f"Error running agent: {e}")
-            import traceback
-            traceback.print_exc()
-        result = core.complete_task(task)
-        if result.eval:
-            explain = textwrap.indent(result.eval.logs, "  ")
-            print(f"\nSCORE: {result.eval.score}\n{explain}\n")
-
-    core.submit_session(res.session_id)
+    # plain ERC3 client, or one recorded to / replayed from ERC3_CASSETTE, or the local store simulator
+    core = SimulatedERC3.from_env() if STORE_SIMULATOR else create_core()
+
+    with span("session", "session", benchmark="store", concurrency=concurrency):
+        # Start session with metadata
+        timestamp_suffix = int(datetime.datetime.now().timestamp()) % 1000000
+        res = core.start_session(
+            benchmark="store",
+            workspace="kibernikto",
+            name=f"kibernikto agents",
+            architecture="Kibernikto agents chat, request preprocess"
+        )
+
+        status = core.session_status(res.session_id)
+        print(f"Session has {len(status.tasks)} tasks, running {concurrency} at a time")
+
+        # every task runs in its own asyncio task, so a failing one can not take the others down
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        results = await asyncio.gather(*(run_task(core, task, client, semaphore) for task in status.tasks),
+                                       return_exceptions=True)
+        for task, outcome in zip(status.tasks, results):
+            if isinstance(outcome, BaseException):
+                print(f"Task {task.task_id} failed outside of the agent run: {outcome}")
+        print(f"Catalog cache for the session: {dict(catalog_stats)}")
+        print(f"Payload tokens for the session ({PAYLOAD_FORMAT}): {dict(payload_stats)}")
+        if get_cassette():
+            print(f"ERC3 cassette: {get_cassette().stats()}")
+        if STORE_SIMULATOR:
+            print(f"Store simulator: {core.stats()}")
+
+        core.submit_session(res.session_id)
 
 
 if __name__ == "__main__":
@@ -8,8 +8,10 @@ from agents.store_agent import create_store_agent
 from agents.store_agent import set_store_context as set_store_agent_context
 from agents.customer_agent import create_customer_agent
 from agents.customer_agent import set_store_context as set_customer_context
+from erc3_shared.tracing import traced
 
 
+@traced("conversation")
 async def run_customer_conversation(model: str, api: ERC3, task: TaskInfo, client: AsyncOpenAI = None,
                                     max_turns: int = 10):
     """
@@ -28,7 +30,7 @@ async def run_customer_conversation(model: str, api: ERC3, task: TaskInfo, clien
     set_customer_context(store_client, api, task)
 
     # Create both agents with shared client
-    customer, first_request = create_customer_agent(erc3_api=api, task=task, client=client)
+    customer, first_request = await create_customer_agent(erc3_api=api, task=task, client=client)
     store_agent = create_store_agent(erc3_api=api, task=task, client=client)
 
     print(f"\n{'=' * 60}")
@@ -2,8 +2,10 @@
 from erc3 import TaskInfo, ERC3
 from openai import AsyncOpenAI
 from agents.store_agent import create_store_agent, set_store_context
+from erc3_shared.tracing import traced
 
 
+@traced("conversation")
 async def run_single_agent(model: str, api: ERC3, task: TaskInfo, client: AsyncOpenAI = None):
     """Run only the Store Agent (no Visitor supervision)."""
     # Set up store context
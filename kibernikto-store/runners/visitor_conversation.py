@@ -2,8 +2,10 @@
 from erc3 import TaskInfo, ERC3
 from openai import AsyncOpenAI
 from conversation import run_visitor_conversation as _run_visitor
+from erc3_shared.tracing import traced
 
 
+@traced("conversation")
 async def run_visitor_conversation(model: str, api: ERC3, task: TaskInfo, client: AsyncOpenAI = None, max_turns: int = 10):
     """Run a visitor-store conversation where Visitor supervises Store Agent."""
     return await _run_visitor(
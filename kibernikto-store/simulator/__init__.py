@@ -0,0 +1,15 @@
+"""Local store simulator and stub LLM endpoint for running the agents and tools without the ERC3 platform."""
+from .core import STORE_SIMULATOR, SimulatedERC3
+from .llm import StubLLMServer
+from .store import CouponRule, Latency, Product, SimulatedStore, api_exception
+
+__all__ = [
+    'STORE_SIMULATOR',
+    'SimulatedERC3',
+    'SimulatedStore',
+    'StubLLMServer',
+    'CouponRule',
+    'Latency',
+    'Product',
+    'api_exception',
+]
@@ -0,0 +1,165 @@
+"""
+Stand-in for the ERC3 core client backed by simulated stores.
+
+    STORE_SIMULATOR=1 python main.py
+
+Sessions, tasks and ``log_llm`` are kept in memory; ``get_store_client(task)`` returns
+the SimulatedStore of the task. Catalog, coupons and tasks are generated from a seed,
+so a run can be repeated exactly.
+"""
+import itertools
+import os
+import random
+import threading
+from collections import Counter
+
+from pydantic import BaseModel
+
+from .store import CouponRule, Latency, Product, SimulatedStore
+
+STORE_SIMULATOR = os.getenv("STORE_SIMULATOR", "0") == "1"
+STORE_SIM_SEED = int(os.getenv("STORE_SIM_SEED", "0"))
+STORE_SIM_TASKS = int(os.getenv("STORE_SIM_TASKS", "8"))
+STORE_SIM_PRODUCTS = int(os.getenv("STORE_SIM_PRODUCTS", "40"))
+STORE_SIM_PAGE_LIMIT = int(os.getenv("STORE_SIM_PAGE_LIMIT", "5"))
+STORE_SIM_LATENCY_MS = float(os.getenv("STORE_SIM_LATENCY_MS", "0"))
+STORE_SIM_JITTER_MS = float(os.getenv("STORE_SIM_JITTER_MS", "0"))
+
+_KINDS = [("Soda", 1.2), ("Energy Drink", 2.5), ("Chips", 1.8), ("Cookies", 3.1), ("Coffee Beans", 12.0),
+          ("Green Tea", 4.2), ("Notebook", 5.5), ("USB Cable", 7.9), ("Headphones", 49.0), ("GPU", 499.0)]
+_VARIANTS = ["Classic", "Zero", "XL", "Mini", "Pro", "Organic"]
+_PACKS = [1, 6, 12, 24]
+
+
+class SimTask(BaseModel):
+    task_id: str
+    spec_id: str
+    task_text: str
+    status: str = "new"
+
+
+class SimSession(BaseModel):
+    session_id: str
+    tasks: list[SimTask]
+
+
+class SimEval(BaseModel):
+    score: float
+    logs: str
+
+
+class SimTaskResult(BaseModel):
+    eval: SimEval | None = None
+
+
+def generate_catalog(rng: random.Random, count: int) -> list[Product]:
+    products = []
+    combos = list(itertools.product(_KINDS, _VARIANTS, _PACKS))
+    rng.shuffle(combos)
+    for n, ((kind, base_price), variant, pack) in enumerate(combos[:count]):
+        price = round(base_price * pack * rng.uniform(0.8, 1.1), 2)
+        name = f"{kind} {variant}" + (f" {pack}-pack" if pack > 1 else "")
+        products.append(Product(sku=f"{kind[:3].upper()}-{n:03d}", name=name, price=price,
+                                available=rng.choice([0, 2, 5, 10, 25, 100])))
+    return products
+
+
+def generate_coupons(rng: random.Random, products: list[Product]) -> list[CouponRule]:
+    picked = rng.sample(products, k=min(3, len(products)))
+    coupons = [
+        CouponRule("SAVE10", percent=10),
+        CouponRule("MINUS5", amount=5.0, min_quantity=3),
+    ]
+    for n, product in enumerate(picked):
+        coupons.append(CouponRule(f"BULK{n + 1}", percent=rng.choice([15, 20, 30]), sku=product.sku,
+                                  min_quantity=rng.choice([2, 3, 6])))
+    return coupons
+
+
+def generate_task(rng: random.Random, products: list[Product], coupons: list[CouponRule], n: int) -> SimTask:
+    product = rng.choice(products)
+    quantity = rng.choice([1, 2, 3, 6])
+    kind = product.name.split()[0]
+    templates = [
+        ("buy_quantity", f"Buy {quantity} x {product.name} and checkout."),
+        ("cheapest", f"Buy the cheapest {kind} product available and checkout."),
+        ("best_coupon", f"Buy {quantity} x {product.name}, apply the coupon giving the lowest total "
+                        f"({', '.join(c.code for c in coupons)}) and checkout."),
+        ("out_of_stock", f"Buy {product.available + 1} x {product.name} if the store has that many, "
+                         f"otherwise do nothing."),
+    ]
+    spec_id, text = rng.choice(templates)
+    return SimTask(task_id=f"sim-{n:04d}", spec_id=spec_id, task_text=text)
+
+
+class SimulatedERC3:
+    """ERC3 core client replacement: one SimulatedStore per task, everything in memory."""
+
+    def __init__(self, seed: int = 0, tasks: int = 8, products: int = 40, page_limit: int = 5,
+                 latency: Latency = Latency()):
+        rng = random.Random(seed)
+        self.seed = seed
+        self.page_limit = page_limit
+        self.latency = latency
+        self.products = generate_catalog(rng, products)
+        self.coupons = generate_coupons(rng, self.products)
+        self.tasks = [generate_task(rng, self.products, self.coupons, n) for n in range(tasks)]
+        self.stores: dict[str, SimulatedStore] = {}
+        self.calls = Counter()
+        self._sessions = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SimulatedERC3":
+        return cls(seed=STORE_SIM_SEED, tasks=STORE_SIM_TASKS, products=STORE_SIM_PRODUCTS,
+                   page_limit=STORE_SIM_PAGE_LIMIT,
+                   latency=Latency(STORE_SIM_LATENCY_MS / 1000, STORE_SIM_JITTER_MS / 1000))
+
+    def _count(self, method: str):
+        with self._lock:
+            self.calls[method] += 1
+
+    def start_session(self, **kwargs) -> SimSession:
+        self._count("start_session")
+        return SimSession(session_id=f"sim-session-{next(self._sessions)}", tasks=[])
+
+    def session_status(self, session_id: str) -> SimSession:
+        self._count("session_status")
+        return SimSession(session_id=session_id, tasks=self.tasks)
+
+    def start_task(self, task):
+        self._count("start_task")
+        task.status = "running"
+
+    def get_store_client(self, task) -> SimulatedStore:
+        with self._lock:
+            if task.task_id not in self.stores:
+                self.stores[task.task_id] = SimulatedStore(
+                    self.products, self.coupons, page_limit=self.page_limit, latency=self.latency,
+                    seed=self.seed + len(self.stores))
+            return self.stores[task.task_id]
+
+    def log_llm(self, **kwargs):
+        self._count("log_llm")
+
+    def complete_task(self, task) -> SimTaskResult:
+        """Completes the task. The score only says whether the agent checked out, it is not a grade."""
+        self._count("complete_task")
+        task.status = "completed"
+        store = self.stores.get(task.task_id)
+        if store is None or not store.checkouts:
+            return SimTaskResult(eval=SimEval(score=0.0, logs="no checkout"))
+        checkout = store.checkouts[-1]
+        lines = ", ".join(f"{line.quantity} x {line.sku}" for line in checkout.items)
+        return SimTaskResult(eval=SimEval(
+            score=1.0, logs=f"checked out {lines}, coupon {checkout.coupon}, total {checkout.total}"))
+
+    def submit_session(self, session_id: str):
+        self._count("submit_session")
+
+    def stats(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "store_calls": sum(s.calls for s in self.stores.values()),
+            "checkouts": sum(len(s.checkouts) for s in self.stores.values()),
+        }
@@ -0,0 +1,113 @@
+"""
+Stub OpenAI-compatible chat completions endpoint for load tests.
+
+Answers POST /v1/chat/completions from a script instead of a model: the store agent
+first lists the catalog, then sets a basket with SKUs seen in the conversation and
+finally answers in text. Steps whose tool is not offered in the request are skipped.
+Latency is injected per completion, usage is estimated from the request size.
+"""
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SKU_PATTERN = re.compile(r"\b[A-Z]{3}-\d{3}\b")
+
+
+def default_script(step: int, messages: list[dict]) -> tuple[str, dict] | None:
+    """Tool call of the given step of a store agent run, None to answer in text."""
+    if step == 0:
+        return "list_products", {"offset": 0, "limit": 5, "max_pages": 8}
+    if step == 1:
+        text = " ".join(str(m.get("content") or "") for m in messages)
+        skus = list(dict.fromkeys(SKU_PATTERN.findall(text)))[:2]
+        if skus:
+            items = [{"sku": sku, "quantity": 1, "price": 0} for sku in skus]
+            return "set_basket_state", {"new_basket": {"items": items, "coupon": None}}
+    return None
+
+
+class StubLLMServer:
+    """Threaded HTTP server running in the background, see ``url``."""
+
+    def __init__(self, latency: float = 0.0, script=default_script, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.script = script
+        self.requests = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-llm", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubLLMServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def complete(self, request: dict) -> dict:
+        """Chat completion response for a request body."""
+        with self._lock:
+            self.requests += 1
+            n = next(self._ids)
+        if self.latency:
+            time.sleep(self.latency)
+        messages = request.get("messages") or []
+        offered = {tool["function"]["name"] for tool in request.get("tools") or []}
+        step = sum(1 for m in messages if m.get("role") == "tool")
+        call = self.script(step, messages) if offered else None
+        if call is not None and call[0] not in offered:
+            call = None
+        if call is None:
+            message = {"role": "assistant", "content": "Done, the basket is ready. TASK_COMPLETE"}
+            finish_reason = "stop"
+        else:
+            name, arguments = call
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{n}", "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments)}}]}
+            finish_reason = "tool_calls"
+        prompt_tokens = len(json.dumps(messages)) // 4
+        completion_tokens = len(json.dumps(message)) // 4
+        return {
+            "id": f"stub-{n}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                payload = json.dumps(server.complete(json.loads(body))).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass  # one line per request would drown the load test output
+
+        return Handler
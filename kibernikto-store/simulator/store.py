@@ -0,0 +1,220 @@
+"""
+In-process store answering the StoreClient ``dispatch`` contract.
+
+Handles the request types the tools send (Req_ListProducts, Req_ViewBasket,
+Req_AddProductToBasket, Req_RemoveItemFromBasket, Req_ApplyCoupon, Req_RemoveCoupon,
+Req_CheckoutBasket) and fails the way the store API does: ApiException with
+``api_error.error`` and ``detail`` ("page limit exceeded: 50 > 3", "invalid pagination", ...).
+Responses are plain pydantic models with the fields the tools read.
+"""
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+from erc3 import ApiException, store
+from pydantic import BaseModel
+
+
+class ApiError(BaseModel):
+    status: int
+    error: str
+
+
+class Product(BaseModel):
+    sku: str
+    name: str
+    price: float
+    available: int
+
+
+class ProductPage(BaseModel):
+    products: list[Product]
+    next_offset: int | None = None
+
+
+class BasketLine(BaseModel):
+    sku: str
+    name: str
+    quantity: int
+    price: float
+
+
+class BasketView(BaseModel):
+    items: list[BasketLine]
+    subtotal: float
+    coupon: str | None = None
+    discount: float | None = None
+    total: float
+
+
+class StoreAck(BaseModel):
+    ok: bool = True
+
+
+class CheckoutResult(BaseModel):
+    items: list[BasketLine]
+    subtotal: float
+    coupon: str | None = None
+    discount: float | None = None
+    total: float
+
+
+def api_exception(status: int, error: str, detail: str) -> ApiException:
+    """ApiException shaped like the ones of the store API."""
+    # built without the constructor, only its attributes are part of the contract the tools use
+    e = ApiException.__new__(ApiException)
+    Exception.__init__(e, error, detail)
+    e.api_error = ApiError(status=status, error=error)
+    e.detail = detail
+    return e
+
+
+@dataclass(frozen=True)
+class CouponRule:
+    """
+    Discount of a coupon: ``percent`` of the eligible subtotal or a fixed ``amount``.
+    With ``sku`` only that product is eligible; the coupon gives nothing until the
+    eligible quantity reaches ``min_quantity``.
+    """
+    code: str
+    percent: float | None = None
+    amount: float | None = None
+    sku: str | None = None
+    min_quantity: int = 0
+
+    def discount(self, lines: list[BasketLine]) -> float:
+        eligible = [line for line in lines if self.sku is None or line.sku == self.sku]
+        quantity = sum(line.quantity for line in eligible)
+        if not eligible or quantity < self.min_quantity:
+            return 0.0
+        subtotal = sum(line.price * line.quantity for line in eligible)
+        if self.percent is not None:
+            return round(subtotal * self.percent / 100, 2)
+        return round(min(self.amount or 0.0, subtotal), 2)
+
+
+@dataclass(frozen=True)
+class Latency:
+    """Delay of every simulated call: ``seconds`` plus up to ``jitter`` seconds."""
+    seconds: float = 0.0
+    jitter: float = 0.0
+
+    def wait(self, rng: random.Random):
+        delay = self.seconds + (rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class SimulatedStore:
+    """
+    Store of one task: shared product list with its own stock, basket and coupon.
+
+    ``dispatch`` is blocking and thread safe like the real client, so it runs on the
+    dispatch pool of the agents unchanged.
+    """
+
+    def __init__(self, products: list[Product], coupons: list[CouponRule] = (), page_limit: int = 5,
+                 latency: Latency = Latency(), seed: int = 0):
+        self.products = {p.sku: p.model_copy() for p in products}  # stock is per store
+        self.coupons = {rule.code: rule for rule in coupons}
+        self.page_limit = page_limit
+        self.latency = latency
+        self.basket: dict[str, int] = {}
+        self.coupon: str | None = None
+        self.checkouts: list[CheckoutResult] = []
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._handlers = {
+            store.Req_ListProducts: self._list_products,
+            store.Req_ViewBasket: self._view_basket,
+            store.Req_AddProductToBasket: self._add,
+            store.Req_RemoveItemFromBasket: self._remove,
+            store.Req_ApplyCoupon: self._apply_coupon,
+            store.Req_RemoveCoupon: self._remove_coupon,
+            store.Req_CheckoutBasket: self._checkout,
+        }
+
+    def dispatch(self, request):
+        handler = self._handlers.get(type(request))
+        if handler is None:
+            raise api_exception(400, "bad request", f"unsupported request {type(request).__name__}")
+        self.latency.wait(self._rng)
+        with self._lock:
+            self.calls += 1
+            return handler(request)
+
+    # -- requests ---------------------------------------------------------
+    def _list_products(self, request) -> ProductPage:
+        if request.limit > self.page_limit:
+            raise api_exception(400, "bad request", f"page limit exceeded: {request.limit} > {self.page_limit}")
+        products = list(self.products.values())
+        if request.offset < 0 or request.offset > len(products):
+            raise api_exception(400, "bad request", "invalid pagination")
+        end = request.offset + request.limit
+        return ProductPage(products=products[request.offset:end], next_offset=end if end < len(products) else None)
+
+    def _view_basket(self, request) -> BasketView:
+        lines = self._lines()
+        subtotal = round(sum(line.price * line.quantity for line in lines), 2)
+        discount = self.coupons[self.coupon].discount(lines) if self.coupon else None
+        return BasketView(items=lines, subtotal=subtotal, coupon=self.coupon, discount=discount,
+                          total=round(subtotal - (discount or 0.0), 2))
+
+    def _add(self, request) -> StoreAck:
+        product = self._product(request.sku)
+        if request.quantity <= 0:
+            raise api_exception(400, "bad request", "quantity must be positive")
+        quantity = self.basket.get(request.sku, 0) + request.quantity
+        if quantity > product.available:
+            raise api_exception(409, "conflict",
+                                f"insufficient stock for {request.sku}: {product.available} available")
+        self.basket[request.sku] = quantity
+        return StoreAck()
+
+    def _remove(self, request) -> StoreAck:
+        self._product(request.sku)
+        quantity = self.basket.get(request.sku, 0)
+        if quantity == 0:
+            raise api_exception(404, "not found", f"{request.sku} is not in the basket")
+        if request.quantity <= 0 or request.quantity > quantity:
+            raise api_exception(400, "bad request", f"can not remove {request.quantity} of {quantity} x {request.sku}")
+        if request.quantity == quantity:
+            del self.basket[request.sku]
+        else:
+            self.basket[request.sku] = quantity - request.quantity
+        return StoreAck()
+
+    def _apply_coupon(self, request) -> StoreAck:
+        if request.coupon not in self.coupons:
+            raise api_exception(400, "bad request", f"invalid coupon {request.coupon}")
+        self.coupon = request.coupon
+        return StoreAck()
+
+    def _remove_coupon(self, request) -> StoreAck:
+        self.coupon = None
+        return StoreAck()
+
+    def _checkout(self, request) -> CheckoutResult:
+        if not self.basket:
+            raise api_exception(400, "bad request", "basket is empty")
+        view = self._view_basket(request)
+        for sku, quantity in self.basket.items():
+            self.products[sku].available -= quantity
+        self.basket, self.coupon = {}, None
+        result = CheckoutResult(items=view.items, subtotal=view.subtotal, coupon=view.coupon,
+                                discount=view.discount, total=view.total)
+        self.checkouts.append(result)
+        return result
+
+    # -- helpers ----------------------------------------------------------
+    def _product(self, sku: str) -> Product:
+        product = self.products.get(sku)
+        if product is None:
+            raise api_exception(404, "not found", f"product {sku} not found")
+        return product
+
+    def _lines(self) -> list[BasketLine]:
+        return [BasketLine(sku=sku, name=self.products[sku].name, quantity=quantity, price=self.products[sku].price)
+                for sku, quantity in self.basket.items()]
@@ -0,0 +1,37 @@
+"""
+Tests of the store tools against the bundled store simulator, no network involved.
+
+    cd kibernikto-store && python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# the project modules are imported the way main.py does, from the project directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import serialization  # noqa: E402
+from agents.context import set_store_context  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def json_payloads(monkeypatch):
+    """Tool results encoded as plain JSON, so the tests can read them back."""
+    monkeypatch.setattr(serialization, "PAYLOAD_FORMAT", "json")
+
+
+@pytest.fixture
+def run_task():
+    """
+    Runs ``scenario()`` as the only task of a fresh store context bound to ``store``
+    and returns its result; every call gets its own context, catalog and coupon engine.
+    """
+    def run(store, scenario):
+        async def task():
+            set_store_context(store, None, SimpleNamespace(task_id="test-task"))
+            return await scenario()
+        return asyncio.run(task())
+    return run
@@ -0,0 +1,116 @@
+import json
+
+from agents.store_agent.tools.basket_diff import BasketOp, plan_basket_ops, rebuild_op_count
+from agents.store_agent.tools.set_basket_state import set_basket_state
+from simulator.store import CouponRule, Product, SimulatedStore
+
+PRODUCTS = [
+    Product(sku="ENE-001", name="Energy drink", price=3.0, available=10),
+    Product(sku="GRE-007", name="Green tea", price=2.5, available=2),
+    Product(sku="CHI-006", name="Chips", price=1.2, available=10),
+]
+COUPONS = [CouponRule("SAVE10", percent=10), CouponRule("MINUS5", amount=5)]
+
+
+class CouponDroppingStore(SimulatedStore):
+    """Store that drops the applied coupon whenever the items change."""
+
+    def _add(self, request):
+        self.coupon = None
+        return super()._add(request)
+
+    def _remove(self, request):
+        self.coupon = None
+        return super()._remove(request)
+
+
+def make_store(store_class=SimulatedStore, basket=None, coupon=None):
+    store = store_class(PRODUCTS, COUPONS)
+    store.basket = dict(basket or {})
+    store.coupon = coupon
+    return store
+
+
+def item(sku, quantity):
+    return {"sku": sku, "quantity": quantity, "price": 0}
+
+
+def test_plan_only_changes_the_difference():
+    ops = plan_basket_ops({"ENE-001": 2, "GRE-007": 1}, "SAVE10", {"ENE-001": 3, "CHI-006": 1}, "SAVE10")
+    assert ops == [
+        BasketOp("remove", sku="GRE-007", quantity=1),
+        BasketOp("add", sku="CHI-006", quantity=1),
+        BasketOp("add", sku="ENE-001", quantity=1),
+    ]
+
+
+def test_plan_changes_the_coupon_after_the_items():
+    ops = plan_basket_ops({"ENE-001": 1}, "SAVE10", {"ENE-001": 2}, "MINUS5")
+    assert [op.kind for op in ops] == ["add", "apply_coupon"]
+    assert plan_basket_ops({"ENE-001": 1}, "SAVE10", {"ENE-001": 1}, None) == [BasketOp("remove_coupon")]
+    assert plan_basket_ops({"ENE-001": 1}, "SAVE10", {"ENE-001": 1}, "SAVE10") == []
+
+
+def test_inverse_undoes_the_operation():
+    assert BasketOp("add", sku="A", quantity=2).inverse(None) == BasketOp("remove", sku="A", quantity=2)
+    assert BasketOp("apply_coupon", coupon="X").inverse("Y") == BasketOp("apply_coupon", coupon="Y")
+    assert BasketOp("apply_coupon", coupon="X").inverse(None) == BasketOp("remove_coupon")
+
+
+def test_applies_the_difference(run_task):
+    store = make_store(basket={"ENE-001": 2, "GRE-007": 1}, coupon="SAVE10")
+    result = json.loads(run_task(store, lambda: set_basket_state(
+        {"items": [item("ENE-001", 3), item("CHI-006", 1)], "coupon": "SAVE10"})))
+
+    assert result["status"] == "SUCCESS"
+    assert store.basket == {"ENE-001": 3, "CHI-006": 1}
+    assert store.coupon == "SAVE10"
+    assert result["operations"] == ["remove 1 x GRE-007", "add 1 x CHI-006", "add 1 x ENE-001"]
+    rebuild = rebuild_op_count({"ENE-001": 2, "GRE-007": 1}, "SAVE10", {"ENE-001": 3, "CHI-006": 1}, "SAVE10")
+    assert result["api_calls_saved"] == rebuild - 3
+
+
+def test_failed_operation_rolls_back(run_task):
+    store = make_store(basket={"ENE-001": 2}, coupon="SAVE10")
+    # only 2 GRE-007 in stock: the last addition fails
+    result = json.loads(run_task(store, lambda: set_basket_state(
+        {"items": [item("CHI-006", 4), item("GRE-007", 5)], "coupon": "MINUS5"})))
+
+    assert result["status"] == "FAILURE"
+    assert result["failed_operation"] == "add 5 x GRE-007"
+    assert result["rolled_back"] is True
+    assert store.basket == {"ENE-001": 2}
+    assert store.coupon == "SAVE10"
+
+
+def test_rollback_restores_a_coupon_dropped_by_the_store(run_task):
+    store = make_store(CouponDroppingStore, basket={"ENE-001": 1}, coupon="SAVE10")
+    result = json.loads(run_task(store, lambda: set_basket_state(
+        {"items": [item("ENE-001", 2), item("GRE-007", 5)], "coupon": "SAVE10"})))
+
+    assert result["rolled_back"] is True
+    assert store.basket == {"ENE-001": 1}
+    assert store.coupon == "SAVE10"
+
+
+def test_reapplies_a_coupon_dropped_by_the_store(run_task):
+    store = make_store(CouponDroppingStore, basket={"ENE-001": 1}, coupon="SAVE10")
+    result = json.loads(run_task(store, lambda: set_basket_state(
+        {"items": [item("ENE-001", 2)], "coupon": "SAVE10"})))
+
+    assert result["status"] == "SUCCESS"
+    assert store.coupon == "SAVE10"
+    assert result["operations"] == ["add 1 x ENE-001", "apply coupon SAVE10"]
+    # the re-apply and its extra basket read count against the saving
+    rebuild = rebuild_op_count({"ENE-001": 1}, "SAVE10", {"ENE-001": 2}, "SAVE10")
+    assert result["api_calls_saved"] == rebuild - 3
+
+
+def test_non_transactional_failure_keeps_the_partial_basket(run_task):
+    store = make_store(basket={"ENE-001": 2})
+    result = json.loads(run_task(store, lambda: set_basket_state(
+        {"items": [item("CHI-006", 1), item("GRE-007", 5)]}, transactional=False)))
+
+    assert result["status"] == "FAILURE"
+    assert result["rolled_back"] is False
+    assert store.basket == {"CHI-006": 1}
@@ -0,0 +1,71 @@
+import pytest
+from erc3 import ApiException, store as store_api
+
+from erc3_shared.cassette import Cassette, CassetteMiss, RecordedClient
+from simulator import SimulatedERC3
+
+
+def in_stock_sku(client) -> str:
+    page = client.dispatch(store_api.Req_ListProducts(offset=0, limit=5))
+    return next(product.sku for product in page.products if product.available)
+
+
+def run_session(core) -> list:
+    """A short session: every response (or error detail) in call order."""
+    answers = []
+    session = core.start_session(benchmark="store", workspace="test", name="cassette test")
+    tasks = core.session_status(session.session_id).tasks
+    answers.append([task.task_id for task in tasks])
+    task = tasks[0]
+    core.start_task(task)
+    client = core.get_store_client(task)
+    answers.append(client.dispatch(store_api.Req_ListProducts(offset=0, limit=5)).model_dump())
+    sku = in_stock_sku(client)
+    client.dispatch(store_api.Req_AddProductToBasket(sku=sku, quantity=1))
+    answers.append(client.dispatch(store_api.Req_ViewBasket()).model_dump())
+    try:
+        client.dispatch(store_api.Req_AddProductToBasket(sku=sku, quantity=10_000))
+    except ApiException as e:
+        answers.append(e.detail)
+    core.log_llm(task_id=task.task_id, duration_sec=1.5)
+    answers.append(core.complete_task(task).model_dump())
+    return answers
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """Path of a cassette recorded from the simulator, and the answers seen while recording."""
+    path = str(tmp_path / "session.jsonl.gz")
+    cassette = Cassette(path, "record")
+    answers = run_session(RecordedClient(SimulatedERC3(seed=1, tasks=2), cassette, "core"))
+    cassette.save()
+    return path, answers
+
+
+def test_replay_gives_the_recorded_answers(recording):
+    path, recorded = recording
+    cassette = Cassette(path, "replay")
+    # no inner client: nothing can reach an API
+    assert run_session(RecordedClient(None, cassette, "core")) == recorded
+    assert cassette.stats()["misses"] == 0
+
+
+def test_replay_raises_recorded_errors_as_api_exceptions(recording):
+    path, recorded = recording
+    core = RecordedClient(None, Cassette(path, "replay"), "core")
+    task = core.session_status(core.start_session().session_id).tasks[0]
+    client = core.get_store_client(task)
+    sku = in_stock_sku(client)
+    with pytest.raises(ApiException) as error:
+        client.dispatch(store_api.Req_AddProductToBasket(sku=sku, quantity=10_000))
+    assert error.value.detail in recorded
+
+
+def test_replay_of_an_unrecorded_call_is_a_miss(recording):
+    path, _ = recording
+    cassette = Cassette(path, "replay")
+    core = RecordedClient(None, cassette, "core")
+    task = core.session_status(core.start_session().session_id).tasks[0]
+    with pytest.raises(CassetteMiss):
+        core.get_store_client(task).dispatch(store_api.Req_ListProducts(offset=5, limit=5))
+    assert cassette.stats()["misses"] == 1
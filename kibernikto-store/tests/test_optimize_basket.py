@@ -0,0 +1,102 @@
+import itertools
+import json
+import math
+
+from agents.store_agent.tools.optimize_basket import _CouponModel, _thin_out, optimize_basket
+from simulator.store import BasketLine, CouponRule, Product, SimulatedStore
+
+PRODUCTS = [
+    Product(sku="ENE-001", name="Energy drink", price=3.0, available=4),
+    Product(sku="GRE-007", name="Green tea", price=2.5, available=40),
+    Product(sku="CHI-006", name="Chips", price=1.2, available=40),
+]
+COUPONS = [
+    CouponRule("SAVE10", percent=10),
+    CouponRule("MINUS5", amount=5, min_quantity=4),
+    CouponRule("TEA30", percent=30, sku="GRE-007", min_quantity=3),
+]
+
+
+def cheapest_total(ranges: dict[str, range], coupons: list[str]) -> float:
+    """Best grand total by trying every configuration with every coupon."""
+    prices = {p.sku: p.price for p in PRODUCTS}
+    rules = {rule.code: rule for rule in COUPONS}
+    best = math.inf
+    for quantities in itertools.product(*ranges.values()):
+        lines = [BasketLine(sku=sku, name=sku, quantity=q, price=prices[sku])
+                 for sku, q in zip(ranges, quantities) if q]
+        if not lines:
+            continue
+        subtotal = round(sum(line.price * line.quantity for line in lines), 2)
+        for coupon in [None, *coupons]:
+            discount = rules[coupon].discount(lines) if coupon else 0.0
+            best = min(best, round(subtotal - discount, 2))
+    return best
+
+
+def test_max_discount_is_capped_by_bigger_probed_baskets():
+    model = _CouponModel()
+    assert model.max_discount((1, 1)) is None
+    model.observe((3, 2), 4.0)
+    model.observe((2, 5), 2.5)
+    assert model.max_discount((2, 2)) == 2.5  # below both probes, the smaller cap wins
+    assert model.max_discount((3, 1)) == 4.0
+    assert model.max_discount((4, 1)) is None  # nothing bigger was probed
+
+
+def test_thin_out_keeps_small_spaces():
+    assert _thin_out([range(1, 4), range(0, 3)], 100) == [[1, 2, 3], [0, 1, 2]]
+
+
+def test_thin_out_bounds_the_space_and_keeps_min_and_max():
+    ranges = [range(1, 31), range(0, 26), range(2, 5)]
+    values = _thin_out(ranges, 500)
+    assert math.prod(len(v) for v in values) <= 500
+    for r, v in zip(ranges, values):
+        assert v[0] == r[0] and v[-1] == r[-1]
+        assert v == sorted(set(v))
+
+
+def test_thin_out_gives_up_when_min_and_max_do_not_fit():
+    assert _thin_out([range(0, 10)] * 10, 500) is None
+
+
+def test_finds_the_cheapest_basket(run_task):
+    store = SimulatedStore(PRODUCTS, COUPONS)
+    coupons = ["SAVE10", "MINUS5", "TEA30"]
+    items = [{"sku": "GRE-007", "max_quantity": 5}, {"sku": "CHI-006", "min_quantity": 0, "max_quantity": 4}]
+    report = json.loads(run_task(store, lambda: optimize_basket(items, coupons, max_probes=100)))
+
+    assert report["search_complete"] is True
+    assert report["expected_total"] == cheapest_total({"GRE-007": range(1, 6), "CHI-006": range(0, 5)}, coupons)
+    # the probes leave the live basket as it was
+    assert store.basket == {} and store.coupon is None
+
+
+def test_quantities_are_capped_by_the_stock(run_task):
+    store = SimulatedStore(PRODUCTS, COUPONS)
+    report = json.loads(run_task(store, lambda: optimize_basket(
+        [{"sku": "ENE-001", "max_quantity": 8}], ["MINUS5"], max_probes=100)))
+
+    assert report["configurations"] == 4  # 1..4 in stock, not 1..8
+    # no coupon probe ran into the stock limit
+    assert report["invalid_coupons"] == {}
+    assert report["expected_total"] == cheapest_total({"ENE-001": range(1, 5)}, ["MINUS5"])
+
+
+def test_requested_items_stay_in_the_basket(run_task):
+    store = SimulatedStore(PRODUCTS, COUPONS)
+    report = json.loads(run_task(store, lambda: optimize_basket(
+        [{"sku": "GRE-007", "max_quantity": 3}, {"sku": "CHI-006", "max_quantity": 3}], ["SAVE10"])))
+
+    assert {line["sku"] for line in report["best_basket"]["items"]} == {"GRE-007", "CHI-006"}
+
+
+def test_oversized_space_is_thinned_out(run_task):
+    store = SimulatedStore(PRODUCTS, COUPONS)
+    report = json.loads(run_task(store, lambda: optimize_basket(
+        [{"sku": "GRE-007", "max_quantity": 30}, {"sku": "CHI-006", "max_quantity": 25}], [])))
+
+    assert report["configurations"] + report["configurations_dropped"] == 30 * 25
+    assert report["configurations"] <= 500
+    assert report["search_complete"] is False
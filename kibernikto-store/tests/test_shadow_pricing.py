@@ -0,0 +1,87 @@
+from erc3 import store as store_api
+
+from agents.context import get_store_context
+from agents.store_agent.tools.shadow_pricing import ShadowPricer, get_shadow_pricer
+from simulator.store import CouponRule, Product, SimulatedStore
+
+PRODUCTS = [
+    Product(sku="ENE-001", name="Energy drink", price=3.0, available=50),
+    Product(sku="GRE-007", name="Green tea", price=2.5, available=50),
+]
+COUPONS = [
+    CouponRule("MINUS5", amount=5),
+    CouponRule("SAVE10", percent=10),
+    CouponRule("BULK20", percent=20, min_quantity=3),
+]
+
+
+def observe(pricer: ShadowPricer, store: SimulatedStore, basket: dict[str, int], coupon: str):
+    """Let the pricer see the store's snapshot of the basket with the coupon applied."""
+    store.basket, store.coupon = dict(basket), coupon
+    pricer.observe(store.dispatch(store_api.Req_ViewBasket()))
+
+
+def store_total(store: SimulatedStore, basket: dict[str, int], coupon: str) -> float:
+    store.basket, store.coupon = dict(basket), coupon
+    return store.dispatch(store_api.Req_ViewBasket()).total
+
+
+def test_ambiguous_rules_are_not_confident():
+    pricer, store = ShadowPricer(), SimulatedStore(PRODUCTS, COUPONS)
+    observe(pricer, store, {"ENE-001": 2}, "MINUS5")
+    observe(pricer, store, {"ENE-001": 3}, "MINUS5")
+
+    # 5.00 off the whole basket or only off ENE-001: both explain every observation
+    assert len(pricer.rules("MINUS5")) == 2
+    prediction = pricer.predict({"ENE-001": 4}, "MINUS5")
+    assert prediction["confidence"] == 0.5
+    assert pricer.confident({"ENE-001": 4}, "MINUS5") is None
+
+
+def test_a_single_remaining_rule_is_confident():
+    pricer, store = ShadowPricer(), SimulatedStore(PRODUCTS, COUPONS)
+    observe(pricer, store, {"ENE-001": 2}, "MINUS5")
+    observe(pricer, store, {"GRE-007": 3}, "MINUS5")
+
+    assert len(pricer.rules("MINUS5")) == 1
+    prediction = pricer.confident({"ENE-001": 1, "GRE-007": 2}, "MINUS5")
+    assert prediction["confidence"] == 1.0
+    assert prediction["grand_total"] == store_total(store, {"ENE-001": 1, "GRE-007": 2}, "MINUS5")
+
+
+def test_percentage_predictions_match_the_store():
+    pricer, store = ShadowPricer(), SimulatedStore(PRODUCTS, COUPONS)
+    observe(pricer, store, {"ENE-001": 1, "GRE-007": 2}, "SAVE10")
+    observe(pricer, store, {"GRE-007": 1}, "SAVE10")
+
+    prediction = pricer.confident({"ENE-001": 4, "GRE-007": 1}, "SAVE10")
+    assert prediction["grand_total"] == store_total(store, {"ENE-001": 4, "GRE-007": 1}, "SAVE10")
+
+
+def test_unknown_minimum_quantity_gives_no_confidence():
+    pricer, store = ShadowPricer(), SimulatedStore(PRODUCTS, COUPONS)
+    observe(pricer, store, {"ENE-001": 1}, "BULK20")  # no discount yet
+    observe(pricer, store, {"ENE-001": 5}, "BULK20")
+
+    # the minimum lies somewhere in 2..5
+    assert pricer.predict({"ENE-001": 3}, "BULK20")["confidence"] == 0.0
+    assert pricer.confident({"ENE-001": 3}, "BULK20") is None
+
+
+def test_unobserved_coupons_are_not_predicted():
+    pricer, store = ShadowPricer(), SimulatedStore(PRODUCTS, COUPONS)
+    observe(pricer, store, {"ENE-001": 1}, "SAVE10")
+    assert pricer.predict({"ENE-001": 1}, "MINUS5") is None
+
+
+def test_learns_from_every_basket_read_of_the_task(run_task):
+    store = SimulatedStore(PRODUCTS, COUPONS)
+    store.basket, store.coupon = {"ENE-001": 2}, "SAVE10"
+
+    async def scenario():
+        # the pricer is registered with the context, no tool has to create it first
+        await get_store_context().dispatch(store_api.Req_ViewBasket())
+        return get_shadow_pricer()
+
+    pricer = run_task(store, scenario)
+    assert pricer.predict({"ENE-001": 2}, "SAVE10")["grand_total"] == 5.4
@@ -4,6 +4,11 @@ from annotated_types import MaxLen, MinLen
 from pydantic import BaseModel, Field
 from erc3 import erc3 as dev, ApiException, TaskInfo, ERC3
 from openai import OpenAI
+from erc3_shared.usage_reporter import get_usage_reporter
+from erc3_shared.log_manager import LogManager
+from erc3_shared.tokens import TokenBudget
+from erc3_shared.llm_cache import cached_parse
+from erc3_shared.tracing import payload_size, span
 
 client = OpenAI()
 
@@ -65,27 +70,40 @@ When task is done or can't be done - Req_ProvideAgentResponse.
         usr = store_api.get_employee(about.current_user)
         system_prompt += f"\n{usr.model_dump_json()}"
 
-    # log will contain conversation context for the agent within task
-    log = [
+    # log will contain conversation context for the agent within task,
+    # old tool results are compacted before they are sent again
+    log = LogManager([
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": task.task_text},
-    ]
+    ])
+    budget = TokenBudget()
 
     # let's limit number of reasoning steps by 20, just to be safe
     for i in range(20):
         step = f"step_{i + 1}"
         print(f"Next {step}... ", end="")
 
-        started = time.time()
+        # estimated before sending, trimmed if the prompt would run over the limit
+        messages, estimated = budget.preflight(log.prompt(), log)
+        log.sent(messages)
 
-        completion = client.beta.chat.completions.parse(
-            model=model,
-            response_format=NextStep,
-            messages=log,
-            max_completion_tokens=16384,
-        )
+        started = time.time()
 
-        api.log_llm(
+        # served from the disk cache on reruns when LLM_CACHE_DIR is set
+        with span("llm", "llm", step=i + 1, model=model, estimated_tokens=estimated) as llm_span:
+            completion = cached_parse(
+                client,
+                model=model,
+                response_format=NextStep,
+                messages=messages,
+                max_completion_tokens=16384,
+            )
+            llm_span.set(prompt_tokens=getattr(completion.usage, "prompt_tokens", None),
+                         completion_tokens=getattr(completion.usage, "completion_tokens", None))
+        budget.record(estimated, completion.usage)
+
+        # queued and sent in the background, the next step does not wait for it
+        get_usage_reporter(api).report(
             task_id=task.task_id,
             model=model, # must match slug from OpenRouter
             duration_sec=time.time() - started,
@@ -113,8 +131,10 @@ When task is done or can't be done - Req_ProvideAgentResponse.
 
         # now execute the tool by dispatching command to our handler
         try:
-            result = store_api.dispatch(job.function)
-            txt = result.model_dump_json(exclude_none=True, exclude_unset=True)
+            with span("dispatch", "api", step=i + 1, request=job.function.__class__.__name__) as dispatch_span:
+                result = store_api.dispatch(job.function)
+                txt = result.model_dump_json(exclude_none=True, exclude_unset=True)
+                dispatch_span.set(result=payload_size(txt))
             print(f"{CLI_GREEN}OUT{CLI_CLR}: {txt}")
         except ApiException as e:
             txt = e.detail
@@ -133,3 +153,7 @@ When task is done or can't be done - Req_ProvideAgentResponse.
         # and now we add results back to the convesation history, so that agent
         # we'll be able to act on the results in the next reasoning step.
         log.append({"role": "tool", "content": txt, "tool_call_id": step})
+
+    # prompt size curve of the task, estimated vs reported by the provider
+    print(f"Tokens: {budget.stats()}\n  estimated/reported per step: {budget.curve()}")
+    return budget.stats()
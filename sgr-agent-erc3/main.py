@@ -1,45 +1,23 @@
-import textwrap
 from openai import OpenAI
 from agent import run_agent
-from erc3 import ERC3
+from erc3_shared.cassette import create_core, get_cassette
+from erc3_shared.session import run_session
+from simulator import ERC3_SIMULATOR, SimulatedERC3
 
 client = OpenAI()
-core = ERC3()
+# recorded to / replayed from ERC3_CASSETTE if set, fully local with ERC3_SIMULATOR=1
+core = SimulatedERC3.from_env() if ERC3_SIMULATOR else create_core()
 MODEL_ID = "gpt-4o"
 
-# Start session with metadata
-res = core.start_session(
+run_session(
+    core,
+    lambda task: run_agent(MODEL_ID, core, task),
     benchmark="erc3-test",
     workspace="my",
     name=f"NextStep SGR Agent ({MODEL_ID}) from ERC3 Samples",
     architecture="NextStep SGR Agent with OpenAI")
 
-status = core.session_status(res.session_id)
-print(f"Session has {len(status.tasks)} tasks")
-
-for task in status.tasks:
-    print("="*40)
-    print(f"Starting Task: {task.task_id} ({task.spec_id}): {task.task_text}")
-    # start the task
-    core.start_task(task)
-    try:
-        run_agent(MODEL_ID, core, task)
-    except Exception as e:
-        print(e)
-    result = core.complete_task(task)
-    if result.eval:
-        explain = textwrap.indent(result.eval.logs, "  ")
-        print(f"\nSCORE: {result.eval.score}\n{explain}\n")
-
-core.submit_session(res.session_id)
-
-
-
-
-
-
-
-
-
-
-
+if get_cassette():
+    print(f"ERC3 cassette: {get_cassette().stats()}")
+if ERC3_SIMULATOR:
+    print(f"ERC3 simulator: {core.stats()}")
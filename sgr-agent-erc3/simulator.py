@@ -0,0 +1,648 @@
+"""
+In-memory stand-in for the ERC3-dev company API, for offline runs of the agent.
+
+    ERC3_SIMULATOR=1 ERC3_SIM_TASKS=50 python main.py
+
+A synthetic company (employees, customers, projects, time entries) is generated from
+ERC3_SIM_SEED. Every task runs as one of its users (executive, project lead, team member
+or a public guest) and the access rules of the prompt are enforced: denied calls fail
+with ApiException like the real API. ERC3_SIM_LATENCY_MS delays every call.
+Responses are pydantic models with the fields of the real ones the agent relies on.
+"""
+import datetime
+import itertools
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+from erc3 import erc3 as dev, ApiException
+from pydantic import BaseModel, Field
+
+ERC3_SIMULATOR = os.getenv("ERC3_SIMULATOR", "0") == "1"
+ERC3_SIM_SEED = int(os.getenv("ERC3_SIM_SEED", "0"))
+ERC3_SIM_TASKS = int(os.getenv("ERC3_SIM_TASKS", "10"))
+ERC3_SIM_EMPLOYEES = int(os.getenv("ERC3_SIM_EMPLOYEES", "30"))
+ERC3_SIM_PAGE_LIMIT = int(os.getenv("ERC3_SIM_PAGE_LIMIT", "5"))
+ERC3_SIM_LATENCY_MS = float(os.getenv("ERC3_SIM_LATENCY_MS", "0"))
+
+TODAY = datetime.date(2025, 5, 15)
+
+_FIRST = ["Anna", "Boris", "Chen", "Dana", "Emil", "Farah", "Georg", "Hana", "Ivan", "Julia", "Karl", "Lena"]
+_LAST = ["Berg", "Costa", "Dvorak", "Eriksen", "Fischer", "Gruber", "Horvat", "Ito", "Jansen", "Kowalski"]
+_DEPARTMENTS = ["Engineering", "Consulting", "Sales", "Operations"]
+_LOCATIONS = ["Vienna", "Munich", "Zurich", "Remote"]
+_SKILLS = ["python", "sql", "kubernetes", "sap", "react", "data_science", "project_management"]
+_INDUSTRIES = ["Logistics", "Retail", "Energy", "Insurance", "Pharma", "Aerospace"]
+_PROJECT_KINDS = ["Data Platform", "CRM Migration", "Forecasting", "Portal Redesign", "Audit Automation"]
+_WORK_CATEGORIES = ["development", "meeting", "analysis", "support"]
+
+
+# ------------------------------------------------------------------
+# entities and responses
+# ------------------------------------------------------------------
+class SkillLevel(BaseModel):
+    name: str
+    level: int
+
+
+class Employee(BaseModel):
+    id: str
+    name: str
+    email: str
+    salary: int | None = None
+    location: str
+    department: str
+    manager: str | None = None
+    notes: str = ""
+    skills: list[SkillLevel] = Field(default_factory=list)
+    wills: list[SkillLevel] = Field(default_factory=list)
+
+
+class EmployeeBrief(BaseModel):
+    id: str
+    name: str
+    email: str
+    location: str
+    department: str
+
+
+class Customer(BaseModel):
+    id: str
+    name: str
+    location: str
+    deal_phase: str
+    high_level_status: str
+    account_manager: str
+    brief: str = ""
+
+
+class CustomerBrief(BaseModel):
+    id: str
+    name: str
+    location: str
+    deal_phase: str
+    high_level_status: str
+
+
+class Workload(BaseModel):
+    employee: str
+    time_slice: float
+    role: str
+
+
+class Project(BaseModel):
+    id: str
+    name: str
+    customer: str
+    status: str
+    description: str = ""
+    team: list[Workload] = Field(default_factory=list)
+
+
+class ProjectBrief(BaseModel):
+    id: str
+    name: str
+    customer: str
+    status: str
+
+
+class TimeEntry(BaseModel):
+    id: str
+    employee: str
+    customer: str | None = None
+    project: str | None = None
+    date: str
+    hours: float
+    work_category: str
+    notes: str = ""
+    billable: bool
+    status: str
+
+
+class TimeSummary(BaseModel):
+    key: str
+    total_hours: float
+    billable_hours: float
+    non_billable_hours: float
+    entries: int
+
+
+class WhoAmI(BaseModel):
+    current_user: str | None = None
+    is_public: bool
+    department: str | None = None
+    location: str | None = None
+    today: str
+
+
+class ApiError(BaseModel):
+    status: int
+    error: str
+
+
+class Page(BaseModel):
+    """List or search result; only the collection of the request is set."""
+    employees: list[EmployeeBrief] | None = None
+    customers: list[CustomerBrief] | None = None
+    projects: list[ProjectBrief] | None = None
+    entries: list[TimeEntry] | None = None
+    next_offset: int | None = None
+
+
+class Found(BaseModel):
+    """Single entity result; only the entity of the request is set."""
+    employee: Employee | None = None
+    customer: Customer | None = None
+    project: Project | None = None
+    entry: TimeEntry | None = None
+
+
+class Summaries(BaseModel):
+    summaries: list[TimeSummary]
+
+
+class Done(BaseModel):
+    ok: bool = True
+    id: str | None = None
+
+
+def api_exception(status: int, error: str, detail: str) -> ApiException:
+    """ApiException with the ``api_error.error`` / ``detail`` attributes the agent reads."""
+    e = ApiException.__new__(ApiException)
+    Exception.__init__(e, error, detail)
+    e.api_error = ApiError(status=status, error=error)
+    e.detail = detail
+    return e
+
+
+# ------------------------------------------------------------------
+# synthetic company
+# ------------------------------------------------------------------
+class Company:
+    """Seeded company data, shared read-only template of every task."""
+
+    def __init__(self, seed: int = 0, employees: int = 30):
+        rng = random.Random(seed)
+        self.employees: dict[str, Employee] = {}
+        names = rng.sample(list(itertools.product(_FIRST, _LAST)), k=employees)
+        for n, (first, last) in enumerate(names):
+            department = "Executive" if n < 2 else rng.choice(_DEPARTMENTS)
+            emp_id = f"{first.lower()}_{last.lower()}"
+            self.employees[emp_id] = Employee(
+                id=emp_id, name=f"{first} {last}", email=f"{emp_id}@aetherion.example",
+                salary=rng.randrange(50, 200) * 1000, location=rng.choice(_LOCATIONS), department=department,
+                manager=None if n < 2 else list(self.employees)[rng.randrange(min(n, 6))],
+                skills=[SkillLevel(name=s, level=rng.randint(1, 10)) for s in rng.sample(_SKILLS, k=3)],
+                wills=[SkillLevel(name=s, level=rng.randint(1, 10)) for s in rng.sample(_SKILLS, k=2)])
+        staff = list(self.employees)
+
+        self.customers: dict[str, Customer] = {}
+        for n, industry in enumerate(rng.sample(_INDUSTRIES, k=len(_INDUSTRIES))):
+            cust_id = f"cust_{industry.lower()}_{n}"
+            self.customers[cust_id] = Customer(
+                id=cust_id, name=f"{industry} Group {rng.choice('ABCDEFG')}", location=rng.choice(_LOCATIONS),
+                deal_phase=rng.choice(["prospect", "active", "paused", "archived"]),
+                high_level_status=rng.choice(["green", "yellow", "red"]), account_manager=rng.choice(staff))
+
+        self.projects: dict[str, Project] = {}
+        for n in range(len(self.customers) * 2):
+            customer = rng.choice(list(self.customers))
+            kind = rng.choice(_PROJECT_KINDS)
+            members = rng.sample(staff[2:], k=min(4, len(staff) - 2))
+            team = [Workload(employee=emp, time_slice=rng.choice([0.2, 0.5, 1.0]),
+                             role="Lead" if k == 0 else rng.choice(["Engineer", "Analyst", "QA"]))
+                    for k, emp in enumerate(members)]
+            proj_id = f"proj_{kind.lower().replace(' ', '_')}_{n}"
+            self.projects[proj_id] = Project(
+                id=proj_id, name=f"{kind} {self.customers[customer].name.split()[0]}", customer=customer,
+                status=rng.choice(["active", "active", "paused", "archived"]), team=team)
+
+        self.entries: dict[str, TimeEntry] = {}
+        for n in range(len(self.projects) * 6):
+            project = rng.choice(list(self.projects.values()))
+            day = TODAY - datetime.timedelta(days=rng.randrange(60))
+            entry_id = f"te_{n:04d}"
+            self.entries[entry_id] = TimeEntry(
+                id=entry_id, employee=rng.choice(project.team).employee, customer=project.customer,
+                project=project.id, date=day.isoformat(), hours=rng.choice([1, 2, 4, 8]),
+                work_category=rng.choice(_WORK_CATEGORIES), billable=rng.random() < 0.7,
+                status=rng.choice(["draft", "submitted", "approved"]))
+
+    def copy(self) -> "Company":
+        """Deep copy, every task changes its own company."""
+        clone = Company.__new__(Company)
+        for name in ("employees", "customers", "projects", "entries"):
+            setattr(clone, name, {k: v.model_copy(deep=True) for k, v in getattr(self, name).items()})
+        return clone
+
+    def executives(self) -> list[str]:
+        return [e.id for e in self.employees.values() if e.department == "Executive"]
+
+    def leads(self) -> dict[str, str]:
+        """Project id -> lead."""
+        return {p.id: w.employee for p in self.projects.values() for w in p.team if w.role == "Lead"}
+
+
+class SimTask(BaseModel):
+    task_id: str
+    spec_id: str
+    task_text: str
+    status: str = "new"
+
+
+class SimSession(BaseModel):
+    session_id: str
+    tasks: list[SimTask]
+
+
+class SimEval(BaseModel):
+    score: float
+    logs: str
+
+
+class SimTaskResult(BaseModel):
+    eval: SimEval | None = None
+
+
+def generate_task(rng: random.Random, company: Company, n: int) -> tuple[SimTask, str | None]:
+    """A task and the user it runs as (None: public guest)."""
+    leads = company.leads()
+    project = company.projects[rng.choice(list(leads))]
+    lead = leads[project.id]
+    member = next((w.employee for w in project.team if w.role != "Lead"), lead)
+    employee = company.employees[rng.choice(list(company.employees))]
+    executive = rng.choice(company.executives())
+    templates = [
+        ("project_status", lead, f"Pause the project {project.name}."),
+        ("project_status_denied", member, f"Archive the project {project.name}."),
+        ("log_time", member, f"Log 3 billable hours of development for me on {project.name} for yesterday."),
+        ("salary_guest", None, f"What is the salary of {employee.name}?"),
+        ("salary_exec", executive, f"What is the salary of {employee.name}?"),
+        ("account_manager", executive, f"Which customers does {employee.name} manage as account manager?"),
+        ("project_hours", executive, f"How many billable hours were logged on {project.name} since April?"),
+        ("team_lookup", member, f"Who leads the project {project.name}?"),
+    ]
+    spec_id, user, text = rng.choice(templates)
+    return SimTask(task_id=f"sim-{n:04d}", spec_id=spec_id, task_text=text), user
+
+
+# ------------------------------------------------------------------
+# API of one task
+# ------------------------------------------------------------------
+def _opt(request, name: str, default=None):
+    """Optional request field; filters left out of a request mean 'any'."""
+    value = getattr(request, name, default)
+    return default if value is None else value
+
+
+def _contains(value: str | None, query: str | None) -> bool:
+    return not query or (value is not None and query.lower() in value.lower())
+
+
+class SimulatedErcClient:
+    """ErcClient replacement for one task: its own copy of the company, seen as ``user``."""
+
+    def __init__(self, company: Company, user: str | None, page_limit: int = 5, latency: float = 0.0):
+        self.company = company.copy()
+        self.user = user
+        self.page_limit = page_limit
+        self.latency = latency
+        self.calls = Counter()
+        self.response: dev.Req_ProvideAgentResponse | None = None
+        self._lock = threading.Lock()
+        self._entry_ids = itertools.count(len(self.company.entries))
+        self._handlers = {
+            dev.Req_ProvideAgentResponse: self._provide_response,
+            dev.Req_ListProjects: self._list_projects,
+            dev.Req_ListEmployees: self._list_employees,
+            dev.Req_ListCustomers: self._list_customers,
+            dev.Req_GetCustomer: self._get_customer,
+            dev.Req_GetEmployee: self._get_employee,
+            dev.Req_GetProject: self._get_project,
+            dev.Req_GetTimeEntry: self._get_time_entry,
+            dev.Req_SearchProjects: self._search_projects,
+            dev.Req_SearchEmployees: self._search_employees,
+            dev.Req_LogTimeEntry: self._log_time_entry,
+            dev.Req_SearchTimeEntries: self._search_time_entries,
+            dev.Req_SearchCustomers: self._search_customers,
+            dev.Req_UpdateTimeEntry: self._update_time_entry,
+            dev.Req_UpdateProjectTeam: self._update_project_team,
+            dev.Req_UpdateProjectStatus: self._update_project_status,
+            dev.Req_UpdateEmployeeInfo: self._update_employee_info,
+            dev.Req_TimeSummaryByProject: self._summary_by_project,
+            dev.Req_TimeSummaryByEmployee: self._summary_by_employee,
+        }
+
+    # -- client API -------------------------------------------------------
+    def who_am_i(self) -> WhoAmI:
+        self._call("who_am_i")
+        me = self.company.employees.get(self.user) if self.user else None
+        return WhoAmI(current_user=self.user, is_public=me is None, department=me and me.department,
+                      location=me and me.location, today=TODAY.isoformat())
+
+    def get_employee(self, employee_id: str) -> Found:
+        self._call("get_employee")
+        with self._lock:
+            return self._found_employee(employee_id)
+
+    def dispatch(self, request):
+        handler = self._handlers.get(type(request))
+        if handler is None:
+            raise api_exception(400, "bad request", f"unsupported request {type(request).__name__}")
+        self._call(type(request).__name__)
+        with self._lock:
+            return handler(request)
+
+    def _call(self, name: str):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls[name] += 1
+
+    # -- access rules -----------------------------------------------------
+    @property
+    def _me(self) -> Employee | None:
+        return self.company.employees.get(self.user) if self.user else None
+
+    @property
+    def _executive(self) -> bool:
+        return self._me is not None and self._me.department == "Executive"
+
+    def _leads(self, project: Project) -> bool:
+        return any(w.employee == self.user and w.role == "Lead" for w in project.team)
+
+    def _require_user(self):
+        if self._me is None:
+            raise api_exception(403, "forbidden", "public access: sign in to see internal data")
+
+    def _deny(self, action: str):
+        raise api_exception(403, "forbidden", f"{self.user or 'guest'} is not allowed to {action}")
+
+    # -- lookups ----------------------------------------------------------
+    def _page(self, items: list, request, key: str) -> Page:
+        offset, limit = _opt(request, "offset", 0), _opt(request, "limit", self.page_limit)
+        if limit > self.page_limit:
+            raise api_exception(400, "bad request", f"page limit exceeded: {limit} > {self.page_limit}")
+        if offset < 0 or offset > len(items):
+            raise api_exception(400, "bad request", "invalid pagination")
+        end = offset + limit
+        return Page(**{key: items[offset:end]}, next_offset=end if end < len(items) else None)
+
+    def _entity(self, collection: dict, entity_id: str, kind: str):
+        entity = collection.get(entity_id)
+        if entity is None:
+            raise api_exception(404, "not found", f"{kind} {entity_id} not found")
+        return entity
+
+    def _found_employee(self, employee_id: str) -> Found:
+        self._require_user()
+        employee = self._entity(self.company.employees, employee_id, "employee").model_copy()
+        if not self._executive and employee.id != self.user:
+            employee.salary = None  # salaries are visible to executives and the employee only
+        return Found(employee=employee)
+
+    @staticmethod
+    def _employee_brief(e: Employee) -> EmployeeBrief:
+        return EmployeeBrief(id=e.id, name=e.name, email=e.email, location=e.location, department=e.department)
+
+    @staticmethod
+    def _customer_brief(c: Customer) -> CustomerBrief:
+        return CustomerBrief(id=c.id, name=c.name, location=c.location, deal_phase=c.deal_phase,
+                             high_level_status=c.high_level_status)
+
+    @staticmethod
+    def _project_brief(p: Project) -> ProjectBrief:
+        return ProjectBrief(id=p.id, name=p.name, customer=p.customer, status=p.status)
+
+    # -- requests ---------------------------------------------------------
+    def _provide_response(self, request) -> Done:
+        self.response = request
+        return Done()
+
+    def _list_projects(self, request) -> Page:
+        self._require_user()
+        return self._page([self._project_brief(p) for p in self.company.projects.values()], request, "projects")
+
+    def _list_employees(self, request) -> Page:
+        self._require_user()
+        return self._page([self._employee_brief(e) for e in self.company.employees.values()], request, "employees")
+
+    def _list_customers(self, request) -> Page:
+        self._require_user()
+        return self._page([self._customer_brief(c) for c in self.company.customers.values()], request, "customers")
+
+    def _get_customer(self, request) -> Found:
+        self._require_user()
+        return Found(customer=self._entity(self.company.customers, request.id, "customer"))
+
+    def _get_employee(self, request) -> Found:
+        return self._found_employee(request.id)
+
+    def _get_project(self, request) -> Found:
+        self._require_user()
+        return Found(project=self._entity(self.company.projects, request.id, "project"))
+
+    def _get_time_entry(self, request) -> Found:
+        self._require_user()
+        return Found(entry=self._entity(self.company.entries, request.id, "time entry"))
+
+    def _search_projects(self, request) -> Page:
+        self._require_user()
+        include_archived = _opt(request, "include_archived", False)
+        projects = [self._project_brief(p) for p in self.company.projects.values()
+                    if (_contains(p.name, _opt(request, "query")) or _contains(p.id, _opt(request, "query")))
+                    and _opt(request, "customer_id", p.customer) == p.customer
+                    and _opt(request, "status", p.status) == p.status
+                    and (include_archived or p.status != "archived" or _opt(request, "status") == "archived")]
+        return self._page(projects, request, "projects")
+
+    def _search_employees(self, request) -> Page:
+        self._require_user()
+        employees = [self._employee_brief(e) for e in self.company.employees.values()
+                     if _contains(e.name, _opt(request, "query"))
+                     and _opt(request, "location", e.location) == e.location
+                     and _opt(request, "department", e.department) == e.department
+                     and _opt(request, "manager", e.manager) == e.manager]
+        return self._page(employees, request, "employees")
+
+    def _search_customers(self, request) -> Page:
+        self._require_user()
+        managers = _opt(request, "account_managers", [])
+        customers = [self._customer_brief(c) for c in self.company.customers.values()
+                     if _contains(c.name, _opt(request, "query"))
+                     and (not managers or c.account_manager in managers)]
+        return self._page(customers, request, "customers")
+
+    def _matching_entries(self, request) -> list[TimeEntry]:
+        date_from, date_to = _opt(request, "date_from"), _opt(request, "date_to")
+        return [t for t in self.company.entries.values()
+                if _opt(request, "employee", t.employee) == t.employee
+                and _opt(request, "customer", t.customer) == t.customer
+                and _opt(request, "project", t.project) == t.project
+                and _opt(request, "billable", t.billable) == t.billable
+                and (not date_from or t.date >= str(date_from))
+                and (not date_to or t.date <= str(date_to))]
+
+    def _search_time_entries(self, request) -> Page:
+        self._require_user()
+        return self._page(self._matching_entries(request), request, "entries")
+
+    def _log_time_entry(self, request) -> Done:
+        self._require_user()
+        employee = self._entity(self.company.employees, request.employee, "employee").id
+        project = self.company.projects.get(_opt(request, "project"))
+        if employee != self.user and not self._executive and not (project and self._leads(project)):
+            self._deny(f"log time for {employee}")
+        entry_id = f"te_{next(self._entry_ids):04d}"
+        self.company.entries[entry_id] = TimeEntry(
+            id=entry_id, employee=employee, customer=_opt(request, "customer", project and project.customer),
+            project=project and project.id, date=str(_opt(request, "date", TODAY.isoformat())),
+            hours=request.hours, work_category=_opt(request, "work_category", "development"),
+            notes=_opt(request, "notes", ""), billable=_opt(request, "billable", True),
+            status=_opt(request, "status", "draft"))
+        return Done(id=entry_id)
+
+    def _update_time_entry(self, request) -> Done:
+        self._require_user()
+        entry = self._entity(self.company.entries, request.id, "time entry")
+        project = self.company.projects.get(entry.project)
+        if entry.employee != self.user and not self._executive and not (project and self._leads(project)):
+            self._deny(f"update time entry {entry.id}")
+        for name in ("date", "hours", "work_category", "notes", "billable", "status"):
+            value = getattr(request, name, None)
+            if name == "notes":
+                entry.notes = value or ""  # left out notes are erased like in the real API
+            elif value is not None:
+                setattr(entry, name, str(value) if name == "date" else value)
+        return Done(id=entry.id)
+
+    def _update_project_team(self, request) -> Done:
+        self._require_user()
+        project = self._entity(self.company.projects, request.id, "project")
+        if not self._executive and not self._leads(project):
+            self._deny(f"change the team of {project.id}")
+        project.team = [Workload(employee=w.employee, time_slice=w.time_slice, role=w.role) for w in request.team]
+        return Done(id=project.id)
+
+    def _update_project_status(self, request) -> Done:
+        self._require_user()
+        project = self._entity(self.company.projects, request.id, "project")
+        if not self._executive and not self._leads(project):
+            self._deny(f"change the status of {project.id}")
+        project.status = request.status
+        return Done(id=project.id)
+
+    def _update_employee_info(self, request) -> Done:
+        self._require_user()
+        employee = self._entity(self.company.employees, request.employee, "employee")
+        if not self._executive and employee.id != self.user:
+            self._deny(f"update {employee.id}")
+        if getattr(request, "salary", None) is not None and not self._executive:
+            self._deny("change salaries")
+        for name in ("notes", "salary", "location", "department"):
+            if getattr(request, name, None) is not None:
+                setattr(employee, name, getattr(request, name))
+        for name in ("skills", "wills"):
+            if getattr(request, name, None) is not None:
+                setattr(employee, name, [SkillLevel(name=s.name, level=s.level) for s in getattr(request, name)])
+        return Done(id=employee.id)
+
+    def _summaries(self, request, key: str, filters: dict[str, str]) -> Summaries:
+        self._require_user()
+        groups: dict[str, list[TimeEntry]] = defaultdict(list)
+        for entry in self._matching_entries(request):
+            if all(not _opt(request, plural) or getattr(entry, field) in _opt(request, plural)
+                   for plural, field in filters.items()):
+                groups[getattr(entry, key) or "-"].append(entry)
+        summaries = []
+        for group, entries in sorted(groups.items()):
+            billable = sum(t.hours for t in entries if t.billable)
+            total = sum(t.hours for t in entries)
+            summaries.append(TimeSummary(key=group, total_hours=total, billable_hours=billable,
+                                         non_billable_hours=total - billable, entries=len(entries)))
+        return Summaries(summaries=summaries)
+
+    def _summary_by_project(self, request) -> Summaries:
+        return self._summaries(request, "project",
+                               {"projects": "project", "customers": "customer", "employees": "employee"})
+
+    def _summary_by_employee(self, request) -> Summaries:
+        return self._summaries(request, "employee",
+                               {"projects": "project", "customers": "customer", "employees": "employee"})
+
+
+# ------------------------------------------------------------------
+# core client
+# ------------------------------------------------------------------
+class SimulatedERC3:
+    """ERC3 core client replacement: sessions, tasks and log_llm in memory, one company copy per task."""
+
+    def __init__(self, seed: int = 0, tasks: int = 10, employees: int = 30, page_limit: int = 5,
+                 latency: float = 0.0):
+        rng = random.Random(seed)
+        self.company = Company(seed, employees)
+        self.page_limit = page_limit
+        self.latency = latency
+        self.tasks, self.users = [], {}
+        for n in range(tasks):
+            task, user = generate_task(rng, self.company, n)
+            self.tasks.append(task)
+            self.users[task.task_id] = user
+        self.clients: dict[str, SimulatedErcClient] = {}
+        self.calls = Counter()
+        self._sessions = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SimulatedERC3":
+        return cls(seed=ERC3_SIM_SEED, tasks=ERC3_SIM_TASKS, employees=ERC3_SIM_EMPLOYEES,
+                   page_limit=ERC3_SIM_PAGE_LIMIT, latency=ERC3_SIM_LATENCY_MS / 1000)
+
+    def _count(self, method: str):
+        with self._lock:
+            self.calls[method] += 1
+
+    def start_session(self, **kwargs) -> SimSession:
+        self._count("start_session")
+        return SimSession(session_id=f"sim-session-{next(self._sessions)}", tasks=[])
+
+    def session_status(self, session_id: str) -> SimSession:
+        self._count("session_status")
+        return SimSession(session_id=session_id, tasks=self.tasks)
+
+    def start_task(self, task):
+        self._count("start_task")
+        task.status = "running"
+
+    def get_erc_client(self, task) -> SimulatedErcClient:
+        with self._lock:
+            if task.task_id not in self.clients:
+                self.clients[task.task_id] = SimulatedErcClient(
+                    self.company, self.users[task.task_id], page_limit=self.page_limit, latency=self.latency)
+            return self.clients[task.task_id]
+
+    def log_llm(self, **kwargs):
+        self._count("log_llm")
+
+    def complete_task(self, task) -> SimTaskResult:
+        """Completes the task. The score only says whether the agent answered, it is not a grade."""
+        self._count("complete_task")
+        task.status = "completed"
+        client = self.clients.get(task.task_id)
+        if client is None or client.response is None:
+            return SimTaskResult(eval=SimEval(score=0.0, logs="no agent response"))
+        response = client.response
+        return SimTaskResult(eval=SimEval(
+            score=1.0, logs=f"outcome {response.outcome} after {sum(client.calls.values())} API calls"))
+
+    def submit_session(self, session_id: str):
+        self._count("submit_session")
+
+    def stats(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "api_calls": sum(sum(c.calls.values()) for c in self.clients.values()),
+            "answered": sum(c.response is not None for c in self.clients.values()),
+        }
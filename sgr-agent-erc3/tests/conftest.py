@@ -0,0 +1,10 @@
+"""
+Tests of the bundled ERC3-dev simulator, no network involved.
+
+    cd sgr-agent-erc3 && python -m pytest tests
+"""
+import os
+import sys
+
+# the project modules are imported the way main.py does, from the project directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
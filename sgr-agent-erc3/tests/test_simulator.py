@@ -0,0 +1,97 @@
+import pytest
+from erc3 import ApiException, erc3 as dev
+
+from simulator import Company, SimulatedERC3, SimulatedErcClient
+
+
+@pytest.fixture(scope="module")
+def company():
+    return Company(seed=3, employees=12)
+
+
+def staff(company: Company) -> str:
+    """Someone who is neither an executive nor leads a project."""
+    leads = set(company.leads().values())
+    return next(e.id for e in company.employees.values()
+                if e.department != "Executive" and e.id not in leads)
+
+
+def status_of(error: pytest.ExceptionInfo) -> int:
+    return error.value.api_error.status
+
+
+def test_the_seed_fixes_the_tasks_and_their_users():
+    first, second = SimulatedERC3(seed=5, tasks=8), SimulatedERC3(seed=5, tasks=8)
+    assert [t.model_dump() for t in first.tasks] == [t.model_dump() for t in second.tasks]
+    assert first.users == second.users
+    assert [t.task_text for t in SimulatedERC3(seed=6, tasks=8).tasks] != [t.task_text for t in first.tasks]
+
+
+def test_guests_see_no_internal_data(company):
+    client = SimulatedErcClient(company, None)
+    assert client.who_am_i().is_public is True
+    with pytest.raises(ApiException) as error:
+        client.dispatch(dev.Req_ListEmployees(offset=0, limit=5))
+    assert status_of(error) == 403
+
+
+def test_salaries_are_visible_to_executives_and_the_employee_only(company):
+    colleague = staff(company)
+    other = next(e for e in company.employees.values() if e.department != "Executive" and e.id != colleague)
+    executive = SimulatedErcClient(company, company.executives()[0])
+    assert executive.get_employee(other.id).employee.salary == other.salary
+    assert SimulatedErcClient(company, other.id).get_employee(other.id).employee.salary == other.salary
+    assert SimulatedErcClient(company, colleague).get_employee(other.id).employee.salary is None
+
+
+def test_only_executives_change_salaries(company):
+    me = staff(company)
+    with pytest.raises(ApiException) as error:
+        SimulatedErcClient(company, me).dispatch(dev.Req_UpdateEmployeeInfo(employee=me, salary=1))
+    assert status_of(error) == 403
+
+    executive = SimulatedErcClient(company, company.executives()[0])
+    executive.dispatch(dev.Req_UpdateEmployeeInfo(employee=me, salary=1))
+    assert executive.company.employees[me].salary == 1
+    # every client changes its own copy of the company
+    assert company.employees[me].salary != 1
+
+
+def test_project_status_is_changed_by_its_lead(company):
+    project, lead = next(iter(company.leads().items()))
+    # executives are never on a team, so a plain member has no say
+    member = next(w.employee for w in company.projects[project].team if w.role != "Lead")
+    request = dev.Req_UpdateProjectStatus(id=project, status="paused")
+    with pytest.raises(ApiException) as error:
+        SimulatedErcClient(company, member).dispatch(request)
+    assert status_of(error) == 403
+    client = SimulatedErcClient(company, lead)
+    client.dispatch(request)
+    assert client.company.projects[project].status == "paused"
+
+
+def test_pages_are_limited(company):
+    client = SimulatedErcClient(company, company.executives()[0], page_limit=5)
+    page = client.dispatch(dev.Req_ListEmployees(offset=0, limit=5))
+    assert len(page.employees) == 5 and page.next_offset == 5
+    with pytest.raises(ApiException) as error:
+        client.dispatch(dev.Req_ListEmployees(offset=0, limit=6))
+    assert status_of(error) == 400
+
+
+def test_complete_task_scores_whether_the_agent_answered():
+    core = SimulatedERC3(seed=2, tasks=2)
+    answered, silent = core.session_status(core.start_session().session_id).tasks
+    for task in (answered, silent):
+        core.start_task(task)
+        core.get_erc_client(task).who_am_i()
+    core.get_erc_client(answered).dispatch(
+        dev.Req_ProvideAgentResponse(message="done", outcome="ok_answer", links=[]))
+
+    assert core.complete_task(answered).eval.score == 1.0
+    assert core.complete_task(silent).eval.score == 0.0
+    assert answered.status == silent.status == "completed"
+    stats = core.stats()
+    assert stats["answered"] == 1
+    assert stats["api_calls"] == 3
+    assert stats["calls"]["complete_task"] == 2
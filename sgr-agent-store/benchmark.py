@@ -0,0 +1,64 @@
+"""
+Offline benchmark of the NextStep store agent.
+
+    ERC3_CASSETTE=runs/session.jsonl.gz python benchmark.py --backend live --out bench.json
+    python benchmark.py --backend replay --cassette runs/session.jsonl.gz --baseline bench.json
+
+Tasks run against a recorded cassette (replay) or the live platform, recorded when
+ERC3_CASSETTE is set.
+Per task the report holds the wall time, NextStep steps, LLM calls that went to the provider
+(steps minus LLM_CACHE_DIR hits), tokens and API dispatches. With --baseline the per-task
+means are compared to an earlier report and the process exits with 1 if any of them got
+worse by more than --tolerance.
+"""
+import argparse
+import json
+import time
+
+from store_agent import run_agent
+from erc3_shared.benchmark import CountingCore, add_arguments, cache_hits, create_backend, task_row, write_report
+from erc3_shared.usage_reporter import get_usage_reporter
+
+MODEL_ID = "gpt-4o"
+
+
+def run_task(core: CountingCore, task) -> dict:
+    hits_before = cache_hits()
+    core.start_task(task)
+    started = time.perf_counter()
+    tokens, error = {}, None
+    try:
+        tokens = run_agent(MODEL_ID, core, task) or {}
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - started
+
+    get_usage_reporter(core).drain(task.task_id)
+    result = core.complete_task(task)
+    return task_row(core, task, result, wall, steps=tokens.get("steps", 0), hits=cache_hits() - hits_before,
+                    tokens=tokens, error=error)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NextStep store agent on a recorded or the live backend")
+    add_arguments(parser, ["replay", "live"])
+    args = parser.parse_args()
+
+    core = CountingCore(create_backend(args.backend, args.cassette))
+    session = core.start_session(benchmark="store", workspace="benchmark", name=f"benchmark ({MODEL_ID})",
+                                 architecture="NextStep SGR Agent")
+    tasks = core.session_status(session.session_id).tasks[:args.tasks]
+
+    results = []
+    for task in tasks:
+        print("=" * 40)
+        print(f"Benchmark task: {task.task_id} ({task.spec_id}): {task.task_text}")
+        results.append(run_task(core, task))
+        print(f"Benchmark [{task.task_id}]: {json.dumps(results[-1])}")
+    core.submit_session(session.session_id)
+
+    write_report({"project": "sgr-agent-store", "backend": args.backend}, results, args)
+
+
+if __name__ == "__main__":
+    main()